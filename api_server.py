@@ -0,0 +1,589 @@
+"""
+api_server.py  —  HTTP API for template generation, classification and resizing
+
+    python -m api_server --port 8700
+    python -m api_server --host 0.0.0.0 --port 8700 -j 4 --max-body-mb 1024
+
+Request bodies may be sent with Content-Length or Transfer-Encoding: chunked.
+They are read COPY_CHUNK at a time and spooled to disk past SPOOL_MEMORY, so
+a 500 MB workbook or ZIP never sits in memory whole.  Long runs are jobs:
+submitting returns 202 {"job_id"}; poll /v1/jobs/<id>.
+
+    GET    /health                            pools, Claude rate limit, generation queue, mirror
+    POST   /v1/generate?vendor=AFX&...        body: .xlsx / .xls           -> 202 job
+    POST   /v1/classify                       body: image bytes            -> result
+    POST   /v1/classify?url=<url>             one URL                      -> result
+    POST   /v1/classify/jobs?max_calls=N      body: {"urls": [...]} or one URL per line -> 202 job
+                                              (also max_seconds: wall time of the Claude phase,
+                                              and max_spend in USD)
+    POST   /v1/resize?width=1000&height=1000  body: image -> JPEG;  ZIP / TAR -> ZIP, streamed
+                                              (chunked) as the images finish
+    POST   /v1/resize?url=<url>               one URL (via asset_mirror)   -> JPEG
+    GET    /v1/jobs/<id>                      status of a generate or classify job
+    GET    /v1/jobs/<id>/result               generate: the template .xlsx; classify: NDJSON
+                                              (one line per unique URL, streamed)
+    GET    /v1/jobs/<id>/log                  generate: the processing log
+    DELETE /v1/jobs/<id>                      cancel
+
+/v1/generate takes the ingest_service vendor settings as query parameters
+(sheet, header_row, sku_col, mfg_prefix, brand_folder; repeat image_col /
+pdf_col / video_col / exclude_col; mediatype=<col>:<type>) and runs
+ingest_service.process_file on a process pool of -j workers.  Classify jobs
+are classify_jobs jobs.  Single classify and resize requests are queued on the
+shared scheduler pools under the caller (X-Client header, else the client
+address), so one client's 5 000-image ZIP cannot starve another's requests.
+
+benchmarks/load_api.py drives it with concurrent clients for load testing.
+"""
+
+from __future__ import annotations
+
+import argparse, io, json, re, shutil, sys, tarfile, tempfile, threading, time, uuid, zipfile
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from dataclasses import asdict
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import chain
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from PIL import UnidentifiedImageError
+
+import asset_mirror
+import classify_jobs
+import image_classifier as ic
+import image_resizer
+import ingest_service
+import scheduler
+from claude_budget import Budget
+
+JOBS_DIR       = Path(".cache/api_jobs")
+SPOOL_MEMORY   = 8 << 20        # request bodies larger than this are spooled to disk
+COPY_CHUNK     = 1 << 20        # request body read size
+RESPONSE_CHUNK = 256 << 10      # chunked response write size
+MAX_BODY_MB    = 2048
+MAX_SIDE       = 6000           # largest accepted resize target
+RESIZE_WINDOW  = scheduler.POOL_SIZES["resize"] * 2     # archive images in flight per request
+ENCODE_MODES   = ("fixed", "budget", "quality")
+_JOB_ID        = r"([0-9a-f]{12})"
+
+
+class ApiError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def _write_json(path: Path, obj) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(obj))
+    tmp.replace(path)
+
+
+# ---------------------------------------------------------------------------
+# Generation jobs
+# ---------------------------------------------------------------------------
+class GenerateJobs:
+    """Template generation on a process pool; state in memory, job.json on disk."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.pool    = ProcessPoolExecutor(max_workers=workers)
+        self._live   = {}                   # job_id -> (future, record)
+        self._lock   = threading.Lock()
+
+    def submit(self, body, filename: str, cfg: dict, owner: str) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        d      = JOBS_DIR / job_id
+        (d / "input").mkdir(parents=True)
+        src = d / "input" / filename
+        with src.open("wb") as f:
+            shutil.copyfileobj(body, f, COPY_CHUNK)
+        rec = dict(job_id=job_id, kind="generate", status="queued", owner=owner,
+                   vendor=cfg["vendor"], filename=filename,
+                   created=time.strftime("%Y-%m-%d %H:%M:%S"), submitted=time.time())
+        _write_json(d / "job.json", rec)
+        fut = self.pool.submit(ingest_service.process_file, str(src), cfg, str(d))
+        with self._lock:
+            self._live[job_id] = (fut, rec)
+        fut.add_done_callback(lambda f: self._finish(job_id, f))
+        return job_id
+
+    def shutdown(self) -> None:
+        """Cancel queued jobs and stop the pool without waiting for running ones
+        (by hand: shutdown(cancel_futures=True) needs Python 3.9)."""
+        with self._lock:
+            futures = [fut for fut, _ in self._live.values()]
+        for fut in futures:
+            fut.cancel()
+        self.pool.shutdown(wait=False)
+
+    def _finish(self, job_id: str, fut) -> None:
+        with self._lock:
+            rec = self._live[job_id][1]
+        try:
+            res = fut.result()
+            rec.update(status=res["status"], **{k: res[k] for k in
+                       ("sheet", "header_row", "sku_col", "rows", "seconds", "outputs")})
+        except CancelledError:
+            rec["status"] = "cancelled"
+        except Exception as exc:
+            rec.update(status="failed", error=str(exc))
+        rec["elapsed"] = round(time.time() - rec["submitted"], 1)
+        d = JOBS_DIR / job_id
+        _write_json(d / "job.json", rec)
+        shutil.rmtree(d / "input", ignore_errors=True)
+        with self._lock:
+            del self._live[job_id]
+
+    def record(self, job_id: str) -> dict | None:
+        """Live record (status queued / running) or the one saved on completion."""
+        with self._lock:
+            live = self._live.get(job_id)
+            if live:
+                fut, rec = live
+                return {**rec, "status": "running" if fut.running() else rec["status"]}
+        try:
+            rec = json.loads((JOBS_DIR / job_id / "job.json").read_text())
+        except (OSError, ValueError):
+            return None
+        if rec["status"] in ("queued", "running"):         # server restarted mid-run
+            rec["status"] = "interrupted"
+        return rec
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job still waiting for a worker (a running workbook finishes)."""
+        with self._lock:
+            live = self._live.get(job_id)
+        return bool(live) and live[0].cancel()
+
+    def stats(self) -> dict:
+        with self._lock:
+            running = sum(f.running() for f, _ in self._live.values())
+            return dict(workers=self.workers, running=running, queued=len(self._live) - running)
+
+
+# ---------------------------------------------------------------------------
+# HTTP plumbing
+# ---------------------------------------------------------------------------
+class _ChunkedWriter:
+    """Write-only body of a Transfer-Encoding: chunked response.  It has no
+    tell()/seek(), so zipfile streams entries with data descriptors."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.buf   = bytearray()
+
+    def write(self, data) -> int:
+        self.buf += data
+        if len(self.buf) >= RESPONSE_CHUNK:
+            self.flush()
+        return len(data)
+
+    def flush(self) -> None:
+        if self.buf:
+            self.wfile.write(b"%x\r\n" % len(self.buf) + bytes(self.buf) + b"\r\n")
+            self.buf.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def _plan(urls: list[str]) -> dict:
+    """classify_jobs plan for a flat URL list (one reference per position)."""
+    from asset_generator import normalize_url
+    unique, refs = {}, {}
+    for i, url in enumerate(urls):
+        norm = normalize_url(url)
+        unique.setdefault(norm, url)
+        refs.setdefault(norm, []).append((i, "api", ""))
+    return dict(unique=unique, refs=refs, total=len(urls))
+
+
+def _render(item: tuple[str, bytes], size: tuple[int, int], settings) -> bytes:
+    return image_resizer.render_jpeg_cached(item[1], size, settings=settings)[0]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version   = "belami-api/1"
+    timeout          = 600              # idle socket limit per connection
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    # -- dispatch ------------------------------------------------------------
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        path, _, query   = self.path.partition("?")
+        self.query       = parse_qs(query)
+        self._body_read  = False
+        self._streaming  = False
+        try:
+            for m, pattern, name in ROUTES:
+                match = pattern.fullmatch(path)
+                if m == method and match:
+                    return getattr(self, name)(*match.groups())
+            raise ApiError(404, f"no route for {method} {path}")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        except Exception as exc:
+            if self._streaming:             # headers already sent: all we can do is hang up
+                self.close_connection = True
+                self.log_error("aborted %s: %s", path, exc)
+                return
+            code = exc.code if isinstance(exc, ApiError) else 500
+            try:
+                unread = not self._body_read and self._has_body()
+            except ApiError:
+                unread = True                           # body of unknown length
+            if unread:
+                self.close_connection = True            # unread body would corrupt the next request
+            self._json(code, {"error": str(exc)})
+
+    def _owner(self) -> str:
+        return self.headers.get("X-Client") or self.client_address[0]
+
+    def _param(self, name: str, default=None, cast=str):
+        vals = self.query.get(name)
+        if not vals:
+            return default
+        try:
+            return cast(vals[-1])
+        except ValueError:
+            raise ApiError(400, f"bad {name}: {vals[-1]!r}") from None
+
+    # -- request bodies ------------------------------------------------------
+    def _content_length(self) -> int:
+        try:
+            n = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise ApiError(400, "bad Content-Length") from None
+        if n < 0:
+            raise ApiError(400, "bad Content-Length")
+        return n
+
+    def _has_body(self) -> bool:
+        return ("chunked" in self.headers.get("Transfer-Encoding", "").lower()
+                or self._content_length() > 0)
+
+    def _body_chunks(self):
+        rfile = self.rfile
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            while True:
+                try:
+                    size = int(rfile.readline().split(b";")[0], 16)
+                except ValueError:
+                    raise ApiError(400, "bad chunk size") from None
+                if size < 0:
+                    raise ApiError(400, "bad chunk size")
+                if size == 0:
+                    while rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass                            # trailers
+                    return
+                while size:
+                    data = rfile.read(min(size, COPY_CHUNK))
+                    if not data:
+                        raise ApiError(400, "truncated chunked body")
+                    size -= len(data)
+                    yield data
+                rfile.readline()                        # CRLF after each chunk
+        remaining = self._content_length()
+        while remaining:
+            data = rfile.read(min(remaining, COPY_CHUNK))
+            if not data:
+                raise ApiError(400, "truncated body")
+            remaining -= len(data)
+            yield data
+
+    def _spool_body(self):
+        """(seekable file holding the request body, its size)."""
+        limit = self.server.max_body
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+        n = 0
+        for data in self._body_chunks():
+            n += len(data)
+            if n > limit:
+                raise ApiError(413, f"body larger than {limit >> 20} MB")
+            spool.write(data)
+        self._body_read = True
+        spool.seek(0)
+        return spool, n
+
+    # -- responses -----------------------------------------------------------
+    def _send(self, code: int, ctype: str, body: bytes, headers: dict | None = None) -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, code: int, obj) -> None:
+        self._send(code, "application/json", json.dumps(obj, default=str).encode())
+
+    def _stream(self, ctype: str, headers: dict | None = None) -> _ChunkedWriter:
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Transfer-Encoding", "chunked")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self._streaming = True
+        return _ChunkedWriter(self.wfile)
+
+    def _send_file(self, path: Path, ctype: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(path.stat().st_size))
+        self.send_header("Content-Disposition", f'attachment; filename="{path.name}"')
+        self.end_headers()
+        self._streaming = True
+        with path.open("rb") as f:
+            shutil.copyfileobj(f, self.wfile, RESPONSE_CHUNK)
+
+    # -- endpoints -----------------------------------------------------------
+    def health(self) -> None:
+        self._json(200, dict(pools={k: scheduler.pool(k).stats() for k in scheduler.POOL_SIZES},
+                             claude=scheduler.claude.stats(), downloads=scheduler.downloads.stats(),
+                             generate=self.server.jobs.stats(), mirror=asset_mirror.get_mirror().summary()))
+
+    def generate(self) -> None:
+        import resources
+        name = Path(self._param("filename") or self.headers.get("X-Filename") or "workbook.xlsx").name
+        if Path(name).suffix.lower() not in ingest_service.WORKBOOK_EXTS:
+            raise ApiError(400, f"filename must end in {' or '.join(ingest_service.WORKBOOK_EXTS)}")
+        vendor = self._param("vendor")
+        if not vendor:
+            raise ApiError(400, "vendor is required")
+        cfg = {k: v for k in ("sheet", "sku_col", "mfg_prefix", "brand_folder") if (v := self._param(k))}
+        for key, val in (("vendor", vendor), ("brand_folder", cfg.get("brand_folder"))):
+            if val is not None and (Path(val).name != val or val in (".", "..") or "\\" in val):
+                raise ApiError(400, f"{key} must be a plain name, got {val!r}")   # it becomes a folder
+        if (header := self._param("header_row", None, int)) is not None:
+            cfg["header_row"] = header
+        for key in ("image_col", "pdf_col", "video_col", "exclude_col"):
+            if self.query.get(key):
+                cfg[key + "s"] = self.query[key]
+        for spec in self.query.get("mediatype", ()):
+            col, sep, mtype = spec.rpartition(":")
+            if not sep:
+                raise ApiError(400, f"mediatype must be <column>:<type>, got {spec!r}")
+            cfg.setdefault("mediatypes", {})[col] = mtype
+        cfg = ingest_service.resolve(vendor, cfg, resources.manufacturer_mapping()[0])
+        if not cfg["mfg_prefix"]:
+            raise ApiError(400, f"no Manufacturer ID for vendor {vendor!r}; pass mfg_prefix")
+
+        body, n = self._spool_body()
+        if not n:
+            raise ApiError(400, "empty workbook")
+        with body:
+            job_id = self.server.jobs.submit(body, name, cfg, self._owner())
+        self._json(202, dict(job_id=job_id, kind="generate", status="queued"))
+
+    def classify(self) -> None:
+        pool = scheduler.pool("classify")
+        url  = self._param("url")
+        if url:
+            fut = pool.submit(self._owner(), ic.classify_from_url, url)
+        else:
+            body, n = self._spool_body()
+            if not n:
+                raise ApiError(400, "send image bytes or ?url=")
+            with body:
+                fut = pool.submit(self._owner(), ic.classify_from_bytes, body.read())
+        self._json(200, asdict(fut.result()))
+
+    def classify_job(self) -> None:
+        body, _ = self._spool_body()
+        with body:
+            if "json" in self.headers.get("Content-Type", ""):
+                try:
+                    doc = json.load(body)
+                except ValueError as exc:
+                    raise ApiError(400, f"bad JSON: {exc}") from None
+                urls = doc.get("urls", []) if isinstance(doc, dict) else doc
+            else:
+                urls = [line.strip() for line in io.TextIOWrapper(body, "utf-8", errors="replace")]
+        urls = [u for u in urls if isinstance(u, str) and u.startswith("http")]
+        if not urls:
+            raise ApiError(400, "no http(s) URLs in the body")
+        limits = dict(max_calls=self._param("max_calls", None, int),
+                      max_seconds=self._param("max_seconds", None, float),
+                      max_spend=self._param("max_spend", None, float))
+        budget = Budget(**limits) if any(v is not None for v in limits.values()) else None
+        job_id = classify_jobs.submit_job(_plan(urls), meta={"session": self._owner(), "source": "api"},
+                                          budget=budget)
+        self._json(202, dict(job_id=job_id, kind="classify", status="running", urls=len(urls)))
+
+    def resize(self) -> None:
+        size = (self._param("width", 1000, int), self._param("height", 1000, int))
+        if not all(0 < s <= MAX_SIDE for s in size):
+            raise ApiError(400, f"width and height must be 1..{MAX_SIDE}")
+        mode = self._param("mode", "fixed")
+        if mode not in ENCODE_MODES:
+            raise ApiError(400, f"mode must be one of {', '.join(ENCODE_MODES)}")
+        d        = image_resizer.DEFAULT_ENCODE
+        settings = image_resizer.EncodeSettings(mode=mode, quality=self._param("quality", d.quality, int),
+                                                max_kb=self._param("max_kb", d.max_kb, int))
+        render = partial(_render, size=size, settings=settings)
+        pool   = scheduler.pool("resize")
+        owner  = self._owner()
+
+        url = self._param("url")
+        if url:
+            try:
+                jpeg = pool.submit(owner, image_resizer.render_url, url, size, settings).result()[0]
+            except UnidentifiedImageError:
+                raise ApiError(415, f"not an image: {url}") from None
+            except OSError as exc:          # requests' errors are OSErrors too
+                raise ApiError(502, f"could not fetch {url}: {exc}") from None
+            name = Path(urlsplit(url).path).name or "image.jpg"
+            return self._send(200, "image/jpeg", jpeg, {
+                "Content-Disposition": f'attachment; filename="{image_resizer.output_name(name, set())}"'})
+
+        body, n = self._spool_body()
+        with body:
+            head = body.read(16)
+            body.seek(0)
+            if image_resizer.sniff_image(head):
+                name = self._param("filename") or self.headers.get("X-Filename") or "image.jpg"
+                jpeg = pool.submit(owner, render, (name, body.read())).result()
+                return self._send(200, "image/jpeg", jpeg, {
+                    "Content-Disposition": f'attachment; filename="{image_resizer.output_name(name, set())}"'})
+            items = image_resizer.iter_archive_images(body)
+            try:                            # read the first member before committing to a 200
+                first = next(items, None) if n else None
+            except (tarfile.TarError, zipfile.BadZipFile, EOFError, OSError):
+                first = None
+            if first is None:
+                raise ApiError(415, "body is neither an image nor a ZIP / TAR archive of images")
+
+            out = self._stream("application/zip",
+                               {"Content-Disposition": 'attachment; filename="resized_images.zip"'})
+            used, errors = set(), []
+            with zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as zf:
+                for (name, _), fut in pool.map_unordered(owner, render, chain([first], items),
+                                                         window=RESIZE_WINDOW):
+                    try:
+                        zf.writestr(image_resizer.output_name(name, used), fut.result())
+                    except Exception as exc:
+                        errors.append(f"{name}: {exc}")
+                if errors:
+                    zf.writestr("errors.txt", "\n".join(errors) + "\n")
+            out.close()
+
+    def job_status(self, job_id: str) -> None:
+        rec = self.server.jobs.record(job_id)
+        if rec is None:
+            rec = classify_jobs.get_status(job_id)
+            if rec is None:
+                raise ApiError(404, f"no job {job_id}")
+            rec = {**rec, "kind": "classify"}
+        else:
+            rec = {k: v for k, v in rec.items() if k not in ("outputs", "submitted")}
+        self._json(200, rec)
+
+    def job_result(self, job_id: str) -> None:
+        rec = self.server.jobs.record(job_id)
+        if rec is not None:
+            if rec["status"] != "done":
+                raise ApiError(409 if rec["status"] in ("queued", "running") else 404,
+                               f"job is {rec['status']}, no template")
+            return self._send_file(Path(rec["outputs"][0]),
+                                   "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        status = classify_jobs.get_status(job_id)
+        if status is None:
+            raise ApiError(404, f"no job {job_id}")
+        out = self._stream("application/x-ndjson", {"X-Job-Status": status["status"]})
+        for rec in classify_jobs.iter_results(job_id):
+            out.write(json.dumps(rec).encode() + b"\n")
+        out.close()
+
+    def job_log(self, job_id: str) -> None:
+        rec = self.server.jobs.record(job_id)
+        if rec is None or not rec.get("outputs"):
+            raise ApiError(404, f"no log for job {job_id}")
+        self._send_file(Path(rec["outputs"][-1]), "text/plain; charset=utf-8")
+
+    def job_cancel(self, job_id: str) -> None:
+        if self.server.jobs.record(job_id) is not None:
+            return self._json(200, dict(job_id=job_id, cancelled=self.server.jobs.cancel(job_id)))
+        if classify_jobs.get_status(job_id) is None:
+            raise ApiError(404, f"no job {job_id}")
+        classify_jobs.cancel_job(job_id)
+        self._json(200, dict(job_id=job_id, cancelled=True))
+
+
+ROUTES = [(m, re.compile(p), name) for m, p, name in (
+    ("GET",    r"/health",                        "health"),
+    ("POST",   r"/v1/generate",                   "generate"),
+    ("POST",   r"/v1/classify",                   "classify"),
+    ("POST",   r"/v1/classify/jobs",              "classify_job"),
+    ("POST",   r"/v1/resize",                     "resize"),
+    ("GET",    rf"/v1/jobs/{_JOB_ID}",            "job_status"),
+    ("GET",    rf"/v1/jobs/{_JOB_ID}/result",     "job_result"),
+    ("GET",    rf"/v1/jobs/{_JOB_ID}/log",        "job_log"),
+    ("DELETE", rf"/v1/jobs/{_JOB_ID}",            "job_cancel"),
+)]
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, workers: int, max_body_mb: int, verbose: bool):
+        super().__init__(addr, Handler)
+        self.jobs     = GenerateJobs(workers)
+        self.max_body = max_body_mb << 20
+        self.verbose  = verbose
+
+
+# ---------------------------------------------------------------------------
+# PUBLIC
+# ---------------------------------------------------------------------------
+def serve(host: str = "127.0.0.1", port: int = 0, workers: int = 2,
+          max_body_mb: int = MAX_BODY_MB, verbose: bool = False):
+    """Start the API on a daemon thread; returns (server, base_url)."""
+    ic.KEEP_THUMBNAILS = False              # no gallery to feed in this process
+    server = ApiServer((host, port), workers, max_body_mb, verbose)
+    threading.Thread(target=server.serve_forever, name="api", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m api_server",
+                                 description="HTTP API for template generation, classification and resizing.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8700)
+    ap.add_argument("-j", "--workers", type=int, default=2, help="workbooks generated concurrently")
+    ap.add_argument("--max-body-mb", type=int, default=MAX_BODY_MB, help="largest accepted request body")
+    ap.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    args = ap.parse_args(argv)
+
+    server, base = serve(args.host, args.port, args.workers, args.max_body_mb, args.verbose)
+    print(f"API on {base}  ({args.workers} generate worker(s), classify pool "
+          f"{scheduler.POOL_SIZES['classify']}, resize pool {scheduler.POOL_SIZES['resize']})", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        server.jobs.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
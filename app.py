@@ -402,6 +402,10 @@ select:focus {
 </style>
 """, unsafe_allow_html=True)
 
+# Warm pandas / the classifier stack / HTTP pool in the background (once per server)
+import resources
+resources.prewarm()
+
 # Sidebar navigation
 with st.sidebar:
     st.markdown("### Navigation")
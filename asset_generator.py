@@ -1,11 +1,21 @@
+from __future__ import annotations
+
 import streamlit as st
-import pandas as pd
 import io
+import os
+import time
 import traceback
 from pathlib import Path
-from collections import Counter
+from urllib.parse import unquote, urlsplit, urlunsplit
+
+import classify_jobs
+import claude_budget
+import sampling
+import thumbnail_cache
+from classify_metrics import RunMetrics
+import resources
 
-import image_classifier as ic
+pd = resources.lazy_module('pandas')     # ~0.4 s; only paid once a workbook is uploaded
 
 
 # ===========================================================================
@@ -163,12 +173,128 @@ def find_url_columns(df: pd.DataFrame) -> list[dict]:
     return results
 
 
+# ===========================================================================
+# CLASSIFICATION PLAN  (URL dedupe + fan-out)
+# ===========================================================================
+
+def normalize_url(url: str, strip_query: bool = False) -> str:
+    """Canonical form used to spot the same asset referenced twice."""
+    parts = urlsplit(url.strip())
+    query = '' if strip_query else parts.query
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ''))
+
+def plan_classification(df: pd.DataFrame, chosen: list, url_cols: list[dict],
+                        strip_query: set | None = None) -> dict:
+    """Deduplicate URLs across all chosen columns.
+
+    Returns dict(unique={norm_url: fetch_url}, refs={norm_url: [(row_idx, col, paired_filename)]},
+    total=<URL references>).  Columns in *strip_query* ignore query strings when comparing.
+    """
+    strip_query = strip_query or set()
+    paired_map  = {u['col']: u['paired'] for u in url_cols}
+    unique, refs, total = {}, {}, 0
+    for col in chosen:
+        urls = df[col].dropna().astype(str).str.strip()
+        urls = urls[urls.str.startswith('http')]
+        paired = paired_map.get(col)
+        fnames = (df.loc[urls.index, paired] if paired and paired in df.columns
+                  else pd.Series('', index=urls.index))
+        for idx, url in urls.items():
+            v     = fnames.at[idx]
+            fname = str(v).strip() if pd.notna(v) else ""
+            norm  = normalize_url(url, col in strip_query)
+            unique.setdefault(norm, url)
+            refs.setdefault(norm, []).append((int(idx), col, fname))
+            total += 1
+    return dict(unique=unique, refs=refs, total=total)
+
+
+# ===========================================================================
+# CLASSIFICATION JOIN  ->  per-image mediatype + main image
+# ===========================================================================
+
+# classifier label -> template mediatype; a main_product_image that is not
+# picked as the SKU's main image is another view of the product
+LABEL_MEDIATYPE      = {'lifestyle':'lifestyle','informational':'informational','dimension':'dimension',
+                        'swatch':'swatch','detail':'detail','main_product_image':'angle'}
+LABEL_MIN_CONFIDENCE = 65   # the classifier's own "confident" bar; weaker labels are ignored
+
+def label_index(store) -> pd.DataFrame:
+    """Classifier results keyed by (row_idx, filename) -> label, confidence.
+
+    filename is the URL column's paired filename cell, else the URL's file name.
+    Errors and low-confidence results are dropped; the best result wins per key.
+    """
+    empty = pd.DataFrame({'label': pd.Series(dtype=str), 'confidence': pd.Series(dtype='int8')},
+                         index=pd.MultiIndex.from_arrays([[], []], names=['row_idx', 'filename']))
+    if store is None or not len(store):
+        return empty
+    f = store.to_frame({'row_idx':'row_idx','filename':'paired_filename','url':'url',
+                        'label':'label','confidence':'confidence','stage':'stage'})
+    f = f[(f['stage'] != 'error') & (f['confidence'] >= LABEL_MIN_CONFIDENCE)]
+    if f.empty:
+        return empty
+    paired   = f['filename'].astype(str).str.strip()
+    from_url = f['url'].astype(str).map(lambda u: unquote(urlsplit(u).path.rsplit('/', 1)[-1]))
+    f = f.assign(filename=paired.where(paired != '', from_url), label=f['label'].astype(str))
+    f = f.sort_values('confidence', ascending=False, kind='stable').drop_duplicates(['row_idx','filename'])
+    return f.set_index(['row_idx','filename'])[['label','confidence']]
+
+def _image_cells(df, mfg_prefix, sku_col, image_cols) -> dict:
+    """{row_idx: [(col, stem, code)]} for the image cells _process writes: rows with a
+    SKU, image extensions only, first occurrence of each code."""
+    cells, seen = {}, set()
+    cols = [c for c in image_cols if c in df.columns]
+    for row_idx, row in df.iterrows():
+        raw_sku = row[sku_col]
+        if pd.isna(raw_sku) or str(raw_sku).strip() == '': continue
+        for col in cols:
+            cell = row[col]
+            if pd.isna(cell) or str(cell).strip() == '': continue
+            filename = str(cell).strip()
+            stem = Path(filename).stem
+            if Path(filename).suffix.lower() not in IMAGE_EXTS: continue
+            code = f"{mfg_prefix}_{_clean_code(stem)}_new_1k"
+            if code in seen: continue
+            seen.add(code)
+            cells.setdefault(row_idx, []).append((col, stem, code))
+    return cells
+
+def _join_labels(df, sku_col, image_cols, labels, emitted=None) -> tuple[dict, set]:
+    """({(row_idx, col): label}, {(row_idx, col) picked as its SKU's main image}).
+
+    The main image is the highest-confidence main_product_image across all of a
+    SKU's rows (ties: earlier row, then earlier column).  With *emitted*, only
+    those (row_idx, col) cells can be picked.
+    """
+    cols = [c for c in image_cols if c in df.columns]
+    if labels is None or labels.empty or not cols:
+        return {}, set()
+    wide = df[cols].assign(_row=df.index, _sku=df[sku_col].astype(str).str.strip())
+    long = wide.melt(id_vars=['_row','_sku'], value_vars=cols, var_name='_col', value_name='_file')
+    long = long.dropna(subset=['_file'])
+    long['_file'] = long['_file'].astype(str).str.strip()
+    long['_pos']  = long['_col'].map({c: i for i, c in enumerate(cols)})
+    hit = long.merge(labels, left_on=['_row','_file'], right_index=True, how='inner')
+    cand = hit[hit['label'] == 'main_product_image']
+    if emitted is not None:
+        cand = cand[[k in emitted for k in zip(cand['_row'], cand['_col'])]]
+    mains = (cand
+             .sort_values(['confidence','_row','_pos'], ascending=[False, True, True], kind='stable')
+             .drop_duplicates('_sku'))
+    return (dict(zip(zip(hit['_row'], hit['_col']), hit['label'])),
+            set(zip(mains['_row'], mains['_col'])))
+
+
 # ===========================================================================
 # PROCESSING  ->  6-column output
 # ===========================================================================
 
 def _process(df, mfg_prefix, brand_folder, sku_col,
-             image_cols, pdf_cols, video_cols, col_mediatype):
+             image_cols, pdf_cols, video_cols, col_mediatype, labels=None):
+    """Build the asset template.  With *labels* (see label_index) each image's
+    classifier label sets its mediatype and picks the SKU's main image; images
+    without a usable label fall back to *col_mediatype* / first-column-is-main."""
     log = [f"=== LOG ===", f"Prefix={mfg_prefix} Brand={brand_folder} SKU={sku_col}",
            f"Images={image_cols}", f"PDFs={pdf_cols} Videos={video_cols}", ""]
 
@@ -179,6 +305,11 @@ def _process(df, mfg_prefix, brand_folder, sku_col,
         return None, "\n".join(log)
 
     rows_out, seen, skipped = [], set(), []
+    images = _image_cells(df, mfg_prefix, actual_sku, image_cols)
+    img_labels, mains = _join_labels(df, actual_sku, image_cols, labels,
+                                     emitted={(r, c) for r, cells in images.items() for c, _, _ in cells})
+    main_skus = {str(df.at[r, actual_sku]).strip() for r, _ in mains}
+    n_labelled = 0
 
     for row_idx, row in df.iterrows():
         raw_sku = row[actual_sku]
@@ -186,23 +317,18 @@ def _process(df, mfg_prefix, brand_folder, sku_col,
             skipped.append(f"Row {row_idx+2}: empty SKU"); continue
         sku         = str(raw_sku).strip()
         product_ref = f"{mfg_prefix}_{sku}"
-        main_done   = False
+        main_done   = sku in main_skus          # the classifier already picked this SKU's main
 
-        for col in image_cols:
-            if col not in df.columns: continue
-            cell = row[col]
-            if pd.isna(cell) or str(cell).strip() == '': continue
-            filename = str(cell).strip()
-            stem = Path(filename).stem
-            if Path(filename).suffix.lower() not in IMAGE_EXTS: continue
-            code = f"{mfg_prefix}_{_clean_code(stem)}_new_1k"
-            if code in seen: continue
+        for col, stem, code in images.get(row_idx, []):
             seen.add(code)
-            if not main_done:
+            label = img_labels.get((row_idx, col))
+            n_labelled += label is not None
+            if (row_idx, col) in mains or not main_done:
                 fam, folder, mtype = 'main_product_image','products',''
                 main_done = True
             else:
-                fam, folder, mtype = 'media','media', col_mediatype.get(col,'detail')
+                fam, folder = 'media','media'
+                mtype = LABEL_MEDIATYPE.get(label) or col_mediatype.get(col,'detail')
             rows_out.append({"code":code,"label-en_US":code,"product_reference":product_ref,
                              "imagelink":f"{brand_folder}/{folder}/{stem}_new_1k.jpg",
                              "assetFamilyIdentifier":fam,"mediatype":mtype})
@@ -241,6 +367,8 @@ def _process(df, mfg_prefix, brand_folder, sku_col,
 
     log.append("=== SUMMARY ===")
     log.append(f"Total: {len(output_df)}")
+    if labels is not None:
+        log.append(f"  classifier labels applied: {n_labelled} images, main image picked for {len(main_skus)} SKUs")
     for fam in ('main_product_image','media','spec_sheet','install_sheet'):
         log.append(f"  {fam}: {int((output_df['assetFamilyIdentifier']==fam).sum())}")
     if skipped:
@@ -253,123 +381,101 @@ def _process(df, mfg_prefix, brand_folder, sku_col,
 # STREAMLIT UI
 # ===========================================================================
 
-def show():
-    st.markdown('<div class="title">Asset Template Generator</div>', unsafe_allow_html=True)
-    st.markdown('<div class="subtitle">Two-step AI detection  |  URL image classifier  |  manual fallback</div>', unsafe_allow_html=True)
-
-    @st.cache_data
-    def _load_mfg():
-        try:
-            mdf = pd.read_excel("Manufacturer_ID_s.xlsx")
-            return (dict(zip(mdf["Brand"].str.strip(), mdf["Manu ID"].astype(str))),
-                    sorted(mdf["Brand"].str.strip().tolist()))
-        except Exception:
-            return {}, []
-
-    mfg_mapping, vendor_list = _load_mfg()
-
-    for k in ('selected_sheet','header_row','classify_results'):
-        if k not in st.session_state:
-            st.session_state[k] = None
-
-    # ── 1  CONFIG ──────────────────────────────────────────────────────
-    st.markdown("### Configuration")
-    st.markdown("---")
-    c1,c2,c3 = st.columns(3)
-    with c1:
-        vendor_name = st.selectbox("Vendor Name", [""]+vendor_list) if vendor_list else st.text_input("Vendor Name")
-    with c2:
-        mfg_prefix = st.text_input("Manufacturer ID",
-                                   value=mfg_mapping.get(vendor_name,"") if vendor_name else "",
-                                   placeholder="2605")
-    with c3:
-        brand_folder = st.text_input("Brand Folder",
-                                     value=vendor_name.lower().replace(" ","") if vendor_name else "",
-                                     placeholder="afx")
-
-    # ── 2  UPLOAD ──────────────────────────────────────────────────────
-    st.markdown("### Upload Files")
-    st.markdown("---")
-    c1,c2 = st.columns(2)
-    with c1: vendor_file   = st.file_uploader("Vendor Data File",      type=["xlsx","xls"])
-    with c2: template_file = st.file_uploader("Asset Template (empty)", type=["xlsx"])
-
-    # ── 3  SHEET ───────────────────────────────────────────────────────
-    selected_sheet = None
-    if vendor_file:
-        try:
-            sheets = pd.ExcelFile(vendor_file).sheet_names
-            if len(sheets) > 1:
-                st.markdown("---")
-                st.markdown("### Select Sheet")
-                cols = st.columns(min(len(sheets),5))
-                for i, s in enumerate(sheets):
-                    with cols[i%5]:
-                        t = "primary" if st.session_state.selected_sheet == s else "secondary"
-                        if st.button(s, key=f"sh_{i}", use_container_width=True, type=t):
-                            st.session_state.selected_sheet = s
-                            st.session_state.header_row     = None
-                            st.session_state.classify_results = None
-                            st.rerun()
-                if st.session_state.selected_sheet:
-                    selected_sheet = st.session_state.selected_sheet
-                    st.success(f"Selected: {selected_sheet}")
-            else:
-                selected_sheet = sheets[0]
-                st.session_state.selected_sheet = selected_sheet
-        except Exception as e:
-            st.error(str(e))
-
-    # ── 4  HEADER ROW ─────────────────────────────────────────────────
-    header_row = None
-    if vendor_file and selected_sheet:
-        st.markdown("---")
-        st.markdown("### Select Header Row")
-        try:
-            st.dataframe(pd.read_excel(vendor_file, sheet_name=selected_sheet, header=None, nrows=5),
-                         use_container_width=True)
-        except Exception: pass
-        pick       = st.selectbox("Which row has column names?", list(range(1,6)),
-                                  format_func=lambda x: f"Row {x}", index=1, key="hdr_pick")
-        header_row = pick - 1
-        st.session_state.header_row = header_row
-
-    # ── 5  SKU ─────────────────────────────────────────────────────────
-    sku_col     = None
-    all_columns = []
-    if vendor_file and selected_sheet and header_row is not None:
-        st.markdown("---")
-        st.markdown("### Select SKU Column")
-        try:
-            tmp         = pd.read_excel(vendor_file, sheet_name=selected_sheet, header=header_row, nrows=0)
-            all_columns = [str(c) for c in tmp.columns]
-            auto_sku    = _auto_detect_sku(all_columns)
-            if auto_sku:
-                st.success(f"Auto-detected SKU column: **{auto_sku}**")
-            c1,c2 = st.columns(2)
-            with c1:
-                didx    = (all_columns.index(auto_sku)+1) if auto_sku in all_columns else 0
-                sku_col = st.selectbox("Pick from file columns",
-                                       ["-- select --"]+all_columns, index=didx)
-                if sku_col == "-- select --": sku_col = None
-            with c2:
-                manual = st.text_input("Or type column name", placeholder="e.g. Model Number")
-                if manual.strip(): sku_col = manual.strip()
-            if sku_col:
-                st.info(f"Using SKU column: **{sku_col}**")
-        except Exception as e:
-            st.error(str(e))
-
-    # ── 6  COLUMN DETECTION + MANUAL FALLBACK ─────────────────────────
+JOB_POLL_SECONDS = 2
+GALLERY_PAGE     = 12       # thumbnails per gallery page
+MTYPE_OPTIONS    = ['lifestyle','angle','informational','dimension','swatch','detail']
+
+
+# ---------------------------------------------------------------------------
+# Cached inputs  --  keyed by the upload's identity, so a rerun that does not
+# change the file / sheet / header row never touches Excel again
+# ---------------------------------------------------------------------------
+def _file_key(f) -> tuple:
+    return (f.name, f.size, getattr(f, 'file_id', None))
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _file_sha256(file_key, _f) -> str:
+    """Content hash of the upload: ties a classification job to these exact bytes."""
+    import hashlib
+    return hashlib.sha256(_f.getvalue()).hexdigest()
+
+@st.cache_data(max_entries=16, show_spinner="Profiling workbook …")
+def _profile(file_key, _f):
+    """Sheet names, previews and ranked sheet / header / SKU suggestions, one read."""
+    import workbook_profiler
+    return workbook_profiler.profile_workbook(_f, file_key[0])
+
+@st.cache_resource(max_entries=4, show_spinner="Reading sheet …")
+def _read_sheet(file_key, _f, sheet, header):
+    """Whole sheet, shared across reruns and sessions -- treat as read-only."""
+    return pd.read_excel(_f, sheet_name=sheet, header=header)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _detect(file_key, _f, sheet, header):
+    return detect_columns(_read_sheet(file_key, _f, sheet, header))
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _url_columns(file_key, _f, sheet, header):
+    return find_url_columns(_read_sheet(file_key, _f, sheet, header))
+
+
+# ---------------------------------------------------------------------------
+# Rerun timing  --  full page runs record every section; a fragment rerun
+# (only that section re-executes) reports its own cost in place
+# ---------------------------------------------------------------------------
+def _section_done(name: str, t0: float):
+    ms = (time.perf_counter() - t0) * 1000
+    if st.session_state.get('_full_run'):
+        st.session_state.rerun_sections[name] = ms
+    else:
+        st.caption(f"Rerun: only **{name}** re-executed — {ms:.0f} ms")
+
+
+def _show_rerun_timing(page_t0: float):
+    sections = st.session_state.rerun_sections
+    total    = (time.perf_counter() - page_t0) * 1000
+    with st.expander(f"Rerun timing  —  last full page run {total:.0f} ms"):
+        st.caption("Widgets inside a section only re-run that section; "
+                   "config / upload / sheet / header / SKU changes re-run the page.")
+        if sections:
+            st.caption('  ·  '.join(f"{name} {ms:.0f} ms" for name, ms in sections.items()))
+
+
+def _show_sample_report(rep: dict):
+    st.markdown("#### Sample Preview")
+    m1, m2, m3 = st.columns(3)
+    with m1: st.metric("Unique URLs", rep['unique_urls'])
+    with m2: st.metric("Projected Claude calls", f"~{rep['projected_claude_calls']}")
+    with m3: st.metric("Projected runtime", f"~{rep['projected_seconds'] / 60:.1f} min")
+    for col, c in rep['columns'].items():
+        st.caption(f"**{col}** — sampled {c['sampled']} of {c['population']} "
+                   f"({c['stopped']}, ±{c['halfwidth'] if c['halfwidth'] is not None else '–'}), "
+                   f"{c['errors']} errors, ~{c['projected_claude_calls']} Claude calls")
+        if c['labels']:
+            st.dataframe(pd.DataFrame([{'Label': lbl, 'Share': v['share'] * 100,
+                                        '95% low': v['low'] * 100, '95% high': v['high'] * 100}
+                                       for lbl, v in c['labels'].items()]),
+                         use_container_width=True, hide_index=True,
+                         column_config={k: st.column_config.NumberColumn(format="%.1f%%")
+                                        for k in ('Share', '95% low', '95% high')})
+    st.caption(f"Sample took {rep['sample_seconds']} s.")
+
+
+# ---------------------------------------------------------------------------
+# 6  COLUMN DETECTION  +  8  STATUS  +  9  GENERATE        (one fragment)
+# ---------------------------------------------------------------------------
+@st.fragment
+def _template_section(ctx: dict):
+    t0 = time.perf_counter()
+    vendor_file, sheet, header_row = ctx['vendor_file'], ctx['sheet'], ctx['header_row']
     final_image_cols, final_pdf_cols, final_video_cols = [], [], []
     col_mediatype = {}
 
-    if vendor_file and selected_sheet and header_row is not None:
+    if vendor_file and sheet and header_row is not None:
         st.markdown("---")
         st.markdown("### AI Column Detection")
         try:
-            full_df = pd.read_excel(vendor_file, sheet_name=selected_sheet, header=header_row)
-            det = detect_columns(full_df)
+            det = _detect(ctx['file_key'], vendor_file, sheet, header_row)
 
             c1,c2,c3,c4 = st.columns(4)
             with c1: st.metric("Images",   len(det['images']))
@@ -377,8 +483,6 @@ def show():
             with c3: st.metric("Videos",   len(det['videos']))
             with c4: st.metric("Rejected", len(det['skipped']))
 
-            MTYPE_OPTIONS = ['lifestyle','angle','informational','dimension','swatch','detail']
-
             if det['images']:
                 st.markdown("#### Detected Image Columns")
                 for entry in det['images']:
@@ -416,7 +520,7 @@ def show():
 
             # manual fallback
             already   = set(final_image_cols + final_pdf_cols + final_video_cols)
-            remaining = [c for c in all_columns if c not in already and not _is_url_column(c)]
+            remaining = [c for c in ctx['all_columns'] if c not in already and not _is_url_column(c)]
             if remaining:
                 st.markdown("---")
                 st.markdown("#### Add Columns Manually")
@@ -443,152 +547,14 @@ def show():
             st.error(str(e))
             st.code(traceback.format_exc())
 
-    # ── 7  URL IMAGE CLASSIFIER  ───────────────────────────────────────
-    if vendor_file and selected_sheet and header_row is not None:
-        st.markdown("---")
-        st.markdown("### Classify Images from URLs")
-        st.caption("Downloads images from URL columns → Pillow heuristics (instant) → "
-                   "Claude vision for uncertain ones (1-3 s each, very accurate).")
-        try:
-            full_df  = pd.read_excel(vendor_file, sheet_name=selected_sheet, header=header_row)
-            url_cols = find_url_columns(full_df)
-
-            if url_cols:
-                url_col_names = [u['col'] for u in url_cols]
-                st.markdown(f"Found **{len(url_cols)}** URL column(s) with downloadable assets:")
-                for u in url_cols:
-                    paired_txt = f" (paired with **{u['paired']}**)" if u['paired'] else ""
-                    st.caption(f"  {u['col']} — {u['count']} URLs{paired_txt}  |  e.g. {u['sample'][:70]}")
-
-                chosen = st.multiselect("Select URL columns to classify", url_col_names,
-                                        default=[], key="chosen_url_cols")
-
-                if chosen:
-                    total_urls = sum(
-                        int(full_df[col].dropna().astype(str).str.startswith('http').sum())
-                        for col in chosen
-                    )
-                    st.info(f"Will classify **{total_urls}** images.  "
-                            f"Heuristic is instant; uncertain ones go to Claude (~1-3 s each).")
-
-                    if st.button("Run Image Classification", key="run_classify", type="primary"):
-                        results  = []
-                        progress = st.progress(0)
-                        status   = st.empty()
-                        done     = 0
-
-                        import requests as _req
-
-                        for col in chosen:
-                            urls = full_df[col].dropna().astype(str)
-                            urls = urls[urls.str.startswith('http')]
-
-                            # find paired filename col
-                            paired = None
-                            for u in url_cols:
-                                if u['col'] == col and u['paired']:
-                                    paired = u['paired']; break
-
-                            for idx, url in urls.items():
-                                url = url.strip()
-                                status.text(f"Classifying {done+1}/{total_urls} …  ({col})")
-
-                                res = ic.classify_from_url(url)
-
-                                orig_fname = ""
-                                if paired and paired in full_df.columns:
-                                    v = full_df.at[idx, paired]
-                                    if pd.notna(v): orig_fname = str(v).strip()
-
-                                results.append(dict(
-                                    url=url, source_col=col,
-                                    paired_filename=orig_fname,
-                                    label=res.label, confidence=res.confidence,
-                                    stage=res.stage, details=res.details,
-                                    row_idx=int(idx),
-                                ))
-                                done += 1
-                                progress.progress(done / total_urls if total_urls else 1)
-
-                        progress.empty()
-                        status.empty()
-                        st.session_state.classify_results = results
-            else:
-                st.caption("No URL columns with downloadable images found in this sheet.")
-
-        except Exception as e:
-            st.error(str(e))
-            st.code(traceback.format_exc())
-
-    # ── display classification results ─────────────────────────────────
-    if st.session_state.classify_results:
-        results = st.session_state.classify_results
-        st.markdown("---")
-        st.markdown("### Classification Results")
-
-        labels  = [r['label'] for r in results]
-        counts  = Counter(labels)
-        heur_n  = sum(1 for r in results if r['stage'] == 'heuristic')
-        claude_n= sum(1 for r in results if r['stage'] == 'claude_api')
-        err_n   = sum(1 for r in results if r['stage'] == 'error')
-
-        # summary row
-        metric_cols = st.columns(min(len(counts) + 3, 7))
-        for i, (lbl, cnt) in enumerate(counts.most_common()):
-            if i < len(metric_cols) - 3:
-                with metric_cols[i]: st.metric(lbl, cnt)
-        with metric_cols[-3]: st.metric("Heuristic",  heur_n)
-        with metric_cols[-2]: st.metric("Claude API", claude_n)
-        with metric_cols[-1]: st.metric("Errors",     err_n)
-
-        # results table
-        st.markdown("#### Results Table")
-        table = []
-        for r in results:
-            table.append({
-                'Filename':   r['paired_filename'] or "—",
-                'Label':      r['label'],
-                'Confidence': f"{r['confidence']}%",
-                'Stage':      r['stage'],
-                'Source Col': r['source_col'],
-            })
-        st.dataframe(pd.DataFrame(table), use_container_width=True)
-
-        # image gallery  (first 12)
-        st.markdown("#### Image Preview Gallery")
-        gallery = [r for r in results if r['stage'] != 'error'][:12]
-        if gallery:
-            import requests as _req
-            from PIL import Image as _Img
-            gcols = st.columns(4)
-            for i, r in enumerate(gallery):
-                with gcols[i % 4]:
-                    try:
-                        resp = _req.get(r['url'], timeout=8)
-                        resp.raise_for_status()
-                        img  = _Img.open(io.BytesIO(resp.content))
-                        st.image(img, caption=f"{r['label']} ({r['confidence']}%)  {r['paired_filename'] or ''}")
-                    except Exception:
-                        st.caption(f"[load failed]  {r['label']}")
-
-        # download log
-        st.markdown("---")
-        log_rows = [{"filename": r['paired_filename'], "label": r['label'],
-                     "confidence": r['confidence'], "stage": r['stage'],
-                     "source_column": r['source_col'], "url": r['url'],
-                     "row_index": r['row_idx']} for r in results]
-        buf = io.BytesIO()
-        pd.DataFrame(log_rows).to_csv(buf, index=False)
-        buf.seek(0)
-        st.download_button("Download Classification Log (CSV)", data=buf,
-                           file_name="classification_log.csv", mime="text/csv")
-
     # ── 8  STATUS ──────────────────────────────────────────────────────
+    vendor_name, mfg_prefix, brand_folder = ctx['vendor_name'], ctx['mfg_prefix'], ctx['brand_folder']
+    template_file, sku_col = ctx['template_file'], ctx['sku_col']
     st.markdown("---")
     c1,c2,c3,c4,c5 = st.columns(5)
     with c1: (st.success if (vendor_name and mfg_prefix and brand_folder) else st.warning)("Config")
     with c2: (st.success if vendor_file   else st.warning)("File")
-    with c3: (st.success if selected_sheet else st.warning)("Sheet")
+    with c3: (st.success if sheet          else st.warning)("Sheet")
     with c4: (st.success if sku_col        else st.warning)("SKU Col")
     with c5: (st.success if (final_image_cols or final_pdf_cols or final_video_cols) else st.warning)("Columns")
 
@@ -596,7 +562,7 @@ def show():
     st.markdown("---")
     has_cols = bool(final_image_cols or final_pdf_cols or final_video_cols)
     ready    = all([vendor_file, template_file, vendor_name, mfg_prefix,
-                    brand_folder, selected_sheet, sku_col, header_row is not None, has_cols])
+                    brand_folder, sheet, sku_col, header_row is not None, has_cols])
 
     if not ready:
         missing = []
@@ -605,22 +571,30 @@ def show():
         if not vendor_name:      missing.append("Vendor name")
         if not mfg_prefix:       missing.append("Manufacturer ID")
         if not brand_folder:     missing.append("Brand folder")
-        if not selected_sheet:   missing.append("Sheet")
+        if not sheet:            missing.append("Sheet")
         if not sku_col:          missing.append("SKU column")
         if not has_cols:         missing.append("At least one image/PDF/video column")
         if missing:
             st.warning("Still needed: " + ", ".join(missing))
 
+    use_labels = st.checkbox("Apply URL classifier labels (per-image mediatype, best main image per SKU)",
+                             value=True, key="use_labels",
+                             help="Uses this session's classification run on this exact file, sheet and "
+                                  "header row; runs from other sessions are never applied. "
+                                  "Nothing is downloaded again.")
     if st.button("Generate Asset Template", disabled=not ready,
                  use_container_width=True, type="primary"):
         with st.spinner("Processing …"):
             try:
-                df = pd.read_excel(vendor_file, sheet_name=selected_sheet, header=header_row)
-                st.info(f"Read {len(df)} rows | sheet={selected_sheet} | header=row {header_row+1}")
+                df = _read_sheet(ctx['file_key'], vendor_file, sheet, header_row).copy()
+                st.info(f"Read {len(df)} rows | sheet={sheet} | header=row {header_row+1}")
+                labels, source = _classification_labels(ctx) if use_labels else (None, '')
+                if source:
+                    st.caption(f"Classifier labels: {len(labels)} images from {source}")
 
                 output_df, log_text = _process(
                     df, mfg_prefix, brand_folder, sku_col,
-                    final_image_cols, final_pdf_cols, final_video_cols, col_mediatype)
+                    final_image_cols, final_pdf_cols, final_video_cols, col_mediatype, labels)
 
                 if output_df is None or len(output_df) == 0:
                     st.error("No assets generated.")
@@ -654,3 +628,598 @@ def show():
             except Exception as e:
                 st.error(str(e))
                 st.code(traceback.format_exc())
+
+    # ── 9b  DOWNLOAD-ONCE PIPELINE ─────────────────────────────────────
+    if ready:
+        url_cols = _url_columns(ctx['file_key'], vendor_file, sheet, header_row)
+        paired   = [u['col'] for u in url_cols if u['paired'] in final_image_cols]
+        if paired:
+            with st.expander(f"Upload ZIP from image URLs ({len(paired)} paired column(s))"):
+                st.caption("Downloads each image once, classifies it, renders the 1000×1000 JPEG and "
+                           "stores it in a ZIP under exactly the template's imagelink path.")
+                p1, p2 = st.columns(2)
+                with p1: pipe_claude = st.checkbox("Send uncertain images to Claude", value=False,
+                                                   key="pipeline_claude",
+                                                   help="After all downloads, best candidates first "
+                                                        "(see the classifier's Claude budget)")
+                with p2: pipe_calls  = st.number_input("Max Claude calls", 1, 1_000_000, 500, 50,
+                                                       key="pipeline_claude_calls", disabled=not pipe_claude)
+                if st.button("Build Upload ZIP + Template", key="run_pipeline", use_container_width=True):
+                    try:
+                        _start_pipeline(ctx, dict(mfg_prefix=mfg_prefix, brand_folder=brand_folder,
+                                                  sku_col=sku_col, image_cols=final_image_cols,
+                                                  pdf_cols=final_pdf_cols, video_cols=final_video_cols,
+                                                  mediatypes=col_mediatype), url_cols,
+                                        claude_budget.Budget(max_calls=int(pipe_calls)) if pipe_claude else None)
+                    except Exception as e:
+                        st.error(str(e))
+                        st.code(traceback.format_exc())
+                    else:
+                        st.rerun()                  # full page: show the pipeline panel
+
+    _section_done("Columns + generate", t0)
+
+
+# ---------------------------------------------------------------------------
+# 7  URL IMAGE CLASSIFIER                                     (one fragment)
+# ---------------------------------------------------------------------------
+@st.fragment
+def _classifier_section(ctx: dict):
+    t0 = time.perf_counter()
+    vendor_file, sheet, header_row = ctx['vendor_file'], ctx['sheet'], ctx['header_row']
+    st.markdown("---")
+    st.markdown("### Classify Images from URLs")
+    st.caption("Downloads images from URL columns → Pillow heuristics (instant) → "
+               "Claude vision for uncertain ones (1-3 s each, very accurate).")
+    try:
+        url_cols = _url_columns(ctx['file_key'], vendor_file, sheet, header_row)
+
+        if url_cols:
+            url_col_names = [u['col'] for u in url_cols]
+            st.markdown(f"Found **{len(url_cols)}** URL column(s) with downloadable assets:")
+            for u in url_cols:
+                paired_txt = f" (paired with **{u['paired']}**)" if u['paired'] else ""
+                st.caption(f"  {u['col']} — {u['count']} URLs{paired_txt}  |  e.g. {u['sample'][:70]}")
+
+            chosen = st.multiselect("Select URL columns to classify", url_col_names,
+                                    default=[], key="chosen_url_cols")
+
+            if chosen:
+                strip_cols = st.multiselect(
+                    "Ignore query strings when matching duplicate URLs in", chosen,
+                    default=[], key="strip_query_cols",
+                    help="Treat https://cdn/x.jpg?v=1 and ?v=2 as the same image in these columns")
+                full_df = _read_sheet(ctx['file_key'], vendor_file, sheet, header_row)
+                plan = plan_classification(full_df, chosen, url_cols, set(strip_cols))
+                total_urls  = plan['total']
+                unique_urls = len(plan['unique'])
+                st.info(f"Will classify **{unique_urls}** unique images "
+                        f"({total_urls} URL references, {total_urls - unique_urls} duplicates reuse a result).  "
+                        f"Heuristic is instant; uncertain ones go to Claude (~1-3 s each).")
+
+                with st.expander("Claude budget (cap calls, time or spend)"):
+                    use_budget = st.checkbox("Limit the Claude stage", key="use_budget",
+                                             help="Uncertain images are queued and sent to Claude "
+                                                  "main-image columns first, then unique pictures, then "
+                                                  "lowest confidence; the rest keep their heuristic label "
+                                                  "as 'budget_skipped'.")
+                    k1, k2, k3 = st.columns(3)
+                    with k1: max_calls = st.number_input("Max Claude calls (0 = no limit)", 0, 1_000_000, 500, 50,
+                                                         key="budget_calls", disabled=not use_budget)
+                    with k2: max_min   = st.number_input("Max Claude minutes (0 = no limit)", 0.0, 1440.0, 0.0, 5.0,
+                                                         key="budget_minutes", disabled=not use_budget,
+                                                         help="Wall-clock length of the Claude phase, "
+                                                              "which starts after every URL is classified")
+                    with k3: max_usd   = st.number_input("Max spend, USD (0 = no limit)", 0.0, 10_000.0, 0.0, 1.0,
+                                                         key="budget_usd", disabled=not use_budget,
+                                                         help=f"Estimated at ${claude_budget.COST_PER_CALL_USD} per call")
+                budget = claude_budget.Budget(max_calls=int(max_calls) or None,
+                                              max_seconds=max_min * 60 or None,
+                                              max_spend=max_usd or None) if use_budget else None
+
+                b1, b2 = st.columns(2)
+                with b1:
+                    if st.button("Run Image Classification", key="run_classify", type="primary",
+                                 use_container_width=True):
+                        st.session_state.classify_results = None
+                        st.session_state.classify_job = classify_jobs.submit_job(
+                            plan, meta=dict(vendor_file=vendor_file.name, sheet=sheet, header_row=header_row,
+                                            file_sha256=_file_sha256(ctx['file_key'], vendor_file),
+                                            columns=list(chosen), session=resources.session_id()),
+                            budget=budget)
+                        st.rerun()                  # full page: show the job panel
+                with b2:
+                    run_sample = st.button("Sample Preview (estimate label mix)", key="run_sample",
+                                           use_container_width=True)
+                with st.expander("Sample preview settings"):
+                    s1, s2 = st.columns(2)
+                    with s1:
+                        halfwidth = st.slider("Target precision (± share)", 0.03, 0.20, 0.10, 0.01,
+                                              key="sample_halfwidth",
+                                              help="Stop a column once every label's 95% interval is this tight")
+                    with s2:
+                        max_per_col = st.number_input("Max URLs per column", 20, 2000, 400, 20,
+                                                      key="sample_max")
+                if run_sample:
+                    bar = st.progress(0.0, text="Sampling…")
+                    st.session_state.sample_report = sampling.run_sample(
+                        plan, halfwidth=halfwidth, max_per_column=int(max_per_col),
+                        owner=resources.session_id(),
+                        on_progress=lambda n, b: bar.progress(min(n / max(b, 1), 1.0),
+                                                               text=f"Sampled {n} URLs"))
+                    bar.empty()
+                if st.session_state.sample_report:
+                    _show_sample_report(st.session_state.sample_report)
+        else:
+            st.caption("No URL columns with downloadable images found in this sheet.")
+
+    except Exception as e:
+        st.error(str(e))
+        st.code(traceback.format_exc())
+
+    _section_done("URL classifier", t0)
+
+
+# ---------------------------------------------------------------------------
+# Background job panel  (polls as a fragment; the page only reruns on finish)
+# ---------------------------------------------------------------------------
+def _job_panel():
+    """Progress for the session's classification job + resume for interrupted ones."""
+    job_id = st.session_state.classify_job
+
+    if not job_id:
+        stale = [j for j in classify_jobs.list_jobs(session=resources.session_id())
+                 if j['status'] in ('interrupted', 'cancelled')]
+        if stale:
+            with st.expander(f"Unfinished classification jobs ({len(stale)})"):
+                for j in stale[:10]:
+                    m = j['meta']
+                    c1, c2 = st.columns([3, 1])
+                    with c1:
+                        st.caption(f"{j['job_id']}  |  {m.get('vendor_file','')} / {m.get('sheet','')}  |  "
+                                   f"{j['done']}/{j['total']} done  |  {j['status']}  |  {m.get('created','')}")
+                    with c2:
+                        if st.button("Resume", key=f"resume_{j['job_id']}"):
+                            classify_jobs.resume_job(j['job_id'], resources.session_id())
+                            st.session_state.classify_job = j['job_id']
+                            st.rerun()
+        return
+
+    status = classify_jobs.get_status(job_id)
+    if status is None:
+        st.session_state.classify_job = None
+        return
+
+    st.markdown(f"#### Classification job `{job_id}`")
+    total = status['total'] or 1
+    st.progress(status['done'] / total)
+    c1, c2, c3, c4 = st.columns(4)
+    with c1: st.metric("Done",       f"{status['done']}/{status['total']}")
+    with c2: st.metric("Throughput", f"{status['throughput'] or 0:.1f}/s")
+    with c3: st.metric("ETA",        f"{status['eta']:.0f}s" if status['eta'] else "—")
+    with c4: st.metric("Errors",     status['errors'])
+    if status.get('budget'):
+        b = status['budget']
+        limits = [f"{b['max_calls']} calls" if b['max_calls'] is not None else "",
+                  f"{b['max_seconds'] / 60:g} min" if b['max_seconds'] is not None else "",
+                  f"${b['max_spend']:g}" if b['max_spend'] is not None else ""]
+        st.caption(f"Claude budget ({', '.join(x for x in limits if x)}): "
+                   f"{status.get('claude_calls', 0)} calls, {status.get('claude_seconds', 0):.0f}s used"
+                   + (f"  |  {status.get('queued', 0)} uncertain images queued"
+                      if status.get('phase') == 'classify' else ""))
+
+    if status['status'] == 'running':
+        st.session_state.classify_finished = None
+        st.caption(resources.queue_summary('classify'))
+        if st.button("Cancel job", key="cancel_job"):
+            classify_jobs.cancel_job(job_id)
+    elif status['status'] == 'interrupted':
+        if st.button("Resume job", key="resume_job"):
+            classify_jobs.resume_job(job_id, resources.session_id())
+            st.rerun()
+    else:
+        if status['status'] == 'failed':
+            st.error(status['error'])
+        if st.session_state.classify_results is None:
+            # cached even when empty (failed / cancelled early), so later ticks stop re-reading it
+            st.session_state.classify_results = classify_jobs.job_results(job_id)
+            st.session_state.classify_origin  = _meta_origin(status['meta'])
+        if st.session_state.get('classify_finished') != job_id:
+            st.session_state.classify_finished = job_id
+            if not st.session_state.get('_full_run'):
+                st.rerun()                          # job just ended: render results, stop polling
+        if status['status'] == 'cancelled' and st.button("Resume job", key="resume_job"):
+            st.session_state.classify_results = None
+            classify_jobs.resume_job(job_id, resources.session_id())
+            st.rerun()
+
+
+def _show_job_panel():
+    job_id  = st.session_state.classify_job
+    running = bool(job_id) and (classify_jobs.get_status(job_id) or {}).get('status') == 'running'
+    st.fragment(_job_panel, run_every=JOB_POLL_SECONDS if running else None)()
+
+
+# ---------------------------------------------------------------------------
+# Classifier labels in the template  +  download-once pipeline (step 9)
+# ---------------------------------------------------------------------------
+def _origin(ctx: dict) -> tuple:
+    """(file contents, sheet, header row) a classification run is tied to."""
+    return (_file_sha256(ctx['file_key'], ctx['vendor_file']), ctx['sheet'], ctx['header_row'])
+
+def _meta_origin(meta: dict) -> tuple:
+    return (meta.get('file_sha256'), meta.get('sheet'), meta.get('header_row'))
+
+def _classification_labels(ctx: dict):
+    """(label_index of the run to apply, where it came from) or (None, '').
+
+    This session's results (finished job or pipeline run) if they were made on
+    the same file contents / sheet / header row, else this session's newest
+    finished job on them, read from its checkpoint.  Runs on any other input,
+    or from other sessions, are never used: _process joins on (row, filename),
+    so their labels would land on the wrong images.
+    """
+    store, job_id = st.session_state.classify_results, st.session_state.classify_job
+    origin = _origin(ctx)
+    if store and st.session_state.get('classify_origin') == origin:
+        key    = ('session', id(store))
+        source = f"classification job {job_id}" if job_id else "this session's pipeline run"
+    else:
+        store  = None
+        job_id = next((j['job_id'] for j in classify_jobs.list_jobs(session=resources.session_id())
+                       if j['status'] == 'done' and _meta_origin(j['meta']) == origin), None)
+        if job_id is None:
+            return None, ''
+        key    = (job_id, (classify_jobs.get_status(job_id) or {}).get('done'))   # a resumed job invalidates
+        source = f"classification job {job_id}"
+    cached = st.session_state.get('classify_labels')
+    if cached is None or cached[0] != key:
+        cached = st.session_state.classify_labels = (
+            key, label_index(store if store else classify_jobs.job_results(job_id)))
+    return cached[1], source
+
+PIPELINE_ZIP_MAX_MB = 200      # larger upload ZIPs are not loaded into the page: use the CLI
+
+def _start_pipeline(ctx: dict, cfg: dict, url_cols: list[dict], budget: claude_budget.Budget | None):
+    """Start the download-once pipeline for the chosen columns in the background
+    (upload ZIP + template); Claude only runs with a *budget*."""
+    import asset_pipeline
+    df = _read_sheet(ctx['file_key'], ctx['vendor_file'], ctx['sheet'], ctx['header_row']).copy()
+    o  = _origin(ctx)
+    asset_pipeline.start_run(resources.session_id(), df, cfg, url_cols,
+                             meta=dict(file_sha256=o[0], sheet=o[1], header_row=o[2]),
+                             use_claude=budget is not None, budget=budget)
+    st.session_state.pipeline_run = True
+
+
+def _pipeline_panel(ctx: dict):
+    """Progress of this session's pipeline run, then its downloads.
+
+    The ZIP is built on disk; only one under PIPELINE_ZIP_MAX_MB is read back
+    for the download button."""
+    import asset_pipeline
+    run = asset_pipeline.get_run(resources.session_id())
+    if run is None:
+        st.session_state.pipeline_run = None
+        return
+    st.markdown("#### Upload ZIP pipeline")
+    if run.status == 'running':
+        st.progress(run.done / max(run.total, 1), text=f"{run.done}/{run.total or '?'} images")
+        st.caption(resources.queue_summary('classify'))
+        return
+    if run.status == 'failed':
+        st.error(run.error)
+        return
+
+    out = run.out
+    if st.session_state.get('pipeline_finished') != id(run):
+        st.session_state.pipeline_finished = id(run)
+        st.session_state.classify_results  = out['store']     # gallery + results section, no re-download
+        st.session_state.classify_origin   = _meta_origin(run.meta)
+        st.session_state.classify_job      = None
+        st.session_state.classify_seconds  = out['seconds']
+        if not st.session_state.get('_full_run'):
+            st.rerun()                                          # run just ended: render results, stop polling
+
+    output_df = out['template']
+    c1,c2,c3,c4,c5 = st.columns(5)
+    with c1: st.metric("Downloads",      out['downloads'])
+    with c2: st.metric("Failed",         out['errors'])
+    with c3: st.metric("Claude calls",   out['claude_calls'])
+    with c4: st.metric("Renditions",     out['images'])
+    with c5: st.metric("Template rows",  0 if output_df is None else len(output_df))
+    if out['missing']:
+        st.warning(f"{len(out['missing'])} template image(s) have no rendition (no URL, or the download failed); "
+                   "see the log.")
+    name   = ctx['vendor_name']
+    zip_mb = os.path.getsize(run.zip_path) / 2**20 if os.path.exists(run.zip_path) else 0
+    c1,c2,c3 = st.columns(3)
+    with c1:
+        if zip_mb > PIPELINE_ZIP_MAX_MB:
+            st.warning(f"The upload ZIP is {zip_mb:.0f} MB, too large to serve from the page. Build it with "
+                       f"`python -m asset_pipeline <workbook> --vendor {name} --out <folder>`.")
+        elif zip_mb:
+            with open(run.zip_path, 'rb') as fp:
+                st.download_button("Download Upload ZIP", data=fp.read(), file_name=f"{name}_assets.zip",
+                                   mime="application/zip", use_container_width=True, type="primary")
+    with c2:
+        if output_df is not None and len(output_df):
+            buf = io.BytesIO()
+            with pd.ExcelWriter(buf, engine="openpyxl") as w:
+                output_df.to_excel(w, sheet_name="Sheet1", index=False)
+            st.download_button("Download Asset Template", data=buf.getvalue(),
+                               file_name=f"{name}_Asset_Template.xlsx",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                               use_container_width=True)
+    with c3:
+        st.download_button("Download Processing Log", data=out['log'], file_name=f"{name}_log.txt",
+                           mime="text/plain", use_container_width=True)
+
+
+def _show_pipeline_panel(ctx: dict):
+    import asset_pipeline
+    run     = asset_pipeline.get_run(resources.session_id())
+    running = run is not None and run.status == 'running'
+    st.fragment(_pipeline_panel, run_every=JOB_POLL_SECONDS if running else None)(ctx)
+
+
+# ---------------------------------------------------------------------------
+# Classification results
+# ---------------------------------------------------------------------------
+@st.fragment
+def _gallery(store):
+    """Thumbnails cached during classification; paging only reruns this fragment."""
+    t0 = time.perf_counter()
+    st.markdown("#### Image Preview Gallery")
+    gallery = store.rows_excluding('stage', 'error')
+    if gallery:
+        pages = (len(gallery) + GALLERY_PAGE - 1) // GALLERY_PAGE
+        page  = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages,
+                                value=1, step=1, key='gallery_page') if pages > 1 else 1
+        rows  = gallery[(page - 1) * GALLERY_PAGE : page * GALLERY_PAGE]
+        thumbs = thumbnail_cache.get_cache().get_many([store.url[r] for r in rows])
+        gcols = st.columns(4)
+        for i, row in enumerate(rows):
+            label, conf = store.label[row], store.confidence[row]
+            with gcols[i % 4]:
+                thumb = thumbs.get(store.url[row])
+                if thumb:
+                    st.image(thumb, caption=f"{label} ({conf}%)  {store.paired_filename[row] or ''}")
+                else:
+                    st.caption(f"[no preview]  {label}")
+    _section_done("Gallery", t0)
+
+
+def _exports(store) -> tuple[str, bytes]:
+    """CSV + Parquet of the run, built once per result store (not on every rerun)."""
+    cached = st.session_state.get('classify_exports')
+    if cached is None or cached[0] is not store:
+        csv_buf, pq_buf = io.StringIO(), io.BytesIO()
+        store.write_csv(csv_buf)
+        store.write_parquet(pq_buf)
+        cached = st.session_state.classify_exports = (store, csv_buf.getvalue(), pq_buf.getvalue())
+    return cached[1], cached[2]
+
+
+def _results_section(store):
+    t0 = time.perf_counter()
+    st.markdown("---")
+    st.markdown("### Classification Results")
+
+    counts  = store.counts('label')
+    stages  = store.counts('stage')
+    heur_n  = stages.get('heuristic', 0)
+    learn_n = stages.get('learned', 0)
+    claude_n= stages.get('claude_api', 0)
+    err_n   = stages.get('error', 0)
+
+    # summary row
+    metric_cols = st.columns(min(len(counts) + 4, 8))
+    for i, (lbl, cnt) in enumerate(counts.most_common()):
+        if i < len(metric_cols) - 4:
+            with metric_cols[i]: st.metric(lbl, cnt)
+    with metric_cols[-4]: st.metric("Heuristic",  heur_n)
+    with metric_cols[-3]: st.metric("Learned",    learn_n)
+    with metric_cols[-2]: st.metric("Claude API", claude_n)
+    with metric_cols[-1]: st.metric("Errors",     err_n)
+    if stages.get('budget_skipped'):
+        st.caption(f"{stages['budget_skipped']} uncertain result(s) kept their heuristic label "
+                   f"because the Claude budget ran out (stage 'budget_skipped').")
+
+    # per-stage latency  (one sample per unique URL, not per fanned-out row)
+    job_id     = st.session_state.classify_job
+    wall       = ((classify_jobs.get_status(job_id) or {}).get('elapsed') if job_id
+                  else st.session_state.classify_seconds)           # pipeline run: its own wall time
+    metrics    = RunMetrics.from_store(store, wall_seconds=wall)
+    summary    = metrics.summary()
+    with st.expander(f"Pipeline timing  —  {summary['throughput']:.2f} images/s, "
+                     f"{summary['download_bytes'] / 2**20:.1f} of "
+                     f"{summary['source_bytes'] / 2**20:.1f} MB downloaded"):
+        if summary['latency_ms']:
+            st.dataframe(pd.DataFrame(summary['latency_ms']).T[['n','p50','p95','p99','mean']],
+                         use_container_width=True)
+        c1, c2 = st.columns(2)
+        with c1:
+            st.download_button("Metrics (JSON)", data=metrics.to_json(),
+                               file_name="classification_metrics.json", mime="application/json")
+        with c2:
+            st.download_button("Metrics (Prometheus)", data=metrics.to_prometheus(),
+                               file_name="classification_metrics.prom", mime="text/plain")
+
+    # results table  (built straight from the store's columns)
+    st.markdown("#### Results Table")
+    st.dataframe(store.to_frame({'Filename': 'paired_filename', 'Label': 'label',
+                                 'Confidence': 'confidence', 'Stage': 'stage',
+                                 'Source Col': 'source_col'}),
+                 use_container_width=True,
+                 column_config={"Confidence": st.column_config.NumberColumn(format="%d%%")})
+    _section_done("Results", t0)
+
+    _gallery(store)
+
+    # download log  (streamed out of the store in chunks, once per run)
+    csv_text, parquet_bytes = _exports(store)
+    st.markdown("---")
+    c1, c2 = st.columns(2)
+    with c1:
+        st.download_button("Download Classification Log (CSV)", data=csv_text,
+                           file_name="classification_log.csv", mime="text/csv")
+    with c2:
+        st.download_button("Download Classification Log (Parquet)", data=parquet_bytes,
+                           file_name="classification_log.parquet",
+                           mime="application/vnd.apache.parquet")
+
+
+def show():
+    page_t0 = time.perf_counter()
+    st.session_state._full_run      = True
+    st.session_state.rerun_sections = {}
+
+    st.markdown('<div class="title">Asset Template Generator</div>', unsafe_allow_html=True)
+    st.markdown('<div class="subtitle">Two-step AI detection  |  URL image classifier  |  manual fallback</div>', unsafe_allow_html=True)
+
+    mfg_mapping, vendor_list = resources.manufacturer_mapping()
+
+    for k in ('selected_sheet','header_row','classify_results','classify_job','classify_seconds',
+              'sample_report','pipeline_run'):
+        if k not in st.session_state:
+            st.session_state[k] = None
+
+    # ── 1  CONFIG ──────────────────────────────────────────────────────
+    t0 = time.perf_counter()
+    st.markdown("### Configuration")
+    st.markdown("---")
+    c1,c2,c3 = st.columns(3)
+    with c1:
+        vendor_name = st.selectbox("Vendor Name", [""]+vendor_list) if vendor_list else st.text_input("Vendor Name")
+    with c2:
+        mfg_prefix = st.text_input("Manufacturer ID",
+                                   value=mfg_mapping.get(vendor_name,"") if vendor_name else "",
+                                   placeholder="2605")
+    with c3:
+        brand_folder = st.text_input("Brand Folder",
+                                     value=vendor_name.lower().replace(" ","") if vendor_name else "",
+                                     placeholder="afx")
+
+    # ── 2  UPLOAD ──────────────────────────────────────────────────────
+    st.markdown("### Upload Files")
+    st.markdown("---")
+    c1,c2 = st.columns(2)
+    with c1: vendor_file   = st.file_uploader("Vendor Data File",      type=["xlsx","xls"])
+    with c2: template_file = st.file_uploader("Asset Template (empty)", type=["xlsx"])
+    file_key = _file_key(vendor_file) if vendor_file else None
+
+    # ── 3  SHEET ───────────────────────────────────────────────────────
+    selected_sheet = None
+    profile        = None
+    if vendor_file:
+        try:
+            profile = _profile(file_key, vendor_file)
+            sheets  = profile['sheets']
+            top     = profile['suggestions'][0] if profile['suggestions'] else None
+            if top:
+                st.caption(f"Suggested: sheet **{top['sheet']}**, header row {top['header_row'] + 1}"
+                           + (f", SKU **{top['sku_col']}**" if top['sku_col'] else "")
+                           + (f", main asset column **{top['asset_col']}**" if top['asset_col'] else "")
+                           + f"  (workbook profiled in {profile['seconds']:.2f} s)")
+            if len(sheets) > 1:
+                if st.session_state.selected_sheet not in sheets and top:
+                    st.session_state.selected_sheet = top['sheet']
+                st.markdown("---")
+                st.markdown("### Select Sheet")
+                cols = st.columns(min(len(sheets),5))
+                for i, s in enumerate(sheets):
+                    with cols[i%5]:
+                        t = "primary" if st.session_state.selected_sheet == s else "secondary"
+                        if st.button(s, key=f"sh_{i}", use_container_width=True, type=t):
+                            st.session_state.selected_sheet = s
+                            st.session_state.header_row     = None
+                            st.session_state.classify_results = None
+                            st.session_state.classify_job     = None
+                            st.session_state.sample_report    = None
+                            st.rerun()
+                if st.session_state.selected_sheet:
+                    selected_sheet = st.session_state.selected_sheet
+                    st.success(f"Selected: {selected_sheet}")
+            else:
+                selected_sheet = sheets[0]
+                st.session_state.selected_sheet = selected_sheet
+        except Exception as e:
+            st.error(str(e))
+
+    # ── 4  HEADER ROW ─────────────────────────────────────────────────
+    header_row = None
+    if vendor_file and selected_sheet:
+        st.markdown("---")
+        st.markdown("### Select Header Row")
+        import workbook_profiler
+        try:
+            st.dataframe(pd.DataFrame(profile['preview'][selected_sheet]),
+                         use_container_width=True)
+        except Exception: pass
+        suggested  = workbook_profiler.best_for(profile, selected_sheet)
+        pick       = st.selectbox("Which row has column names?",
+                                  list(range(1, workbook_profiler.MAX_HEADER_ROWS + 1)),
+                                  format_func=lambda x: f"Row {x}",
+                                  index=suggested['header_row'] if suggested else 1,
+                                  key=f"hdr_pick_{selected_sheet}")
+        header_row = pick - 1
+        st.session_state.header_row = header_row
+
+    # ── 5  SKU ─────────────────────────────────────────────────────────
+    sku_col     = None
+    all_columns = []
+    if vendor_file and selected_sheet and header_row is not None:
+        st.markdown("---")
+        st.markdown("### Select SKU Column")
+        try:
+            all_columns = [str(c) for c in _read_sheet(file_key, vendor_file, selected_sheet, header_row).columns]
+            suggested   = workbook_profiler.best_for(profile, selected_sheet, header_row)
+            auto_sku    = (suggested['sku_col'] if suggested and suggested['sku_col'] in all_columns
+                           else _auto_detect_sku(all_columns))
+            if auto_sku:
+                st.success(f"Auto-detected SKU column: **{auto_sku}**")
+            c1,c2 = st.columns(2)
+            with c1:
+                didx    = (all_columns.index(auto_sku)+1) if auto_sku in all_columns else 0
+                sku_col = st.selectbox("Pick from file columns",
+                                       ["-- select --"]+all_columns, index=didx)
+                if sku_col == "-- select --": sku_col = None
+            with c2:
+                manual = st.text_input("Or type column name", placeholder="e.g. Model Number")
+                if manual.strip(): sku_col = manual.strip()
+            if sku_col:
+                st.info(f"Using SKU column: **{sku_col}**")
+        except Exception as e:
+            st.error(str(e))
+    _section_done("Config / upload / sheet / header / SKU", t0)
+
+    ctx = dict(vendor_file=vendor_file, template_file=template_file, file_key=file_key,
+               sheet=selected_sheet, header_row=header_row, all_columns=all_columns,
+               sku_col=sku_col, vendor_name=vendor_name, mfg_prefix=mfg_prefix,
+               brand_folder=brand_folder)
+
+    # ── 6  COLUMN DETECTION  ·  8  STATUS  ·  9  GENERATE ─────────────
+    _template_section(ctx)
+
+    # ── 9b  PIPELINE RUN  (background; polls as a fragment) ─────────────
+    if st.session_state.pipeline_run:
+        t0 = time.perf_counter()
+        _show_pipeline_panel(ctx)
+        _section_done("Pipeline panel", t0)
+
+    # ── 7  URL IMAGE CLASSIFIER  ───────────────────────────────────────
+    if vendor_file and selected_sheet and header_row is not None:
+        _classifier_section(ctx)
+
+        # ── background classification job ──────────────────────────────
+        t0 = time.perf_counter()
+        _show_job_panel()
+        _section_done("Job panel", t0)
+
+    # ── display classification results ─────────────────────────────────
+    if st.session_state.classify_results:
+        _results_section(st.session_state.classify_results)
+
+    st.session_state._full_run = False
+    _show_rerun_timing(page_t0)
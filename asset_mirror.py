@@ -0,0 +1,362 @@
+"""
+asset_mirror.py  —  local, content-addressed mirror of vendor asset URLs
+
+    python -m asset_mirror urls.txt -j 16          # prefetch ('-' for stdin)
+    python -m asset_mirror                          # size, entries, hit counters
+
+The classifier, the gallery thumbnails, URL resizes and asset_pipeline all
+read vendor assets through here, so an asset crosses the network at most
+once per freshness window -- across tools, runs and processes:
+
+    <root>/blobs/<sha[:2]>/<sha>   asset bytes named by SHA-256 (the same file
+                                   behind several URLs is stored once)
+    <root>/index.sqlite            url -> sha, ETag, Last-Modified, content type,
+                                   checked_at;  sha -> size, last_used
+
+A URL checked less than FRESH_SECONDS ago is served from disk without a
+request.  Older entries are revalidated with If-None-Match /
+If-Modified-Since, and a 304 only refreshes checked_at.  Blobs are evicted
+least-recently-used once the mirror passes MAX_BYTES.  Files of
+MMAP_MIN_BYTES or more are read through mmap, so a print-size TIFF is decoded
+from the page cache instead of being copied into Python memory.
+
+    BELAMI_MIRROR_DIR     mirror root                      (default .cache/mirror)
+    BELAMI_MIRROR_MB      size cap in MB                   (default 4096)
+    BELAMI_MIRROR_FRESH   seconds before revalidating      (default 86400)
+"""
+
+from __future__ import annotations
+
+import argparse, dataclasses, hashlib, io, itertools, mmap, os, sqlite3, sys, tempfile, threading, time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import scheduler
+
+MIRROR_DIR       = os.environ.get("BELAMI_MIRROR_DIR", ".cache/mirror")
+MAX_BYTES        = int(os.environ.get("BELAMI_MIRROR_MB", 4096)) << 20
+FRESH_SECONDS    = float(os.environ.get("BELAMI_MIRROR_FRESH", 86400))
+MMAP_MIN_BYTES   = 1 << 20
+FETCH_TIMEOUT    = 15
+FETCH_CHUNK      = 256 << 10
+PREFETCH_WORKERS = 8
+URL_STRIPES      = 64           # one download per URL in flight (per process)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url           TEXT PRIMARY KEY,
+    sha           TEXT NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    content_type  TEXT NOT NULL DEFAULT '',
+    checked_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS urls_sha ON urls(sha);
+CREATE TABLE IF NOT EXISTS blobs (
+    sha       TEXT PRIMARY KEY,
+    size      INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_lru ON blobs(last_used);
+"""
+
+
+@dataclasses.dataclass(frozen=True)
+class Asset:
+    """One mirrored URL.  *status*: "fresh" (no request), "revalidated" (304) or "fetched";
+    *transferred*: body bytes this call read from the network."""
+    url:          str
+    sha:          str
+    path:         Path
+    size:         int
+    content_type: str
+    status:       str
+    transferred:  int = 0
+
+    def read(self) -> bytes:
+        return self.path.read_bytes()
+
+    def open(self):
+        """Seekable read-only buffer: mmap from MMAP_MIN_BYTES up, else BytesIO."""
+        with open(self.path, "rb") as f:
+            if self.size >= MMAP_MIN_BYTES:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return io.BytesIO(f.read())
+
+
+class AssetMirror:
+    """URL -> content-addressed blob store with conditional revalidation and LRU eviction."""
+
+    def __init__(self, root: str | os.PathLike = MIRROR_DIR, max_bytes: int = MAX_BYTES,
+                 fresh_seconds: float = FRESH_SECONDS):
+        self.root          = Path(root)
+        self.max_bytes     = int(max_bytes)
+        self.fresh_seconds = float(fresh_seconds)
+        self.stats         = Counter()      # fresh / revalidated / fetched / fetched_bytes / evicted
+        self._blobs        = self.root / "blobs"
+        self._blobs.mkdir(parents=True, exist_ok=True)
+        self._lock         = threading.Lock()   # the sqlite connection and _total
+        self._stripes      = [threading.Lock() for _ in range(URL_STRIPES)]
+        self._db           = sqlite3.connect(self.root / "index.sqlite", timeout=30,
+                                             check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+            self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    # -- public --------------------------------------------------------------
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def fetch(self, url: str, head: bytes = b"", head_headers: dict | None = None) -> Asset:
+        """The mirrored asset for *url*, downloading or revalidating only when needed.
+
+        *head* is the start of the body already read by a range request
+        (image_preview) and *head_headers* that response's lower-cased headers:
+        only the rest is requested, with If-Range so a changed file comes back
+        whole.  HTTP errors propagate (requests' HTTPError) and nothing is recorded.
+        """
+        with self._stripes[hash(url) % URL_STRIPES]:
+            row = self._lookup(url)
+            now = time.time()
+            if row and now - row[4] < self.fresh_seconds:
+                self._touch(row[0], now)
+                return self._asset(url, row[0], row[3], "fresh")
+            return self._download(url, row, now, head if not row else b"", head_headers or {})
+
+    def is_fresh(self, url: str) -> bool:
+        """True if fetch(url) would be answered from disk without a request."""
+        row = self._lookup(url)
+        return bool(row) and time.time() - row[4] < self.fresh_seconds
+
+    def open_url(self, url: str, head: bytes = b"", head_headers: dict | None = None):
+        """(seekable buffer, Asset) for *url*; see fetch and Asset.open."""
+        asset = self.fetch(url, head, head_headers)
+        try:
+            return asset.open(), asset
+        except FileNotFoundError:           # evicted between fetch and open
+            self._forget(url)
+            asset = self.fetch(url)
+            return asset.open(), asset
+
+    def prefetch(self, urls, workers: int = PREFETCH_WORKERS, on_progress=None) -> dict:
+        """Mirror *urls* concurrently; returns {url: Asset or the exception}.
+
+        Per-host limits still apply (scheduler.downloads); *on_progress(done, total)*.
+        """
+        urls = list(dict.fromkeys(urls))
+        out  = {}
+        if not urls:
+            return out
+
+        def one(url):
+            try:
+                return url, self.fetch(url)
+            except Exception as exc:
+                return url, exc
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(urls))) as pool:
+            for url, res in pool.map(one, urls):
+                out[url] = res
+                if on_progress:
+                    on_progress(len(out), len(urls))
+        return out
+
+    def summary(self) -> dict:
+        with self._lock:
+            n_urls, n_blobs = (self._db.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                               for t in ("urls", "blobs"))
+        return dict(root=str(self.root), bytes=self._total, max_bytes=self.max_bytes,
+                    urls=n_urls, blobs=n_blobs, **self.stats)
+
+    def clear(self) -> None:
+        with self._lock:
+            for sha, in self._db.execute("SELECT sha FROM blobs").fetchall():
+                self._path(sha).unlink(missing_ok=True)
+            self._db.execute("DELETE FROM urls")
+            self._db.execute("DELETE FROM blobs")
+            self._total = 0
+
+    # -- internals -----------------------------------------------------------
+    def _path(self, sha: str) -> Path:
+        return self._blobs / sha[:2] / sha
+
+    def _asset(self, url: str, sha: str, ctype: str, status: str) -> Asset:
+        path = self._path(sha)
+        return Asset(url=url, sha=sha, path=path, size=path.stat().st_size,
+                     content_type=ctype or "", status=status)
+
+    def _lookup(self, url: str):
+        """(sha, etag, last_modified, content_type, checked_at) or None, if the blob is still there."""
+        with self._lock:
+            row = self._db.execute("SELECT sha, etag, last_modified, content_type, checked_at "
+                                   "FROM urls WHERE url = ?", (url,)).fetchone()
+        if row and not self._path(row[0]).exists():
+            return None                     # evicted (possibly by another process)
+        return row
+
+    def _touch(self, sha: str, now: float) -> None:
+        with self._lock:
+            self._db.execute("UPDATE blobs SET last_used = ? WHERE sha = ?", (now, sha))
+            self.stats["fresh"] += 1
+
+    def _forget(self, url: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM urls WHERE url = ?", (url,))
+
+    def _download(self, url: str, row, now: float, head: bytes, head_headers: dict) -> Asset:
+        from image_classifier import http_session
+
+        headers = {}
+        if row and row[1]:
+            headers["If-None-Match"] = row[1]
+        if row and row[2]:
+            headers["If-Modified-Since"] = row[2]
+        if head:
+            if body_total(head_headers) == len(head):     # the prefix was the whole file
+                return self._record(url, *self._store([head]), head_headers, now, 0)
+            headers["Range"] = f"bytes={len(head)}-"
+            validator = head_headers.get("etag") or head_headers.get("last-modified")
+            if validator:
+                headers["If-Range"] = validator
+        with scheduler.downloads.slot(url):
+            resp = http_session().get(url, headers=headers, timeout=FETCH_TIMEOUT, stream=True)
+            try:
+                if resp.status_code == 304 and row:
+                    with self._lock:
+                        self._db.execute("UPDATE urls SET checked_at = ? WHERE url = ?", (now, url))
+                        self._db.execute("UPDATE blobs SET last_used = ? WHERE sha = ?", (now, row[0]))
+                        self.stats["revalidated"] += 1
+                    return self._asset(url, row[0], row[3], "revalidated")
+                resp.raise_for_status()
+                resumed = bool(head) and resp.status_code == 206
+                if resumed and not resp.headers.get("content-range", "").startswith(f"bytes {len(head)}-"):
+                    raise ValueError(f"unexpected Content-Range {resp.headers.get('content-range')!r}")
+                body      = resp.iter_content(FETCH_CHUNK)
+                sha, size = self._store(itertools.chain([head], body) if resumed else body)
+            finally:
+                resp.close()
+        meta = head_headers if resumed else {k.lower(): v for k, v in resp.headers.items()}
+        return self._record(url, sha, size, meta, now, size - len(head) if resumed else size)
+
+    def _record(self, url: str, sha: str, size: int, headers: dict, now: float, transferred: int) -> Asset:
+        ctype = headers.get("content-type", "")
+        with self._lock:
+            new = self._db.execute("SELECT 1 FROM blobs WHERE sha = ?", (sha,)).fetchone() is None
+            self._db.execute("INSERT OR REPLACE INTO blobs (sha, size, last_used) VALUES (?, ?, ?)",
+                             (sha, size, now))
+            self._db.execute("INSERT OR REPLACE INTO urls VALUES (?, ?, ?, ?, ?, ?)",
+                             (url, sha, headers.get("etag"), headers.get("last-modified"), ctype, now))
+            self._total += size if new else 0
+            if self._total > self.max_bytes:
+                self._evict(keep=sha)
+            self.stats["fetched"]       += 1
+            self.stats["fetched_bytes"] += transferred
+        return dataclasses.replace(self._asset(url, sha, ctype, "fetched"), transferred=transferred)
+
+    def _store(self, chunks) -> tuple[str, int]:
+        """Write *chunks* to a temp file while hashing; move it to its blob path."""
+        h, size = hashlib.sha256(), 0
+        fd, tmp = tempfile.mkstemp(dir=self._blobs, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    h.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            sha  = h.hexdigest()
+            path = self._path(sha)
+            path.parent.mkdir(exist_ok=True)
+            os.replace(tmp, path)           # same bytes if it already exists
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return sha, size
+
+    def _evict(self, keep: str) -> None:
+        """Drop least-recently-used blobs (and their URLs) to ~90 % of the cap.  Caller holds _lock."""
+        rows   = self._db.execute("SELECT sha, size FROM blobs ORDER BY last_used").fetchall()
+        total  = sum(size for _, size in rows)
+        target = int(self.max_bytes * 0.9)
+        gone   = []
+        for sha, size in rows:
+            if total <= target:
+                break
+            if sha == keep:
+                continue
+            self._path(sha).unlink(missing_ok=True)
+            gone.append((sha,))
+            total -= size
+        self._db.executemany("DELETE FROM urls WHERE sha = ?", gone)
+        self._db.executemany("DELETE FROM blobs WHERE sha = ?", gone)
+        self._total = total
+        self.stats["evicted"] += len(gone)
+
+
+def body_total(headers: dict) -> int | None:
+    """Full body size: a 206's Content-Range ("bytes 0-65535/812345"), else Content-Length."""
+    total = (headers["content-range"].rpartition("/")[2] if "content-range" in headers
+             else headers.get("content-length", ""))
+    return int(total) if total.isdigit() else None
+
+
+_mirror: AssetMirror | None = None
+_mirror_lock = threading.Lock()
+
+def get_mirror() -> AssetMirror:
+    """Process-wide mirror shared by the classifier, gallery and resizer."""
+    global _mirror
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = AssetMirror()
+        return _mirror
+
+
+def set_mirror(mirror: AssetMirror | None) -> None:
+    """Use *mirror* from now on (benchmarks point it at a scratch folder); None = default."""
+    global _mirror
+    with _mirror_lock:
+        _mirror = mirror
+
+
+def open_url(url: str, head: bytes = b"", head_headers: dict | None = None):
+    """(seekable buffer, Asset) for *url* through the process-wide mirror."""
+    return get_mirror().open_url(url, head, head_headers)
+
+
+# ===========================================================================
+# CLI  --  python -m asset_mirror
+# ===========================================================================
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m asset_mirror",
+                                 description="Prefetch URLs into the local asset mirror, or show its size.")
+    ap.add_argument("urls", nargs="?", help="text file with one URL per line ('-' for stdin)")
+    ap.add_argument("-j", "--workers", type=int, default=PREFETCH_WORKERS)
+    args = ap.parse_args(argv)
+
+    mirror = get_mirror()
+    if args.urls:
+        fp = sys.stdin if args.urls == "-" else open(args.urls)
+        with fp:
+            urls = [u.strip() for u in fp if u.strip().startswith("http")]
+
+        def progress(n, total):
+            if n == total or n % 100 == 0:
+                print(f"  {n}/{total}", file=sys.stderr)
+
+        t0  = time.time()
+        out = mirror.prefetch(urls, args.workers, progress)
+        for url, res in out.items():
+            if isinstance(res, Exception):
+                print(f"  failed: {url}: {res}", file=sys.stderr)
+        print(f"{len(out)} URLs in {time.time() - t0:.1f}s", file=sys.stderr)
+    for k, v in mirror.summary().items():
+        print(f"{k:14s} {v}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+"""
+asset_pipeline.py  —  one download per vendor image: classify, render the 1k JPEG, build the template
+
+    python -m asset_pipeline vendor.xlsx --vendor AFX --out out/
+    python -m asset_pipeline vendor.xlsx --vendor AFX --sheet Products --header-row 2 \\
+        --sku-col "Model Number" --no-claude --out out/
+    python -m asset_pipeline vendor.xlsx --vendor AFX --max-claude-calls 300 --out out/
+
+For URL-based vendors the classifier, the gallery preview and the Image
+Resizer used to fetch every image separately.  Here each image URL that
+find_url_columns pairs with a chosen filename column is read once through
+asset_mirror (so a re-run within the freshness window downloads nothing) and
+decoded once (oversized JPEGs via the resizer's draft decode).  That decoded
+image is classified (the gallery thumbnail is cached on the way), padded to
+1000x1000 and encoded as JPEG.
+
+Claude is never called during the download pass.  Uncertain images are
+queued and, with use_claude, refined afterwards in claude_budget priority
+order until the optional Budget is spent, exactly like a budgeted
+classification job; the rest keep their heuristic label as "budget_skipped".
+
+Downloads run on the shared classify pool with at most one URL in flight per
+worker (FairPool.map_unordered's window), so memory stays bounded.
+Renditions are spooled to a temporary folder because an image's folder
+depends on every other label of its SKU.  Once all URLs are done, the labels
+go through asset_generator.label_index into _process, and the ZIP is written
+with each rendition at exactly the template's imagelink:
+
+    {brand_folder}/products/{stem}_new_1k.jpg      main_product_image rows
+    {brand_folder}/media/{stem}_new_1k.jpg         media rows
+
+Output: <out>/<stem>_assets.zip, <stem>_Asset_Template.xlsx and <stem>_log.txt.
+The page runs it through start_run(), on a background thread per session, so
+widget clicks during a long run do not throw the work away.
+Settings are resolved as in ingest_service (profiler + detect_columns defaults).
+"""
+
+from __future__ import annotations
+
+import argparse, hashlib, os, shutil, sys, tempfile, threading, time, traceback, zipfile
+from pathlib import Path
+
+import claude_budget
+import image_classifier as ic
+import image_resizer
+import scheduler
+from result_store import ResultStore
+
+SIZE = (1000, 1000)
+
+
+def _rendition_refs(df, image_cols: list[str], url_cols: list[dict]) -> dict:
+    """classification plan restricted to URL columns paired with a chosen image column."""
+    import asset_generator as ag
+
+    paired = [u["col"] for u in url_cols if u["paired"] in image_cols]
+    return ag.plan_classification(df, paired, url_cols)
+
+
+def _fetch_one(url: str, spool: Path, settings) -> tuple:
+    """Download, decode, classify and render one URL; returns (result, rendition path or None)."""
+    timings = {"cache_hit": False}
+    try:
+        buf, _ = ic.download(url, timings)
+        with buf:                               # an mmap for large files: release it once decoded
+            t0  = time.perf_counter()
+            img = image_resizer.reduce_large_source(image_resizer.open_source(buf), SIZE)
+            img.load()
+            rgb = img if img.mode == "RGB" else img.convert("RGB")
+            timings["decode_ms"] = ic.elapsed_ms(t0)
+    except Exception as exc:
+        return ic.ClassificationResult(label="detail", confidence=0, stage="error",
+                                       details={"error": str(exc), "url": url}, timings=timings), None
+
+    res = ic.classify_image(rgb, timings, thumb_url=url if ic.KEEP_THUMBNAILS else None,
+                            use_claude=False)
+    try:
+        jpeg, _ = image_resizer.encode_jpeg(image_resizer.resize_image_with_padding(img, SIZE), settings)
+    except Exception as exc:
+        res.details["render_error"] = str(exc)
+        return res, None
+    path = spool / (hashlib.sha1(url.encode()).hexdigest() + ".jpg")
+    path.write_bytes(jpeg)
+    return res, path
+
+
+def _refine_queued(pool, owner: str, plan: dict, queued: dict, budget: claude_budget.Budget) -> int:
+    """Claude on the *queued* {norm: (url, result)} best first until *budget* is spent;
+    updates *queued* in place and returns the number of calls made.
+
+    The seconds limit is the wall time of this pass, calls in flight count
+    against the call and spend limits (as in classify_jobs).
+    """
+    order = claude_budget.prioritise(
+        [(norm, [col for _, col, _ in plan["refs"][norm]], {"confidence": res.confidence, "details": res.details})
+         for norm, (_, res) in queued.items()])
+    t0, calls, inflight, refined = time.time(), 0, 0, set()
+
+    def admitted():
+        nonlocal inflight
+        for norm in order:
+            if budget.exhausted(calls + inflight, time.time() - t0):
+                return
+            inflight += 1
+            yield norm
+
+    refine = lambda norm: ic.refine_with_claude(queued[norm][0], queued[norm][1])
+    for norm, fut in pool.map_unordered(owner, refine, admitted()):
+        inflight -= 1
+        calls    += 1
+        refined.add(norm)
+        queued[norm] = (queued[norm][0], fut.result())
+
+    why = budget.exhausted(calls, time.time() - t0) or "calls"
+    for norm, (_, res) in queued.items():
+        if norm not in refined:
+            res.stage = "budget_skipped"
+            res.details["budget_exhausted"] = why
+    return calls
+
+
+def run_pipeline(df, cfg: dict, url_cols: list[dict], zip_fp, owner: str = "pipeline",
+                 use_claude: bool = True, budget: claude_budget.Budget | None = None,
+                 settings=image_resizer.DEFAULT_ENCODE, on_progress=None) -> dict:
+    """Fetch every paired image URL once, classify + render it, then build the template and
+    write the renditions into the ZIP at *zip_fp* under their imagelink paths.
+
+    *cfg* carries mfg_prefix, brand_folder, sku_col, image_cols, pdf_cols, video_cols and
+    mediatypes (see ingest_service.prepare).  *on_progress(done, total)* is called per URL.
+    With *use_claude*, uncertain images go to Claude after the downloads, within *budget*
+    (no limit when None).
+    Returns dict(template, log, store, images, missing, errors, downloads, claude_calls, seconds).
+    """
+    import asset_generator as ag
+
+    t0     = time.time()
+    plan   = _rendition_refs(df, cfg["image_cols"], url_cols)
+    store  = ResultStore()
+    files  = {}                                 # rendition stem -> spooled JPEG
+    queued = {}                                 # norm -> (url, deferred result) awaiting Claude
+    done   = errors = calls = 0
+    spool  = Path(tempfile.mkdtemp(prefix="asset-pipeline-"))
+    try:
+        pool = scheduler.pool("classify")
+        fn   = lambda item: _fetch_one(item[1], spool, settings)
+        for (norm, url), fut in pool.map_unordered(owner, fn, plan["unique"].items()):
+            res, path = fut.result()
+            refs = plan["refs"][norm]
+            if res.stage == "heuristic" and res.confidence < ic.CONFIDENCE_THRESHOLD:
+                queued[norm] = (url, res)
+            else:
+                store.add_fanout(url, res, refs)
+            errors += res.stage == "error" or path is None
+            if path is not None:
+                for _, _, fname in refs:
+                    if fname:
+                        files.setdefault(Path(fname).stem, path)
+            done += 1
+            if on_progress:
+                on_progress(done, len(plan["unique"]))
+
+        if use_claude and queued:
+            calls = _refine_queued(pool, owner, plan, queued, budget or claude_budget.Budget())
+        for norm, (url, res) in queued.items():
+            store.add_fanout(url, res, plan["refs"][norm])
+
+        output_df, log_text = ag._process(df, cfg["mfg_prefix"], cfg["brand_folder"], cfg["sku_col"],
+                                          cfg["image_cols"], cfg["pdf_cols"], cfg["video_cols"],
+                                          cfg["mediatypes"], ag.label_index(store))
+        missing = []
+        written = 0
+        if output_df is not None:
+            images = output_df[output_df["imagelink"].str.endswith("_new_1k.jpg")]
+            with zipfile.ZipFile(zip_fp, "w", zipfile.ZIP_STORED) as zf:
+                for link in images["imagelink"]:
+                    path = files.get(Path(link).name[:-len("_new_1k.jpg")])
+                    if path is None:
+                        missing.append(link)
+                        continue
+                    zf.write(path, link)
+                    written += 1
+        lines = ["", "=== PIPELINE ===", f"URLs downloaded: {done} ({errors} failed)",
+                 f"Claude calls: {calls} ({len(queued)} uncertain)",
+                 f"Renditions in ZIP: {written}", f"Template images without a rendition: {len(missing)}"]
+        lines += [f"  {m}" for m in missing[:20]]
+        return dict(template=output_df, log=log_text + "\n".join(lines), store=store, images=written,
+                    missing=missing, errors=errors, downloads=done, claude_calls=calls,
+                    seconds=round(time.time() - t0, 1))
+    finally:
+        shutil.rmtree(spool, ignore_errors=True)
+
+
+# ---------------------------------------------------------------------------
+# Background runs  (the page polls these; a Streamlit rerun does not stop them)
+# ---------------------------------------------------------------------------
+_runs: dict[str, "PipelineRun"] = {}
+_lock = threading.Lock()
+
+
+class PipelineRun:
+    """run_pipeline on a worker thread, writing the ZIP to the temporary file *zip_path*;
+    *meta* is the caller's description of the input (kept as is)."""
+
+    def __init__(self, df, cfg: dict, url_cols: list[dict], owner: str, meta: dict | None = None, **kwargs):
+        fd, self.zip_path = tempfile.mkstemp(prefix="asset-pipeline-", suffix=".zip")
+        os.close(fd)
+        self.meta   = meta or {}
+        self.status = "running"
+        self.done   = self.total = 0
+        self.out    = None
+        self.error  = ""
+        self.thread = threading.Thread(target=self._run, args=(df, cfg, url_cols, owner, kwargs),
+                                       name=f"pipeline-{owner}", daemon=True)
+
+    def _progress(self, done: int, total: int) -> None:
+        self.done, self.total = done, total
+
+    def _run(self, df, cfg, url_cols, owner, kwargs) -> None:
+        try:
+            with open(self.zip_path, "wb") as fp:
+                self.out = run_pipeline(df, cfg, url_cols, fp, owner=owner, on_progress=self._progress, **kwargs)
+            self.status = "done"
+        except Exception as exc:
+            self.error  = f"{exc}\n{traceback.format_exc()}"
+            self.status = "failed"
+
+    def discard(self) -> None:
+        try:
+            os.unlink(self.zip_path)
+        except OSError:
+            pass
+
+
+def start_run(owner: str, df, cfg: dict, url_cols: list[dict], meta: dict | None = None,
+              **kwargs) -> PipelineRun:
+    """Start *owner*'s pipeline in the background (run_pipeline keyword arguments in
+    *kwargs*) and drop its previous finished run; a run still going is returned as is."""
+    with _lock:
+        old = _runs.get(owner)
+        if old and old.thread.is_alive():
+            return old
+        run = _runs[owner] = PipelineRun(df, cfg, url_cols, owner, meta, **kwargs)
+        run.thread.start()
+    if old:
+        old.discard()
+    return run
+
+def get_run(owner: str) -> PipelineRun | None:
+    with _lock:
+        return _runs.get(owner)
+
+
+def main(argv=None) -> int:
+    import asset_generator as ag
+    import ingest_service
+    import resources
+
+    ap = argparse.ArgumentParser(prog="python -m asset_pipeline",
+                                 description="Download each image URL once: classify, resize, build the template.")
+    ap.add_argument("workbook", type=Path)
+    ap.add_argument("--vendor", required=True)
+    ap.add_argument("--out", type=Path, required=True, help="ZIP, template and log go here")
+    ap.add_argument("--settings", type=Path, help="ingest_service vendors.json to take this vendor's settings from")
+    ap.add_argument("--mfg-prefix")
+    ap.add_argument("--brand-folder")
+    ap.add_argument("--sheet")
+    ap.add_argument("--header-row", type=int, help="1-based")
+    ap.add_argument("--sku-col")
+    ap.add_argument("--no-claude", action="store_true", help="heuristic / learned labels only")
+    ap.add_argument("--max-claude-calls", type=int, help="Claude budget for the uncertain images (default: no limit)")
+    args = ap.parse_args(argv)
+
+    cfg = ingest_service.load_settings(args.settings).get(args.vendor, {}) if args.settings else {}
+    cfg.update({k: v for k, v in dict(mfg_prefix=args.mfg_prefix, brand_folder=args.brand_folder,
+                                       sheet=args.sheet, header_row=args.header_row,
+                                       sku_col=args.sku_col).items() if v is not None})
+    cfg = ingest_service.resolve(args.vendor, cfg, resources.manufacturer_mapping()[0])
+    if not cfg["mfg_prefix"]:
+        print(f"no Manufacturer ID for vendor {args.vendor!r}; pass --mfg-prefix", file=sys.stderr)
+        return 2
+
+    df, cfg  = ingest_service.prepare(str(args.workbook), cfg)
+    url_cols = ag.find_url_columns(df)
+    args.out.mkdir(parents=True, exist_ok=True)
+    stem     = args.workbook.stem
+    zip_path = args.out / f"{stem}_assets.zip"
+    ic.KEEP_THUMBNAILS = False
+
+    def progress(n, total):
+        if n == total or n % 50 == 0:
+            print(f"  {n}/{total} URLs", file=sys.stderr)
+
+    with open(zip_path, "wb") as fp:
+        out = run_pipeline(df, cfg, url_cols, fp, use_claude=not args.no_claude,
+                           budget=claude_budget.Budget(max_calls=args.max_claude_calls),
+                           on_progress=progress)
+    (args.out / f"{stem}_log.txt").write_text(out["log"])
+    if out["template"] is not None and len(out["template"]):
+        out["template"].to_excel(args.out / f"{stem}_Asset_Template.xlsx", sheet_name="Sheet1", index=False)
+    print(f"{out['downloads']} URLs ({out['errors']} failed) -> {out['images']} renditions in {zip_path}, "
+          f"{0 if out['template'] is None else len(out['template'])} template rows, "
+          f"{len(out['missing'])} without a rendition  ({out['seconds']}s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
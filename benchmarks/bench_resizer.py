@@ -0,0 +1,206 @@
+"""
+bench_resizer.py  —  throughput + fidelity regression check for image_resizer
+
+    python -m benchmarks.bench_resizer                      # run, compare to golden
+    python -m benchmarks.bench_resizer --save-baseline perf.json
+    python -m benchmarks.bench_resizer --baseline perf.json --max-slowdown 0.2
+    python -m benchmarks.bench_resizer --update-golden      # accept new output
+
+Measures images/sec, peak RSS and output bytes for resize_image_with_padding
+(+ the default JPEG encode) and get_dominant_edge_color on the synthetic
+corpus, each in its own process so the RSS peaks are separate, and hashes every output bitmap against benchmarks/golden_resizer.json.
+It also runs a small raw TIFF and PPM through reduce_large_source's banded
+decode (which relies on Pillow internals) and compares the result with a
+normal full decode.  Exit status is 1 when any configured check fails.
+
+Golden hashes are deterministic for a given Pillow build; throughput
+baselines are machine-specific, so record them on the machine that runs
+the comparison.
+"""
+
+from __future__ import annotations
+
+import argparse, hashlib, io, json, resource, sys, time
+from pathlib import Path
+
+import PIL
+from PIL import Image
+
+import image_resizer as ir
+from benchmarks.corpus import make_corpus
+
+GOLDEN_PATH = Path(__file__).with_name("golden_resizer.json")
+
+
+def _peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def _timeit(fn, items, repeat: int) -> tuple[float, list]:
+    """Best-of-*repeat* wall time for fn over all items, plus the last outputs."""
+    best, outs = float("inf"), []
+    for _ in range(repeat):
+        t0   = time.perf_counter()
+        outs = [fn(x) for x in items]
+        best = min(best, time.perf_counter() - t0)
+    return best, outs
+
+
+def check_banded_decode() -> dict:
+    """{format: "ok" or what went wrong} for the banded large-source path on
+    small uncompressed TIFF / PPM sources, against Image.open().reduce()."""
+    src    = make_corpus(1, 7)[0][1].convert("RGB").resize((1200, 900))
+    factor = ir._reduce_factor(src.size, (100, 100))
+    out    = {}
+    saved  = ir.LARGE_IMAGE_PIXELS
+    ir.LARGE_IMAGE_PIXELS = 0                   # take the large-source path at this size
+    try:
+        for fmt in ("TIFF", "PPM"):
+            buf = io.BytesIO()
+            src.save(buf, fmt)
+            stats = {}
+            try:
+                banded = ir.reduce_large_source(ir.open_source(io.BytesIO(buf.getvalue())), (100, 100), stats)
+            except Exception as exc:
+                out[fmt] = f"error: {exc}"
+                continue
+            full = Image.open(io.BytesIO(buf.getvalue())).reduce(factor)
+            if stats.get("strategy") != "bands":
+                out[fmt] = f"band path not taken ({stats.get('strategy')})"
+            elif banded.size != full.size or banded.tobytes() != full.tobytes():
+                out[fmt] = "differs from a full decode"
+            else:
+                out[fmt] = "ok"
+    finally:
+        ir.LARGE_IMAGE_PIXELS = saved
+    return out
+
+
+def _bench_resize(n: int, seed: int, repeat: int) -> tuple[dict, dict]:
+    """resize_image_with_padding + default encode: (bench entry, output hashes)."""
+    corpus = make_corpus(n, seed)
+
+    def _resize(img):
+        out = ir.resize_image_with_padding(img, (1000, 1000))
+        data, _ = ir.encode_jpeg(out)
+        return out, data
+
+    secs, outs = _timeit(_resize, [img for _, img in corpus], repeat)
+    bench = dict(images_per_sec=round(n / secs, 2),
+                 output_bytes=sum(len(data) for _, data in outs),
+                 peak_rss_mb=round(_peak_rss_mb(), 1))
+    hashes = {f"resize/{name}": hashlib.sha256(out.tobytes()).hexdigest()
+              for (name, _), (out, _) in zip(corpus, outs)}
+    return bench, hashes
+
+
+def _bench_edge_color(n: int, seed: int, repeat: int) -> tuple[dict, dict]:
+    """get_dominant_edge_color: (bench entry, colours as hex)."""
+    corpus = make_corpus(n, seed)
+    rgb    = [img.convert("RGB") for _, img in corpus]
+    secs, colors = _timeit(ir.get_dominant_edge_color, rgb, repeat)
+    bench  = dict(images_per_sec=round(n / secs, 2), peak_rss_mb=round(_peak_rss_mb(), 1))
+    hashes = {f"edge_color/{name}": "%02x%02x%02x" % tuple(color)[:3]
+              for (name, _), color in zip(corpus, colors)}
+    return bench, hashes
+
+
+BENCHMARKS = {"resize_image_with_padding": _bench_resize,
+              "get_dominant_edge_color":   _bench_edge_color}
+
+
+def run(n: int, seed: int, repeat: int) -> dict:
+    """Every benchmark in a fresh process, so each peak_rss_mb is that benchmark's own
+    (ru_maxrss is a process-lifetime peak)."""
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    report = {"pillow": PIL.__version__, "n": n, "seed": seed, "bench": {}, "hashes": {}}
+    for name, fn in BENCHMARKS.items():
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            bench, hashes = pool.submit(fn, n, seed, repeat).result()
+        report["bench"][name] = bench
+        report["hashes"].update(hashes)
+
+    report["banded_decode"] = check_banded_decode()
+    return report
+
+
+def check(report: dict, golden: dict | None, baseline: dict | None, args) -> list[str]:
+    failures = [f"banded decode, {fmt}: {res}" for fmt, res in report["banded_decode"].items() if res != "ok"]
+
+    if golden is not None:
+        gh = golden.get("hashes", {})
+        changed = [k for k, v in report["hashes"].items() if gh.get(k) not in (None, v)]
+        missing = [k for k in report["hashes"] if k not in gh]
+        if changed:
+            failures.append(f"{len(changed)} output(s) differ from golden "
+                            f"(golden Pillow {golden.get('pillow')}, now {report['pillow']}): "
+                            + ", ".join(changed[:5]) + (" …" if len(changed) > 5 else ""))
+        if missing:
+            print(f"note: {len(missing)} output(s) have no golden hash (different --n/--seed?)")
+
+    if baseline is not None:
+        for fn, cur in report["bench"].items():
+            base = baseline.get("bench", {}).get(fn)
+            if not base:
+                continue
+            floor = base["images_per_sec"] * (1 - args.max_slowdown)
+            if cur["images_per_sec"] < floor:
+                failures.append(f"{fn}: {cur['images_per_sec']} img/s < {floor:.2f} "
+                                f"(baseline {base['images_per_sec']}, -{args.max_slowdown:.0%} allowed)")
+            if "output_bytes" in base:
+                ceiling = base["output_bytes"] * (1 + args.max_bytes_growth)
+                if cur["output_bytes"] > ceiling:
+                    failures.append(f"{fn}: output {cur['output_bytes']} B > {ceiling:.0f} B "
+                                    f"(baseline {base['output_bytes']})")
+
+    if args.max_rss_mb:
+        peak = max(b["peak_rss_mb"] for b in report["bench"].values())
+        if peak > args.max_rss_mb:
+            failures.append(f"peak RSS {peak} MB > {args.max_rss_mb} MB")
+
+    return failures
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--n",       type=int, default=40, help="corpus size")
+    ap.add_argument("--seed",    type=int, default=1234)
+    ap.add_argument("--repeat",  type=int, default=3, help="best-of runs per benchmark")
+    ap.add_argument("--golden",  type=Path, default=GOLDEN_PATH)
+    ap.add_argument("--update-golden", action="store_true")
+    ap.add_argument("--baseline",      type=Path, help="perf JSON from --save-baseline")
+    ap.add_argument("--save-baseline", type=Path)
+    ap.add_argument("--max-slowdown",     type=float, default=0.20, help="allowed img/s drop (fraction)")
+    ap.add_argument("--max-bytes-growth", type=float, default=0.05, help="allowed output size growth")
+    ap.add_argument("--max-rss-mb",       type=float, default=0, help="0 = unchecked")
+    args = ap.parse_args(argv)
+
+    report = run(args.n, args.seed, args.repeat)
+    for fn, b in report["bench"].items():
+        print(f"{fn:28s} " + "  ".join(f"{k}={v}" for k, v in b.items()))
+    print(f"{'banded_decode':28s} " + "  ".join(f"{k}={v}" for k, v in report["banded_decode"].items()))
+
+    if args.update_golden:
+        args.golden.write_text(json.dumps({"pillow": report["pillow"], "n": args.n,
+                                           "seed": args.seed, "hashes": report["hashes"]},
+                                          indent=1, sort_keys=True) + "\n")
+        print(f"golden written -> {args.golden}")
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(report, indent=1, sort_keys=True) + "\n")
+        print(f"baseline written -> {args.save_baseline}")
+
+    golden   = json.loads(args.golden.read_text()) if args.golden.exists() and not args.update_golden else None
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    failures = check(report, golden, baseline, args)
+    for f in failures:
+        print(f"FAIL  {f}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+bench_startup.py  —  cold-start cost of the Streamlit app
+
+    python -m benchmarks.bench_startup                          # print report
+    python -m benchmarks.bench_startup --save benchmarks/startup_report.json
+    python -m benchmarks.bench_startup --baseline benchmarks/startup_report.json --max-slowdown 0.3
+
+Two measurements, each in fresh interpreters so nothing is already imported
+or cached:
+
+    import time    python -X importtime -c "import streamlit; import <module>"
+                   for each page module; reports what the module adds on top
+                   of streamlit itself, and its heaviest imports
+    first render   AppTest run of app.py (the default page) -- the time a new
+                   server spends before the first page is on screen
+
+Numbers are machine-specific; record a baseline on the machine that compares.
+"""
+
+from __future__ import annotations
+
+import argparse, json, statistics, subprocess, sys
+from pathlib import Path
+
+ROOT    = Path(__file__).resolve().parent.parent
+MODULES = ("asset_generator", "image_resizer")
+TOP_N   = 8
+
+_RENDER = """
+import time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=120).run()
+dt = time.perf_counter() - t0
+print(f"{dt:.4f} {int(bool(at.exception))}")
+"""
+
+
+def _parse_importtime(stderr: str, after: str) -> tuple[float, list]:
+    """(ms added after *after* finished importing, heaviest direct imports of the module)."""
+    rows, seen = [], False
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        if not cum.strip().isdigit():
+            continue                                    # header row
+        depth, name = (len(name) - len(name.lstrip()) - 1) // 2, name.strip()
+        if not seen:
+            seen = depth == 0 and name == after
+            continue
+        rows.append((depth, name, int(cum) / 1000))
+    top = sorted(((n, ms) for d, n, ms in rows if d == 1), key=lambda r: -r[1])
+    return sum(ms for d, _, ms in rows if d == 0), top
+
+
+def import_time(module: str) -> dict:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import streamlit; import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    total, top = _parse_importtime(proc.stderr, "streamlit")
+    return dict(ms=round(total, 1), top={n: round(ms, 1) for n, ms in top[:TOP_N]})
+
+
+def first_render(repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _RENDER], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.split()
+        runs.append((float(out[0]), out[1] == "1"))
+    return dict(median_s=round(statistics.median(r[0] for r in runs), 3),
+                best_s=round(min(r[0] for r in runs), 3),
+                exception=any(r[1] for r in runs))
+
+
+def run(repeat: int) -> dict:
+    return dict(python=sys.version.split()[0],
+                import_ms={m: import_time(m) for m in MODULES},
+                first_render=first_render(repeat))
+
+
+def check(report: dict, baseline: dict, max_slowdown: float) -> list[str]:
+    failures = []
+    cur, base = report["first_render"]["median_s"], baseline["first_render"]["median_s"]
+    if cur > base * (1 + max_slowdown):
+        failures.append(f"first render {cur}s > {base * (1 + max_slowdown):.3f}s "
+                        f"(baseline {base}s, +{max_slowdown:.0%} allowed)")
+    for mod, b in baseline["import_ms"].items():
+        c = report["import_ms"].get(mod)
+        if c and c["ms"] > b["ms"] * (1 + max_slowdown):
+            failures.append(f"import {mod}: {c['ms']} ms > {b['ms'] * (1 + max_slowdown):.0f} ms "
+                            f"(baseline {b['ms']} ms)")
+    if report["first_render"]["exception"]:
+        failures.append("app.py raised on first render")
+    return failures
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--repeat", type=int, default=5, help="fresh-process renders (median reported)")
+    ap.add_argument("--save", type=Path, help="write the report here")
+    ap.add_argument("--baseline", type=Path, help="report from an earlier --save")
+    ap.add_argument("--max-slowdown", type=float, default=0.30)
+    args = ap.parse_args(argv)
+
+    report = run(args.repeat)
+    for mod, r in report["import_ms"].items():
+        print(f"import {mod:18s} {r['ms']:8.1f} ms   "
+              + "  ".join(f"{n}={ms}" for n, ms in list(r["top"].items())[:4]))
+    fr = report["first_render"]
+    print(f"first render         median {fr['median_s']} s  best {fr['best_s']} s")
+
+    if args.save:
+        args.save.write_text(json.dumps(report, indent=1) + "\n")
+        print(f"report written -> {args.save}")
+    failures = check(report, json.loads(args.baseline.read_text()), args.max_slowdown) if args.baseline else []
+    for f in failures:
+        print(f"FAIL  {f}")
+    if args.baseline and not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+corpus.py  —  reproducible synthetic image corpus for benchmarks
+
+Every image is drawn from a seeded RNG, so the same seed always produces
+byte-identical pixels: mixed sizes and aspect ratios, RGBA / P / CMYK / L /
+RGB modes, white and coloured backgrounds, with a "product" blob, a few
+edges and some text-like stripes on top.
+"""
+
+from __future__ import annotations
+
+import io, random, struct
+
+from PIL import Image, ImageDraw
+
+MODES  = ("RGB", "RGBA", "P", "CMYK", "L")
+SIZES  = ((1000, 1000), (1600, 1200), (800, 2400), (3000, 600),
+          (640, 480), (2500, 2500), (300, 300), (4000, 3000))
+BG     = ((255, 255, 255), (250, 250, 250), (235, 225, 210),
+          (40, 60, 90), (200, 30, 40))
+
+
+def _draw(rng: random.Random, size: tuple[int, int], bg: tuple) -> Image.Image:
+    w, h = size
+    img  = Image.new("RGB", size, bg)
+    d    = ImageDraw.Draw(img)
+
+    # the "product": a filled blob in the middle
+    cx, cy = w // 2, h // 2
+    rw, rh = int(w * rng.uniform(0.15, 0.35)), int(h * rng.uniform(0.15, 0.35))
+    col    = tuple(rng.randrange(256) for _ in range(3))
+    d.ellipse((cx - rw, cy - rh, cx + rw, cy + rh), fill=col)
+    d.rectangle((cx - rw // 3, cy - rh, cx + rw // 3, cy + rh // 2),
+                fill=tuple(rng.randrange(256) for _ in range(3)))
+
+    # geometric edges / dimension-like lines
+    for _ in range(rng.randrange(3, 12)):
+        x0, y0 = rng.randrange(w), rng.randrange(h)
+        x1, y1 = rng.randrange(w), rng.randrange(h)
+        d.line((x0, y0, x1, y1), fill=(0, 0, 0), width=max(1, w // 400))
+
+    # text-like stripes
+    for i in range(rng.randrange(0, 8)):
+        y = int(h * 0.05) + i * max(4, h // 40)
+        d.rectangle((int(w * 0.05), y, int(w * rng.uniform(0.2, 0.6)), y + max(2, h // 120)),
+                    fill=(30, 30, 30))
+    return img
+
+
+def _to_mode(img: Image.Image, mode: str, rng: random.Random) -> Image.Image:
+    if mode == "RGBA":
+        out  = img.convert("RGBA")
+        mask = Image.new("L", img.size, 0)
+        w, h = img.size
+        ImageDraw.Draw(mask).ellipse((w * 0.1, h * 0.1, w * 0.9, h * 0.9),
+                                     fill=rng.choice((128, 255)))
+        out.putalpha(mask)
+        return out
+    if mode == "P":
+        return img.convert("P", palette=Image.ADAPTIVE, colors=64)
+    return img.convert(mode)
+
+
+def make_corpus(n: int = 40, seed: int = 1234) -> list[tuple[str, Image.Image]]:
+    """Return ``[(name, image), …]``; identical for identical (n, seed)."""
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        size = SIZES[i % len(SIZES)]
+        mode = MODES[i % len(MODES)]
+        bg   = BG[rng.randrange(len(BG))]
+        img  = _to_mode(_draw(rng, size, bg), mode, rng)
+        out.append((f"synth_{i:03d}_{mode}_{size[0]}x{size[1]}", img))
+    return out
+
+
+def encode(img: Image.Image, fmt: str | None = None) -> bytes:
+    """Serialise a corpus image the way a vendor would ship it."""
+    fmt = fmt or ("JPEG" if img.mode in ("RGB", "L", "CMYK") else "PNG")
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **({"quality": 90} if fmt == "JPEG" else {}))
+    return buf.getvalue()
+
+
+def _exif_thumbnail_app1(thumb: Image.Image) -> bytes:
+    """Minimal little-endian EXIF block whose IFD1 carries *thumb* as a JPEG."""
+    buf = io.BytesIO()
+    thumb.convert("RGB").save(buf, format="JPEG", quality=75)
+    data = buf.getvalue()
+    ifd0 = struct.pack("<H", 1) + struct.pack("<HHIHH", 0x0112, 3, 1, 1, 0) + struct.pack("<I", 26)
+    ifd1 = (struct.pack("<H", 3) + struct.pack("<HHIHH", 0x0103, 3, 1, 6, 0)
+            + struct.pack("<HHII", 0x0201, 4, 1, 68) + struct.pack("<HHII", 0x0202, 4, 1, len(data))
+            + struct.pack("<I", 0))
+    return b"Exif\x00\x00" + b"II*\x00" + struct.pack("<I", 8) + ifd0 + ifd1 + data
+
+
+def encode_photo(img: Image.Image, progressive: bool = False, exif_thumbnail: int = 0) -> bytes:
+    """Camera / DAM style JPEG: optionally progressive, optionally with an EXIF
+    thumbnail whose longer side is *exif_thumbnail* px (cameras: 160, DAM exports: larger)."""
+    img   = img.convert("RGB")
+    extra = {}
+    if exif_thumbnail:
+        thumb = img.copy()
+        thumb.thumbnail((exif_thumbnail, exif_thumbnail))
+        extra["exif"] = _exif_thumbnail_app1(thumb)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90, progressive=progressive, **extra)
+    return buf.getvalue()
@@ -0,0 +1,215 @@
+"""
+load_api.py  —  load test for api_server
+
+    python -m benchmarks.load_api                                    # 8 clients, mixed traffic
+    python -m benchmarks.load_api --clients 32 --requests 600 --latency-ms 80 --claude-latency-ms 900
+    python -m benchmarks.load_api --target http://127.0.0.1:8700 --standin http://127.0.0.1:8765 \\
+        --mix classify_url=1 --json api.json
+
+Starts the stand-in (benchmarks/standin.py) and api_server in-process, or
+uses --target / --standin for running ones (start the API with
+ANTHROPIC_BASE_URL pointing at the stand-in).  Each client is its own
+connection with its own X-Client, so the scheduler's per-owner fairness is
+exercised.  Requests cycle through --mix:
+
+    classify_url     POST /v1/classify?url=          (download + classify on the API)
+    classify_bytes   POST /v1/classify               (image in the body)
+    resize           POST /v1/resize                 (image in, JPEG out)
+    resize_url       POST /v1/resize?url=            (corpus URL; repeats are mirror hits)
+    resize_zip       POST /v1/resize                 (ZIP of ZIP_IMAGES, sent chunked; ZIP streamed back)
+    generate         POST /v1/generate + polling     (small synthetic workbook)
+
+and reports throughput plus p50/p95/p99 latency and errors per operation.
+"""
+
+from __future__ import annotations
+
+import argparse, io, json, sys, tempfile, threading, time, zipfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+import asset_mirror
+import image_classifier as ic
+import scheduler
+from benchmarks import standin
+from classify_metrics import QUANTILES, percentile
+
+DEFAULT_MIX   = "classify_url=4,classify_bytes=2,resize=2,resize_zip=1,generate=1"
+ZIP_IMAGES    = 8
+WORKBOOK_ROWS = 40
+POLL_SECONDS  = 0.05
+
+
+def _parse_mix(spec: str) -> list[str]:
+    ops = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPS:
+            raise SystemExit(f"unknown op {name!r}; choose from {', '.join(OPS)}")
+        ops += [name] * int(weight or 1)
+    return ops
+
+
+class _Fixtures:
+    """Request bodies built once from the stand-in's corpus."""
+
+    def __init__(self, base: str, paths: list[str]):
+        self.base   = base
+        self.images = [p for p in paths if p.startswith("/img/")]
+        with requests.Session() as s:
+            self.blobs = [s.get(f"{base}{p}", timeout=30).content for p in self.images[:ZIP_IMAGES]]
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w") as zf:
+            for p, data in zip(self.images, self.blobs):
+                zf.writestr(f"drop/{Path(p).name}", data)
+        self.zip = buf.getvalue()
+        self.workbook = self._workbook()
+
+    def _workbook(self) -> bytes:
+        from openpyxl import Workbook
+        wb = Workbook()
+        ws = wb.active
+        ws.append(["SKU", "Product Name", "Main Image", "Lifestyle Image", "Spec Sheet"])
+        for i in range(WORKBOOK_ROWS):
+            ws.append([f"LT-{i:04d}", f"Load test {i}", f"lt_{i:04d}_main.jpg",
+                       f"lt_{i:04d}_room.jpg", f"lt_{i:04d}_spec.pdf"])
+        buf = io.BytesIO()
+        wb.save(buf)
+        return buf.getvalue()
+
+
+def _chunks(data: bytes, size: int = 64 << 10):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def _classify_url(s, api, fx, i):
+    r = s.post(f"{api}/v1/classify", params={"url": f"{fx.base}{fx.images[i % len(fx.images)]}?r={i}"})
+    r.raise_for_status()
+    if r.json()["stage"] == "error":
+        raise RuntimeError(r.json()["details"].get("error", "classify error"))
+
+def _classify_bytes(s, api, fx, i):
+    s.post(f"{api}/v1/classify", data=fx.blobs[i % len(fx.blobs)]).raise_for_status()
+
+def _resize(s, api, fx, i):
+    s.post(f"{api}/v1/resize", data=fx.blobs[i % len(fx.blobs)], params={"filename": f"img_{i}.png"}
+           ).raise_for_status()
+
+def _resize_url(s, api, fx, i):
+    s.post(f"{api}/v1/resize", params={"url": f"{fx.base}{fx.images[i % len(fx.images)]}"}
+           ).raise_for_status()
+
+def _resize_zip(s, api, fx, i):
+    with s.post(f"{api}/v1/resize", data=_chunks(fx.zip), stream=True) as r:
+        r.raise_for_status()
+        got = zipfile.ZipFile(io.BytesIO(r.raw.read())).namelist()
+    if len(got) != len(fx.blobs):
+        raise RuntimeError(f"{len(got)} of {len(fx.blobs)} images in the ZIP")
+
+def _generate(s, api, fx, i):
+    r = s.post(f"{api}/v1/generate", data=fx.workbook,
+               params={"vendor": "LoadTest", "mfg_prefix": "9999", "filename": f"lt_{i}.xlsx"})
+    r.raise_for_status()
+    job = r.json()["job_id"]
+    while True:
+        st = s.get(f"{api}/v1/jobs/{job}").json()
+        if st["status"] not in ("queued", "running"):
+            break
+        time.sleep(POLL_SECONDS)
+    if st["status"] != "done":
+        raise RuntimeError(f"generate {st['status']}: {st.get('error', '')}")
+    s.get(f"{api}/v1/jobs/{job}/result").raise_for_status()
+
+
+OPS = {"classify_url": _classify_url, "classify_bytes": _classify_bytes, "resize": _resize,
+       "resize_url": _resize_url, "resize_zip": _resize_zip, "generate": _generate}
+
+
+def run(api: str, fx: _Fixtures, ops: list[str], n: int, clients: int) -> dict:
+    lat, errors = defaultdict(list), defaultdict(list)
+    lock        = threading.Lock()
+    local       = threading.local()
+
+    def one(i: int) -> None:
+        s = getattr(local, "session", None)
+        if s is None:
+            s = local.session = requests.Session()
+            s.headers["X-Client"] = threading.current_thread().name
+        op = ops[i % len(ops)]
+        t0 = time.perf_counter()
+        try:
+            OPS[op](s, api, fx, i)
+            err = None
+        except Exception as exc:
+            err = str(exc)[:80]
+        ms = (time.perf_counter() - t0) * 1000
+        with lock:
+            (errors[op].append(err) if err else lat[op].append(ms))
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients, thread_name_prefix="client") as pool:
+        list(pool.map(one, range(n)))
+    wall = time.perf_counter() - t0
+
+    by_op = {}
+    for op in dict.fromkeys(ops):
+        ms = sorted(lat[op])
+        by_op[op] = dict(ok=len(ms), errors=len(errors[op]),
+                         **{f"p{int(q * 100)}": round(percentile(ms, q), 1) for q in QUANTILES},
+                         first_errors=sorted(set(errors[op]))[:3])
+    return dict(requests=n, clients=clients, wall_seconds=round(wall, 2),
+                throughput=round(n / wall, 2), ops=by_op)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("-c", "--clients", type=int, default=8)
+    ap.add_argument("--mix", default=DEFAULT_MIX, help="op=weight,… (default: %(default)s)")
+    ap.add_argument("--target", help="base URL of a running api_server (default: start one in-process)")
+    ap.add_argument("--standin", help="base URL of a running stand-in (default: start one in-process)")
+    ap.add_argument("--claude-rpm", type=float, default=0,
+                    help="in-process API only: shared Claude rate limit; 0 = unlimited")
+    ap.add_argument("--json", type=Path, help="also write the report here")
+    standin.add_config_args(ap)
+    args = ap.parse_args(argv)
+    ops  = _parse_mix(args.mix)
+
+    if args.standin:
+        base  = args.standin.rstrip("/")
+        paths = requests.get(f"{base}/index.json", timeout=10).json()
+        stats = None
+    else:
+        _, base, stats, paths = standin.serve(standin.config_from_args(args))
+
+    if args.target:
+        api = args.target.rstrip("/")
+    else:
+        import api_server
+        ic.ANTHROPIC_URL = f"{base}/v1/messages"
+        scheduler.claude = scheduler.TokenBucket(args.claude_rpm / 60, scheduler.CLAUDE_BURST)
+        asset_mirror.set_mirror(asset_mirror.AssetMirror(tempfile.mkdtemp(prefix="loadtest-mirror-")))
+        _, api = api_server.serve()
+
+    report = run(api, _Fixtures(base, paths), ops, args.requests, args.clients)
+    report["server"] = requests.get(f"{api}/health", timeout=10).json()
+    if stats is not None:
+        report["standin"] = dict(stats)
+
+    print(f"n={report['requests']}  clients={report['clients']}  {report['throughput']} req/s  "
+          f"wall={report['wall_seconds']}s")
+    for op, st in report["ops"].items():
+        print(f"  {op:15s} ok={st['ok']:<4d} err={st['errors']:<3d} "
+              + "  ".join(f"{q}={st[q]}ms" for q in ("p50", "p95", "p99"))
+              + (f"   {st['first_errors']}" if st["first_errors"] else ""))
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=1) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
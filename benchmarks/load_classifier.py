@@ -0,0 +1,201 @@
+"""
+load_classifier.py  —  offline load test for the URL classification path
+
+    python -m benchmarks.load_classifier                              # threads, 8 workers
+    python -m benchmarks.load_classifier --mode serial --requests 60
+    python -m benchmarks.load_classifier --mode job --force-claude \\
+        --latency-ms 80 --jitter-ms 120 --claude-latency-ms 900 \\
+        --rate-limit-every 40 --rate-limit-burst 4 --json load.json
+
+Starts the stand-in (benchmarks/standin.py) in-process, or uses --target for
+one already running, points image_classifier at it, and drives
+classify_from_url through one of:
+
+    serial   one URL at a time (the Streamlit path before background jobs)
+    threads  a ThreadPoolExecutor of --concurrency workers (the CLI path)
+    job      classify_jobs.submit_job on a temporary jobs directory (the
+             shared scheduler pool; --concurrency is ignored)
+
+Downloads go through a scratch asset mirror, so every request URL (kept
+distinct by its query string) crosses the network.  The report gives
+throughput, end-to-end tail latency, per-stage latency
+(classify_metrics), error causes (injected 503s, 429 bursts, …) and bytes
+per image: the originals' size against what was transferred (range-request
+previews; compare with --full-fetch, which also checks each corpus image's
+preview label against the heuristic on the full-size decode).
+"""
+
+from __future__ import annotations
+
+import argparse, json, sys, tempfile, time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import asset_mirror
+import image_classifier as ic
+import scheduler
+from benchmarks import standin
+from classify_metrics import QUANTILES, STAGE_KEYS, RunMetrics, percentile
+
+
+def _urls(base: str, paths: list[str], n: int) -> list[str]:
+    """*n* request URLs cycling over the corpus (a query string keeps repeats distinct)."""
+    return [f"{base}{paths[i % len(paths)]}?r={i}" for i in range(n)]
+
+
+def _timed(url: str):
+    t0  = time.perf_counter()
+    res = ic.classify_from_url(url)
+    return res, (time.perf_counter() - t0) * 1000
+
+
+def _run_serial(urls, _workers):
+    return [_timed(u) for u in urls]
+
+
+def _run_threads(urls, workers):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_timed, urls))
+
+
+def _run_job(urls, _workers):
+    import classify_jobs
+
+    classify_jobs.JOBS_DIR = Path(tempfile.mkdtemp(prefix="loadtest-jobs-"))
+    plan   = dict(unique={u: u for u in urls}, refs={u: [(i, "load", "")] for i, u in enumerate(urls)},
+                  total=len(urls))
+    job_id = classify_jobs.submit_job(plan, meta={"loadtest": True})
+    while classify_jobs.get_status(job_id)["status"] == "running":
+        time.sleep(0.05)
+    store = classify_jobs.job_results(job_id)
+    # the job only exposes results: per-URL end-to-end latency = sum of its stage timings
+    out = []
+    for i in range(len(store)):
+        timings = {k: col[i] for k, col in store.timings.items() if col[i] == col[i]}   # drop NaN
+        details = {"error": store.errors[i]} if i in store.errors else {}
+        res     = ic.ClassificationResult(store.label[i], store.confidence[i], store.stage[i],
+                                          details, timings)
+        out.append((res, sum(timings.get(k, 0.0) for k in STAGE_KEYS)))
+    return out
+
+
+MODES = {"serial": _run_serial, "threads": _run_threads, "job": _run_job}
+
+
+def _error_cause(res) -> str:
+    msg = str((res.details or {}).get("error", ""))
+    for code in ("429", "503", "404", "500"):
+        if code in msg:
+            return code
+    return "timeout" if "timed out" in msg.lower() else (msg[:40] or "unknown")
+
+
+def run(base: str, paths: list[str], mode: str, n: int, workers: int) -> dict:
+    urls = _urls(base, paths, n)
+    t0   = time.perf_counter()
+    out  = MODES[mode](urls, workers)
+    wall = time.perf_counter() - t0
+
+    metrics = RunMetrics.from_results([r for r, _ in out], wall_seconds=wall)
+    lat     = sorted(ms for _, ms in out)
+    errors  = Counter(_error_cause(r) for r, _ in out if r.stage == "error")
+    summary = metrics.summary()
+    concurrency = dict(serial=1, threads=workers, job=scheduler.POOL_SIZES["classify"])[mode]
+    return dict(mode=mode, requests=n, concurrency=concurrency,
+                wall_seconds=round(wall, 2), throughput=round(n / wall, 2),
+                end_to_end_ms={f"p{int(q * 100)}": round(percentile(lat, q), 1) for q in QUANTILES},
+                errors=dict(errors), by_stage=summary["by_stage"],
+                bytes_per_image=dict(original=round(summary["source_bytes"] / max(n, 1)),
+                                     transferred=round(summary["download_bytes"] / max(n, 1))),
+                previews=summary["previews"], stage_latency_ms=summary["latency_ms"])
+
+
+def _heuristic_full(url: str) -> ic.ClassificationResult:
+    """Heuristic on the original decoded at full size: the reference for previews."""
+    timings = {}
+    return ic.classify_image(ic.fetch_image(url, timings), timings, use_claude=False)
+
+
+def agreement(base: str, paths: list[str], workers: int, threshold: int) -> dict:
+    """Heuristic label from the PARTIAL_FETCH path vs from the full-size decode,
+    per preview kind.  confident_flips: disagreements at or above *threshold*,
+    which are never re-checked by Claude or a full download."""
+    urls = [f"{base}{p}" for p in paths if p.startswith("/img/")]
+    ic.PARTIAL_FETCH = True
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        previews = list(pool.map(lambda u: ic.classify_from_url(u + "?preview", use_claude=False), urls))
+        fulls    = list(pool.map(lambda u: _heuristic_full(u + "?full"), urls))
+    ic.PARTIAL_FETCH = False
+    out = {}
+    for pv, full in zip(previews, fulls):
+        if "error" in (pv.stage, full.stage):
+            continue
+        k = out.setdefault(pv.timings.get("preview", "none"), dict(agree=0, total=0, confident_flips=0))
+        k["total"] += 1
+        if pv.label == full.label:
+            k["agree"] += 1
+        elif pv.confidence >= threshold:
+            k["confident_flips"] += 1
+    return out
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--mode", choices=sorted(MODES), default="threads")
+    ap.add_argument("--requests", type=int, default=120)
+    ap.add_argument("-j", "--concurrency", type=int, default=8)
+    ap.add_argument("--target", help="base URL of a running stand-in (default: start one in-process)")
+    ap.add_argument("--force-claude", action="store_true",
+                    help="send every image to the Claude stage (CONFIDENCE_THRESHOLD = 101)")
+    ap.add_argument("--full-fetch", action="store_true",
+                    help="download every original whole (image_classifier.PARTIAL_FETCH = False) "
+                         "and check preview labels against full-size decodes")
+    ap.add_argument("--claude-rpm", type=float, default=0,
+                    help="shared Claude rate limit (scheduler.claude); 0 = unlimited")
+    ap.add_argument("--json", type=Path, help="also write the report here")
+    standin.add_config_args(ap)
+    args = ap.parse_args(argv)
+
+    if args.target:
+        import requests
+        base  = args.target.rstrip("/")
+        paths = requests.get(f"{base}/index.json", timeout=10).json()
+        stats = None
+    else:
+        _, base, stats, paths = standin.serve(standin.config_from_args(args))
+
+    ic.ANTHROPIC_URL   = f"{base}/v1/messages"
+    ic.KEEP_THUMBNAILS = False
+    scheduler.claude   = scheduler.TokenBucket(args.claude_rpm / 60, scheduler.CLAUDE_BURST)
+    asset_mirror.set_mirror(asset_mirror.AssetMirror(tempfile.mkdtemp(prefix="loadtest-mirror-")))
+    ic.PARTIAL_FETCH   = not args.full_fetch
+    threshold          = ic.CONFIDENCE_THRESHOLD
+    if args.force_claude:
+        ic.CONFIDENCE_THRESHOLD = 101
+
+    report = run(base, paths, args.mode, args.requests, args.concurrency)
+    if stats is not None:
+        report["server"] = dict(stats)
+    if args.full_fetch:
+        report["preview_agreement"] = agreement(base, paths, args.concurrency, threshold)
+
+    print(f"{report['mode']:8s} n={report['requests']}  c={report['concurrency']}  "
+          f"{report['throughput']} req/s  wall={report['wall_seconds']}s  "
+          + "  ".join(f"{k}={v}ms" for k, v in report["end_to_end_ms"].items()))
+    print(f"  stages: {report['by_stage']}   errors: {report['errors'] or 'none'}")
+    b = report["bytes_per_image"]
+    print(f"  bytes/image: {b['original'] / 1024:.0f} KB originals, {b['transferred'] / 1024:.0f} KB "
+          f"transferred   previews: {report['previews']}")
+    for kind, a in report.get("preview_agreement", {}).items():
+        print(f"  preview {kind:12s} labels agree with full decode {a['agree']}/{a['total']}, "
+              f"{a['confident_flips']} confident flip(s)")
+    for k, st in report["stage_latency_ms"].items():
+        print(f"  {k:12s} " + "  ".join(f"{q}={v}" for q, v in st.items()))
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=1) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
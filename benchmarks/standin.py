@@ -0,0 +1,210 @@
+"""
+standin.py  —  local stand-in for vendor CDNs and the Anthropic Messages API
+
+    python -m benchmarks.standin --port 8765 --latency-ms 80 --error-rate 0.02 \\
+        --claude-latency-ms 900 --rate-limit-every 50 --rate-limit-burst 5
+
+Serves the synthetic corpus (benchmarks/corpus.py), large camera-style JPEGs
+(progressive, 320 px or 160 px EXIF thumbnail, plain) and small PDF and video stubs, with
+Range requests, configurable latency, jitter, bandwidth and error rate, and
+emulates POST /v1/messages: a deterministic label per image after a
+configurable delay, with periodic bursts of 429s (with Retry-After).
+
+Point the classifier at it with ANTHROPIC_BASE_URL=http://127.0.0.1:8765
+(or set image_classifier.ANTHROPIC_URL in-process, as load_classifier does).
+"""
+
+from __future__ import annotations
+
+import argparse, hashlib, json, random, re, threading, time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.corpus import encode, encode_photo, make_corpus
+
+LABELS = ("main_product_image", "lifestyle", "informational",
+          "dimension", "swatch", "detail")
+
+
+@dataclass
+class StandInConfig:
+    n_images:          int   = 40
+    n_photos:          int   = 8        # large camera-style JPEGs: progressive / EXIF thumbnail / plain
+    n_pdfs:            int   = 4
+    n_videos:          int   = 2
+    seed:              int   = 1234
+    latency_ms:        float = 0.0      # per CDN response, before the first byte
+    jitter_ms:         float = 0.0      # uniform 0..jitter added to latency
+    bandwidth_kbps:    float = 0.0      # per connection; 0 = unthrottled
+    error_rate:        float = 0.0      # share of CDN requests answered 503
+    claude_latency_ms: float = 0.0
+    claude_jitter_ms:  float = 0.0
+    rate_limit_every:  int   = 0        # start a 429 burst every N API calls (0 = never)
+    rate_limit_burst:  int   = 0        # consecutive 429s per burst
+
+
+class _Corpus:
+    """path -> (content type, bytes), built once."""
+
+    def __init__(self, cfg: StandInConfig):
+        self.files = {}
+        for name, img in make_corpus(cfg.n_images, cfg.seed):
+            data = encode(img)
+            ext  = "jpg" if data[:2] == b"\xff\xd8" else "png"
+            self.files[f"/img/{name}.{ext}"] = ("image/jpeg" if ext == "jpg" else "image/png", data)
+        styles = (("prog", True, 0), ("exif", False, 320), ("base", False, 0), ("exif160", False, 160))
+        for i, (name, img) in enumerate(make_corpus(cfg.n_photos, cfg.seed + 1)):
+            style, progressive, exif = styles[i % len(styles)]
+            photo = img.convert("RGB").resize((3000, 2000))
+            self.files[f"/img/photo_{i:03d}_{style}.jpg"] = ("image/jpeg",
+                                                             encode_photo(photo, progressive, exif))
+        for i in range(cfg.n_pdfs):
+            self.files[f"/doc/spec_{i:03d}.pdf"] = ("application/pdf",
+                                                    b"%PDF-1.4\n" + bytes(20_000 + i) + b"\n%%EOF\n")
+        for i in range(cfg.n_videos):
+            self.files[f"/video/brand_{i:03d}.mp4"] = ("video/mp4", b"\x00\x00\x00\x18ftypmp42" + bytes(200_000))
+
+
+def _make_handler(cfg: StandInConfig, corpus: _Corpus, stats: dict):
+    rng  = random.Random(cfg.seed)
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):       # keep load-test output clean
+            pass
+
+        def _count(self, key: str) -> None:
+            with lock:
+                stats[key] = stats.get(key, 0) + 1
+
+        def _count_bytes(self, n: int) -> None:
+            with lock:
+                stats["cdn_bytes"] = stats.get("cdn_bytes", 0) + n
+
+        def _delay(self, base_ms: float, jitter_ms: float) -> None:
+            with lock:
+                extra = rng.uniform(0, jitter_ms) if jitter_ms else 0.0
+            if base_ms or extra:
+                time.sleep((base_ms + extra) / 1000)
+
+        def _send(self, code: int, ctype: str, body: bytes, headers: dict | None = None,
+                  throttle: bool = False) -> None:
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            if not throttle or not cfg.bandwidth_kbps:
+                self.wfile.write(body)
+                return
+            chunk = max(1024, int(cfg.bandwidth_kbps * 1024 / 20))      # ~20 writes / s
+            for i in range(0, len(body), chunk):
+                self.wfile.write(body[i:i + chunk])
+                time.sleep(len(body[i:i + chunk]) / (cfg.bandwidth_kbps * 1024))
+
+        # -- vendor CDN ------------------------------------------------------
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/index.json":
+                return self._send(200, "application/json", json.dumps(sorted(corpus.files)).encode())
+            self._count("cdn_requests")
+            self._delay(cfg.latency_ms, cfg.jitter_ms)
+            with lock:
+                fail = rng.random() < cfg.error_rate
+            if fail:
+                self._count("cdn_errors")
+                return self._send(503, "text/plain", b"stand-in: injected error")
+            hit = corpus.files.get(path)
+            if hit is None:
+                return self._send(404, "text/plain", b"not found")
+            ctype, body = hit
+            m = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+            if m:
+                start = int(m[1])
+                end   = min(int(m[2]) + 1 if m[2] else len(body), len(body))
+                if start >= len(body):
+                    return self._send(416, "text/plain", b"", {"Content-Range": f"bytes */{len(body)}"})
+                self._count_bytes(end - start)
+                return self._send(206, ctype, body[start:end],
+                                  {"Content-Range": f"bytes {start}-{end - 1}/{len(body)}"}, throttle=True)
+            self._count_bytes(len(body))
+            self._send(200, ctype, body, {"Accept-Ranges": "bytes"}, throttle=True)
+
+        # -- Anthropic Messages API ------------------------------------------
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path.split("?", 1)[0] != "/v1/messages":
+                return self._send(404, "text/plain", b"not found")
+            with lock:
+                n = stats["api_calls"] = stats.get("api_calls", 0) + 1
+            every, burst = cfg.rate_limit_every, cfg.rate_limit_burst
+            if every and burst and (n - 1) % every < burst:
+                self._count("api_429")
+                err = {"type": "error", "error": {"type": "rate_limit_error", "message": "stand-in burst"}}
+                return self._send(429, "application/json", json.dumps(err).encode(), {"retry-after": "1"})
+            self._delay(cfg.claude_latency_ms, cfg.claude_jitter_ms)
+            label = LABELS[hashlib.sha256(body).digest()[0] % len(LABELS)]
+            out   = {"id": f"msg_standin_{n}", "type": "message", "role": "assistant",
+                     "content": [{"type": "text", "text": label}],
+                     "stop_reason": "end_turn", "usage": {"input_tokens": 1600, "output_tokens": 3}}
+            self._send(200, "application/json", json.dumps(out).encode())
+
+    return Handler
+
+
+def serve(cfg: StandInConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+    """Start the stand-in on a daemon thread; returns (server, base_url, stats, paths)."""
+    cfg    = cfg or StandInConfig()
+    corpus = _Corpus(cfg)
+    stats  = {}
+    server = ThreadingHTTPServer((host, port), _make_handler(cfg, corpus, stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="standin", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}", stats, sorted(corpus.files)
+
+
+def add_config_args(ap: argparse.ArgumentParser) -> None:
+    d = StandInConfig()
+    ap.add_argument("--n-images", type=int, default=d.n_images)
+    ap.add_argument("--n-photos", type=int, default=d.n_photos)
+    ap.add_argument("--seed", type=int, default=d.seed)
+    ap.add_argument("--latency-ms", type=float, default=d.latency_ms)
+    ap.add_argument("--jitter-ms", type=float, default=d.jitter_ms)
+    ap.add_argument("--bandwidth-kbps", type=float, default=d.bandwidth_kbps)
+    ap.add_argument("--error-rate", type=float, default=d.error_rate)
+    ap.add_argument("--claude-latency-ms", type=float, default=d.claude_latency_ms)
+    ap.add_argument("--claude-jitter-ms", type=float, default=d.claude_jitter_ms)
+    ap.add_argument("--rate-limit-every", type=int, default=d.rate_limit_every)
+    ap.add_argument("--rate-limit-burst", type=int, default=d.rate_limit_burst)
+
+
+def config_from_args(args) -> StandInConfig:
+    return StandInConfig(n_images=args.n_images, n_photos=args.n_photos, seed=args.seed, latency_ms=args.latency_ms,
+                         jitter_ms=args.jitter_ms, bandwidth_kbps=args.bandwidth_kbps,
+                         error_rate=args.error_rate, claude_latency_ms=args.claude_latency_ms,
+                         claude_jitter_ms=args.claude_jitter_ms,
+                         rate_limit_every=args.rate_limit_every, rate_limit_burst=args.rate_limit_burst)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.standin")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    add_config_args(ap)
+    args = ap.parse_args(argv)
+    server, base, stats, paths = serve(config_from_args(args), args.host, args.port)
+    print(f"stand-in on {base}  ({len(paths)} files; list at {base}/index.json)")
+    print(f"export ANTHROPIC_BASE_URL={base}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,388 @@
+"""
+classify_jobs.py  —  background URL-classification jobs
+
+A job runs a classification plan (see asset_generator.plan_classification)
+on a worker thread outside the Streamlit script thread, so reruns and
+browser hiccups no longer throw the work away.  The UI only polls by job ID.
+The URLs themselves are classified on the shared scheduler.pool("classify"),
+queued under the submitting session (meta["session"]) so concurrent jobs
+from different sessions get an equal share of the workers.
+
+Everything is checkpointed under .cache/jobs/<job_id>/ :
+
+    plan.json        the plan + metadata                (written once)
+    results.ndjson   one line per classified unique URL (appended every N URLs)
+    state.json       status + counters                  (rewritten every N URLs)
+
+After a server restart a job shows up as "interrupted"; resume_job() reloads
+the plan, skips the URLs already in results.ndjson and carries on.  Jobs that
+ended more than RETENTION_DAYS ago are deleted when the next job is submitted.
+
+With a claude_budget.Budget the job runs in two phases: every URL through the
+cheap stages first (uncertain ones are checkpointed as "pending_claude"),
+then Claude calls in priority order until the budget is spent; the rest are
+finalised as "budget_skipped".  Later records for a URL supersede earlier ones.
+"""
+
+from __future__ import annotations
+
+import json, os, shutil, threading, time, traceback, uuid
+from dataclasses import asdict
+from pathlib import Path
+
+import claude_budget
+import image_classifier as ic
+import scheduler
+from result_store import ResultStore
+
+JOBS_DIR         = Path(".cache/jobs")
+CHECKPOINT_EVERY = 25           # URLs between flushes to disk
+RETENTION_DAYS   = float(os.environ.get("BELAMI_JOB_RETENTION_DAYS", 14))   # ended jobs, by last write
+
+_jobs: dict[str, "_Job"] = {}
+_meta: dict[str, dict] = {}     # job_id -> plan.json meta (written once, so never stale)
+_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Disk helpers
+# ---------------------------------------------------------------------------
+def _job_dir(job_id: str) -> Path:
+    return JOBS_DIR / job_id
+
+def _read_json(path: Path, default=None):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return default
+
+def _write_json(path: Path, obj) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(obj))
+    tmp.replace(path)
+
+def _read_results(job_id: str) -> dict:
+    """{norm_url: result record} from results.ndjson (tolerates a torn last line)."""
+    out = {}
+    path = _job_dir(job_id) / "results.ndjson"
+    if not path.exists():
+        return out
+    with path.open() as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            out[rec["norm"]] = rec
+    return out
+
+def _drop_torn_line(job_id: str) -> None:
+    """Cut a half-written last line off results.ndjson, so appends start on a fresh line."""
+    try:
+        with (_job_dir(job_id) / "results.ndjson").open("rb+") as f:
+            pos = f.seek(0, os.SEEK_END)
+            if not pos:
+                return
+            f.seek(pos - 1)
+            if f.read(1) == b"\n":
+                return
+            while pos:
+                step = min(pos, 1 << 16)
+                pos -= step
+                f.seek(pos)
+                nl = f.read(step).rfind(b"\n")
+                if nl >= 0:
+                    f.truncate(pos + nl + 1)
+                    return
+            f.truncate(0)
+    except OSError:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+PENDING = "pending_claude"
+
+
+def _result(rec: dict) -> ic.ClassificationResult:
+    return ic.ClassificationResult(**{k: rec[k] for k in ("label", "confidence", "stage", "details", "timings")})
+
+
+class _Job:
+    def __init__(self, job_id: str, plan: dict, meta: dict, done: set,
+                 budget: claude_budget.Budget | None = None,
+                 pending: dict | None = None, state: dict | None = None):
+        state = state or {}
+        self.job_id   = job_id
+        self.plan     = plan
+        self.meta     = meta
+        self.owner    = meta.get("session") or job_id
+        self.budget   = budget
+        self.pending  = pending or {}           # norm -> record awaiting Claude (budget mode)
+        self.total    = len(plan["unique"])
+        self.done     = len(done)
+        self.skip     = done | set(self.pending)
+        self.errors   = state.get("errors", 0)
+        self.status   = "running"
+        self.phase    = "classify"
+        self.error    = ""
+        self.claude_calls   = state.get("claude_calls", 0)
+        self.claude_seconds = state.get("claude_seconds", 0.0)
+        self.started  = time.time()
+        self.done_at_start = self.done
+        self.stop     = threading.Event()
+        self.thread   = threading.Thread(target=self._run, name=f"classify-{job_id}", daemon=True)
+
+    # -- progress ------------------------------------------------------------
+    def snapshot(self) -> dict:
+        elapsed = max(time.time() - self.started, 1e-6)
+        rate    = (self.done - self.done_at_start) / elapsed
+        remain  = self.total - self.done
+        return dict(job_id=self.job_id, status=self.status, done=self.done, total=self.total,
+                    errors=self.errors, elapsed=round(elapsed, 1),
+                    throughput=round(rate, 2),
+                    eta=round(remain / rate, 1) if rate > 0 and remain else None,
+                    error=self.error, meta=self.meta, phase=self.phase,
+                    queued=len(self.pending), claude_calls=self.claude_calls,
+                    claude_seconds=round(self.claude_seconds, 1),
+                    budget=asdict(self.budget) if self.budget else None)
+
+    def _checkpoint(self, buffer: list) -> None:
+        d = _job_dir(self.job_id)
+        if buffer:
+            with (d / "results.ndjson").open("a") as f:
+                for rec in buffer:
+                    f.write(json.dumps(rec) + "\n")
+            buffer.clear()
+        snap = self.snapshot()
+        _write_json(d / "state.json", {k: snap[k] for k in ("status", "done", "total", "errors", "error", "elapsed",
+                                                            "phase", "queued", "claude_calls", "claude_seconds")})
+
+    # -- main loop -----------------------------------------------------------
+    def _emit(self, buffer: list, norm: str, url: str, res: ic.ClassificationResult) -> None:
+        buffer.append({"norm": norm, "url": url, **asdict(res)})
+        if res.stage != PENDING:
+            self.done   += 1
+            self.errors += res.stage == "error"
+        if len(buffer) >= CHECKPOINT_EVERY:
+            self._checkpoint(buffer)
+
+    def _classify(self, item: tuple[str, str]) -> ic.ClassificationResult:
+        return ic.classify_from_url(item[1], use_claude=self.budget is None)
+
+    def _run(self) -> None:
+        buffer   = []
+        deferred = self.budget is not None
+        todo     = ((n, u) for n, u in self.plan["unique"].items() if n not in self.skip)
+        status   = "failed"
+        try:
+            for (norm, url), fut in scheduler.pool("classify").map_unordered(
+                    self.owner, self._classify, todo, stop=self.stop):
+                res = fut.result()
+                if deferred and res.stage == "heuristic" and res.confidence < ic.CONFIDENCE_THRESHOLD:
+                    res.stage = PENDING
+                    self.pending[norm] = {"norm": norm, "url": url, **asdict(res)}
+                self._emit(buffer, norm, url, res)
+            if self.stop.is_set():
+                status = "cancelled"
+            else:
+                status = self._run_claude(buffer) if deferred else "done"
+        except Exception as exc:
+            self.error = f"{exc}\n{traceback.format_exc()}"
+        finally:
+            # readers load results.ndjson once they see a terminal status, so the
+            # buffered records are flushed first and state.json is written last
+            self._checkpoint(buffer)
+            self.status = status
+            self._checkpoint(buffer)
+
+    def _refine(self, norm: str) -> ic.ClassificationResult:
+        rec = self.pending[norm]
+        return ic.refine_with_claude(rec["url"], _result({**rec, "stage": "heuristic"}))
+
+    def _run_claude(self, buffer: list) -> str:
+        """Budget mode, phase 2: Claude on the queued images, best first.
+
+        Calls still in flight count against the budget, so parallel workers
+        never overshoot it by more than the calls already admitted.
+        claude_seconds is the wall time of this phase (carried over a resume),
+        not the sum of the parallel calls' durations.
+        """
+        self.phase = "claude"
+        refs     = self.plan["refs"]
+        order    = claude_budget.prioritise(
+            [(norm, [col for _, col, _ in refs.get(norm, ())], rec) for norm, rec in self.pending.items()])
+        inflight = 0
+        base, t0 = self.claude_seconds, time.time()
+
+        def spent() -> float:
+            self.claude_seconds = base + time.time() - t0
+            return self.claude_seconds
+
+        def admitted():
+            nonlocal inflight
+            for norm in order:
+                if self.budget.exhausted(self.claude_calls + inflight, spent()):
+                    return
+                inflight += 1
+                yield norm
+
+        for norm, fut in scheduler.pool("classify").map_unordered(
+                self.owner, self._refine, admitted(), stop=self.stop):
+            inflight -= 1
+            res = fut.result()
+            rec = self.pending.pop(norm)
+            self.claude_calls += 1
+            self._emit(buffer, norm, rec["url"], res)
+        spent()
+        if self.stop.is_set():
+            return "cancelled"
+
+        why = self.budget.exhausted(self.claude_calls, self.claude_seconds) or "calls"
+        for norm in order:
+            rec = self.pending.pop(norm, None)
+            if rec is None:
+                continue
+            res = _result({**rec, "stage": "budget_skipped"})
+            res.details["budget_exhausted"] = why
+            self._emit(buffer, norm, rec["url"], res)
+        return "done"
+
+
+# ---------------------------------------------------------------------------
+# PUBLIC
+# ---------------------------------------------------------------------------
+def submit_job(plan: dict, meta: dict | None = None,
+               budget: claude_budget.Budget | None = None) -> str:
+    """Persist *plan* and start classifying it in the background; returns the job ID.
+
+    With *budget*, Claude calls are capped and spent in priority order.
+    """
+    prune_jobs()
+    job_id = uuid.uuid4().hex[:12]
+    d = _job_dir(job_id)
+    d.mkdir(parents=True, exist_ok=True)
+    meta = {**(meta or {}), "created": time.strftime("%Y-%m-%d %H:%M:%S")}
+    _write_json(d / "plan.json", {"plan": plan, "meta": meta,
+                                  "budget": asdict(budget) if budget else None})
+    with _lock:
+        _start(job_id, plan, meta, set(), budget)
+    return job_id
+
+def resume_job(job_id: str, session: str | None = None) -> bool:
+    """Restart an interrupted/cancelled job from its last checkpoint
+    (queued under *session* in the shared pool, if given).
+
+    The liveness check and the restart happen under one lock, so two quick
+    resumes (or the page and the API together) never start two writers.
+    """
+    with _lock:
+        live = _jobs.get(job_id)
+        if live and live.thread.is_alive():
+            return True
+        saved = _read_json(_job_dir(job_id) / "plan.json")
+        if not saved:
+            return False
+        _drop_torn_line(job_id)
+        recs    = _read_results(job_id)
+        pending = {n: r for n, r in recs.items() if r["stage"] == PENDING}
+        budget  = saved.get("budget")
+        meta    = {**saved["meta"], "session": session} if session else saved["meta"]
+        _start(job_id, saved["plan"], meta, set(recs) - set(pending),
+               claude_budget.Budget(**budget) if budget else None, pending,
+               _read_json(_job_dir(job_id) / "state.json", {}))
+    return True
+
+def _start(job_id: str, plan: dict, meta: dict, done: set, budget=None,
+           pending: dict | None = None, state: dict | None = None) -> None:
+    """Register and start the job's thread; the caller holds _lock."""
+    job = _jobs[job_id] = _Job(job_id, plan, meta, done, budget, pending, state)
+    job.thread.start()
+
+def cancel_job(job_id: str) -> None:
+    with _lock:
+        job = _jobs.get(job_id)
+    if job:
+        job.stop.set()
+
+def get_status(job_id: str) -> dict | None:
+    """Live progress (throughput in URLs/s, ETA in s) or the last checkpoint on disk."""
+    with _lock:
+        job = _jobs.get(job_id)
+    if job:
+        return job.snapshot()
+    state = _read_json(_job_dir(job_id) / "state.json")
+    saved = _read_json(_job_dir(job_id) / "plan.json")
+    if state is None or saved is None:
+        return None
+    if state["status"] == "running":          # process died mid-run
+        state["status"] = "interrupted"
+    state.setdefault("elapsed", None)
+    return dict(job_id=job_id, throughput=None, eta=None, meta=saved["meta"],
+                budget=saved.get("budget"), **state)
+
+def _job_meta(job_id: str) -> dict | None:
+    meta = _meta.get(job_id)
+    if meta is None:
+        saved = _read_json(_job_dir(job_id) / "plan.json")
+        if saved is None:
+            return None
+        meta = _meta[job_id] = saved["meta"]
+    return meta
+
+def list_jobs(session: str | None = None, include_api: bool = False) -> list[dict]:
+    """Status of the jobs on disk, newest first: only *session*'s if given, and jobs
+    submitted over the HTTP API (meta source "api") only with *include_api*."""
+    if not JOBS_DIR.exists():
+        return []
+    out = []
+    for d in JOBS_DIR.iterdir():
+        meta = _job_meta(d.name) if d.is_dir() else None
+        if (meta is None or (session is not None and meta.get("session") != session)
+                or (meta.get("source") == "api" and not include_api)):
+            continue
+        status = get_status(d.name)
+        if status:
+            out.append(status)
+    out.sort(key=lambda s: s["meta"].get("created", ""), reverse=True)
+    return out
+
+def prune_jobs(max_age_days: float = RETENTION_DAYS) -> int:
+    """Delete jobs not running here and not written to for *max_age_days*
+    (done, failed, cancelled or long interrupted); returns how many were removed."""
+    if not JOBS_DIR.exists():
+        return 0
+    cutoff  = time.time() - max_age_days * 86400
+    removed = 0
+    for d in JOBS_DIR.iterdir():
+        with _lock:
+            live = _jobs.get(d.name)
+        if not d.is_dir() or (live and live.thread.is_alive()):
+            continue
+        try:
+            stale = max(f.stat().st_mtime for f in d.iterdir()) < cutoff
+        except (OSError, ValueError):
+            continue
+        if stale:
+            shutil.rmtree(d, ignore_errors=True)
+            _meta.pop(d.name, None)
+            removed += 1
+    return removed
+
+def iter_results(job_id: str):
+    """Latest record per classified unique URL (norm, url, label, confidence, stage, …)."""
+    yield from _read_results(job_id).values()
+
+def job_results(job_id: str) -> ResultStore:
+    """Classified URLs fanned out to every (row, column) that referenced them."""
+    store = ResultStore()
+    saved = _read_json(_job_dir(job_id) / "plan.json")
+    if not saved:
+        return store
+    done = _read_results(job_id)
+    for norm, refs in saved["plan"]["refs"].items():
+        rec = done.get(norm)
+        if rec is not None:
+            store.add_fanout(rec["url"], rec, refs)
+    return store
@@ -0,0 +1,128 @@
+"""
+classify_metrics.py  —  run-level latency / throughput aggregation
+
+Feed it ClassificationResult objects (or the dicts the UI and job runner keep)
+and it reports p50 / p95 / p99 per pipeline stage, stage counts, bytes moved
+(against the size of the originals) and throughput — as a dict, JSON, or
+Prometheus text exposition format.
+"""
+
+from __future__ import annotations
+
+import json, math, time
+from collections import Counter
+
+# Latency keys recorded in ClassificationResult.timings, in pipeline order
+STAGE_KEYS = ("download_ms", "decode_ms", "analyze_ms", "learned_ms", "encode_ms", "claude_ms")
+QUANTILES  = (0.5, 0.95, 0.99)
+
+
+def percentile(sorted_vals: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already-sorted list."""
+    if not sorted_vals:
+        return 0.0
+    # round() first: 0.07 * 100 is 7.000000000000001, whose ceil would skip a rank
+    k = max(0, min(len(sorted_vals) - 1, math.ceil(round(q * len(sorted_vals), 9)) - 1))
+    return sorted_vals[k]
+
+
+class RunMetrics:
+    def __init__(self):
+        self.samples  = {k: [] for k in STAGE_KEYS}
+        self.stages   = Counter()
+        self.bytes    = 0               # transferred
+        self.source_bytes = 0           # size of the originals (what a full download would move)
+        self.previews = Counter()       # image_preview kind per URL result
+        self.cache_hits = 0
+        self.count    = 0
+        self.started  = time.time()
+        self.finished = None
+
+    def add(self, result) -> None:
+        """Record one result (ClassificationResult or a dict with stage/timings)."""
+        if isinstance(result, dict):
+            stage, timings = result.get("stage"), result.get("timings") or {}
+        else:
+            stage, timings = result.stage, result.timings or {}
+        self.count += 1
+        self.stages[stage] += 1
+        self.bytes += int(timings.get("download_bytes", 0))
+        self.source_bytes += int(timings.get("source_bytes", 0))
+        if timings.get("preview"):
+            self.previews[timings["preview"]] += 1
+        self.cache_hits += bool(timings.get("cache_hit"))
+        for k in STAGE_KEYS:
+            if k in timings:
+                self.samples[k].append(float(timings[k]))
+
+    def finish(self, wall_seconds: float | None = None) -> "RunMetrics":
+        """Freeze the wall clock (or set it explicitly, e.g. from a job's elapsed time)."""
+        self.finished = self.started + wall_seconds if wall_seconds is not None else time.time()
+        return self
+
+    @classmethod
+    def from_results(cls, results, wall_seconds: float | None = None) -> "RunMetrics":
+        m = cls()
+        for r in results:
+            m.add(r)
+        return m.finish(wall_seconds)
+
+    @classmethod
+    def from_store(cls, store, wall_seconds: float | None = None) -> "RunMetrics":
+        """From a result_store.ResultStore — one sample per unique URL, read from its columns."""
+        m = cls()
+        for i in store.first_row_per_url():
+            m.count += 1
+            m.stages[store.stage[i]] += 1
+            m.cache_hits += store.cache_hit[i]
+            m.bytes += store.timings["download_bytes"][i]
+            m.source_bytes += store.timings["source_bytes"][i]
+            for k in STAGE_KEYS:
+                v = store.timings[k][i]
+                if not math.isnan(v):
+                    m.samples[k].append(v)
+        return m.finish(wall_seconds)
+
+    # -- reporting -----------------------------------------------------------
+    def summary(self) -> dict:
+        wall  = max((self.finished or time.time()) - self.started, 1e-9)
+        stats = {}
+        for k, vals in self.samples.items():
+            if not vals:
+                continue
+            s = sorted(vals)
+            stats[k] = dict(n=len(s), mean=round(sum(s) / len(s), 2),
+                            **{f"p{int(q * 100)}": round(percentile(s, q), 2) for q in QUANTILES})
+        return dict(count=self.count, wall_seconds=round(wall, 2),
+                    throughput=round(self.count / wall, 3),
+                    download_bytes=self.bytes, source_bytes=self.source_bytes,
+                    previews=dict(self.previews), cache_hits=self.cache_hits,
+                    by_stage=dict(self.stages), latency_ms=stats)
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), indent=1)
+
+    def to_prometheus(self, prefix: str = "belami_classify") -> str:
+        s   = self.summary()
+        out = [f"# HELP {prefix}_stage_latency_ms Per-stage latency of image classification.",
+               f"# TYPE {prefix}_stage_latency_ms summary"]
+        for k, st in s["latency_ms"].items():
+            stage = k[:-3]
+            for q in QUANTILES:
+                out.append(f'{prefix}_stage_latency_ms{{stage="{stage}",quantile="{q}"}} '
+                           f'{st[f"p{int(q * 100)}"]}')
+            out.append(f'{prefix}_stage_latency_ms_sum{{stage="{stage}"}} {round(st["mean"] * st["n"], 2)}')
+            out.append(f'{prefix}_stage_latency_ms_count{{stage="{stage}"}} {st["n"]}')
+        out += [f"# HELP {prefix}_results_total Classified images by final stage.",
+                f"# TYPE {prefix}_results_total counter"]
+        for stage, n in sorted(s["by_stage"].items()):
+            out.append(f'{prefix}_results_total{{stage="{stage}"}} {n}')
+        out += [f"# TYPE {prefix}_download_bytes_total counter",
+                f"{prefix}_download_bytes_total {s['download_bytes']}",
+                f"# TYPE {prefix}_source_bytes_total counter",
+                f"{prefix}_source_bytes_total {s['source_bytes']}",
+                f"# TYPE {prefix}_cache_hits_total counter",
+                f"{prefix}_cache_hits_total {s['cache_hits']}",
+                f"# TYPE {prefix}_throughput_per_second gauge",
+                f"{prefix}_throughput_per_second {s['throughput']}"]
+        return "\n".join(out) + "\n"
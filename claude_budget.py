@@ -0,0 +1,86 @@
+"""
+claude_budget.py  —  cap the Claude stage and spend it where it matters most
+
+Without a budget every uncertain heuristic result gets a Claude call, first
+come first served.  With one, a job first runs the cheap stages over every
+URL, queues the uncertain images, and then calls Claude in priority order
+until the budget (calls, wall time of the Claude phase, or estimated spend) runs
+out.  Whatever is left keeps its heuristic label with stage "budget_skipped".
+
+Priority, highest first:
+    1. images referenced from a main-image column
+    2. perceptually unique images (dHash not within DUP_BITS of one ahead in the queue)
+    3. lowest heuristic confidence
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+COST_PER_CALL_USD    = 0.002        # Haiku, one ~1 MP image + short prompt (estimate)
+MAIN_COLUMN_KEYWORDS = ("main", "primary", "hero")
+DUP_BITS             = 6            # dHash Hamming distance treated as "same picture"
+
+
+@dataclass
+class Budget:
+    max_calls:     int | None   = None
+    max_seconds:   float | None = None      # wall time of the Claude phase, not summed call time
+    max_spend:     float | None = None      # USD, at cost_per_call
+    cost_per_call: float        = COST_PER_CALL_USD
+
+    def exhausted(self, calls: int, seconds: float) -> str:
+        """Reason the budget is used up ("" while another call still fits)."""
+        if self.max_calls is not None and calls >= self.max_calls:
+            return "calls"
+        if self.max_spend is not None and (calls + 1) * self.cost_per_call > self.max_spend:
+            return "spend"
+        if self.max_seconds is not None and seconds >= self.max_seconds:
+            return "seconds"
+        return ""
+
+
+def is_main_column(col: str) -> bool:
+    c = str(col).lower()
+    return any(k in c for k in MAIN_COLUMN_KEYWORDS)
+
+
+class _NearDupIndex:
+    """dHash lookup via 4 x 16-bit bands.  Hashes within 3 bits always share a
+    band (most within DUP_BITS do); candidates are then checked exactly."""
+
+    def __init__(self):
+        self.bands = [{} for _ in range(4)]
+
+    def _keys(self, h: int):
+        return [(h >> (16 * i)) & 0xFFFF for i in range(4)]
+
+    def near(self, h: int) -> bool:
+        for band, key in zip(self.bands, self._keys(h)):
+            for other in band.get(key, ()):
+                if bin(h ^ other).count("1") <= DUP_BITS:
+                    return True
+        return False
+
+    def add(self, h: int) -> None:
+        for band, key in zip(self.bands, self._keys(h)):
+            band.setdefault(key, []).append(h)
+
+
+def prioritise(items: list[tuple[str, list[str], dict]]) -> list[str]:
+    """Order queued (key, source columns, result record) items by expected value."""
+    base = sorted(items, key=lambda it: (not any(is_main_column(c) for c in it[1]),
+                                         it[2]["confidence"]))
+    index, ranked = _NearDupIndex(), []
+    for rank, (key, cols, rec) in enumerate(base):
+        dh  = (rec.get("details") or {}).get("dhash")
+        dup = False
+        if dh:
+            h   = int(dh, 16)
+            dup = index.near(h)
+            if not dup:
+                index.add(h)
+        main = any(is_main_column(c) for c in cols)
+        ranked.append(((not main, dup, rec["confidence"], rank), key))
+    ranked.sort()
+    return [key for _, key in ranked]
@@ -0,0 +1,120 @@
+"""
+disk_cache.py  —  size-capped, content-keyed byte cache on local disk
+
+Each entry is two files under the cache root:
+
+    <key[:2]>/<key>.bin    the stored bytes
+    <key[:2]>/<key>.json   small metadata dict (timings, encode settings …)
+
+Recency is tracked through the data file's mtime (touched on every hit), so
+eviction is plain LRU and survives restarts without a separate index.
+"""
+
+from __future__ import annotations
+
+import hashlib, json, os, tempfile, threading
+from pathlib import Path
+
+
+def content_key(data: bytes, **params) -> str:
+    """SHA-256 of *data* plus the (sorted) parameters that shaped the output."""
+    h = hashlib.sha256(data)
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+class DiskCache:
+    """Bytes + metadata keyed by hex digest, evicted least-recently-used."""
+
+    def __init__(self, root: str | os.PathLike, max_bytes: int):
+        self.root      = Path(root)
+        self.max_bytes = int(max_bytes)
+        self._lock     = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._total    = sum(p.stat().st_size for p in self.root.glob("*/*.bin"))
+
+    # -- paths ---------------------------------------------------------------
+    def _data_path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.bin"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    # -- public --------------------------------------------------------------
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def get(self, key: str) -> tuple[bytes, dict] | None:
+        """Return ``(data, meta)`` and mark the entry as recently used."""
+        path = self._data_path(key)
+        try:
+            data = path.read_bytes()
+            meta = json.loads(self._meta_path(key).read_text())
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data, meta
+
+    def put(self, key: str, data: bytes, meta: dict | None = None) -> None:
+        """Store *data* atomically, then evict down to ``max_bytes``."""
+        if len(data) > self.max_bytes:
+            return
+        path = self._data_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            old = path.stat().st_size if path.exists() else 0
+            self._atomic_write(self._meta_path(key), json.dumps(meta or {}).encode())
+            self._atomic_write(path, data)
+            self._total += len(data) - old
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            for p in self.root.glob("*/*"):
+                try:
+                    p.unlink()
+                except OSError:
+                    pass
+            self._total = 0
+
+    # -- internals -----------------------------------------------------------
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def _evict(self) -> None:
+        """Drop oldest entries until the cache is back under ~90 % of the cap."""
+        entries = []
+        for p in self.root.glob("*/*.bin"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+        self._total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, p in entries:
+            if self._total <= target:
+                break
+            try:
+                p.unlink()
+                p.with_suffix(".json").unlink(missing_ok=True)
+            except OSError:
+                continue
+            self._total -= size
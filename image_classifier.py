@@ -5,21 +5,38 @@ Stage 1: Pillow heuristics  (instant, CPU, no network)
          Catches the obvious 80 %: product-on-white, swatch, infographic …
          Returns confidence 65-90.
 
-Stage 2: Claude Haiku vision API  (only for the uncertain 20 %)
+Stage 1b: learned signal model  (optional, see signal_model.py)
+         Logistic regression over the same signals, trained on logged
+         Claude labels; answers only when its calibrated probability is high.
+
+Stage 2: Claude Haiku vision API  (only for the still-uncertain rest)
          Sends the image as base64 → gets back a label.
          Returns confidence 92.
 
 No heavy models.  No GPU.  Works on any CPU server.
+
+Headless use (NDJSON, one result per line as soon as it finishes):
+
+    python -m image_classifier urls.txt -o results.ndjson -j 16
+    cat urls.txt | python -m image_classifier - > results.ndjson
+    python -m image_classifier vendor.xlsx --sheet Products --header-row 2 \
+           --columns "Image URL - Main" -o results.ndjson --resume
 """
 
 from __future__ import annotations
 
-import base64, io, traceback
-from dataclasses import dataclass, field
+import argparse, base64, io, json, os, sys, threading, time, traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
+from urllib.parse import urlsplit
 
 from PIL import Image, ImageFilter
 
+import asset_mirror
+import image_preview
+import scheduler
+
 # ---------------------------------------------------------------------------
 # Labels  (match Belami mediatype values exactly)
 # ---------------------------------------------------------------------------
@@ -27,6 +44,14 @@ LABELS = ("main_product_image", "lifestyle", "informational",
           "dimension", "swatch", "detail")
 
 CONFIDENCE_THRESHOLD = 65   # below this → route to Claude
+KEEP_THUMBNAILS      = True # store a gallery preview while the image is decoded
+PARTIAL_FETCH        = True # classify URLs from a range-request preview when one will do
+
+_PDF_EXTS   = (".pdf",)
+_VIDEO_EXTS = (".mp4", ".mov", ".avi", ".wmv", ".webm")
+
+# ANTHROPIC_BASE_URL points the Claude stage at a stand-in (benchmarks/standin.py)
+ANTHROPIC_URL = os.environ.get("ANTHROPIC_BASE_URL", "https://api.anthropic.com").rstrip("/") + "/v1/messages"
 
 
 # ---------------------------------------------------------------------------
@@ -36,8 +61,14 @@ CONFIDENCE_THRESHOLD = 65   # below this → route to Claude
 class ClassificationResult:
     label:      str                             # one of LABELS
     confidence: int                             # 0-100
-    stage:      str                             # "heuristic" | "claude_api" | "error"
+    stage:      str                             # "heuristic" | "learned" | "claude_api" | "error"
     details:    dict = field(default_factory=dict)
+    timings:    dict = field(default_factory=dict)  # *_ms per stage, download/source_bytes, cache_hit, preview
+
+
+def elapsed_ms(t0: float) -> float:
+    """Milliseconds since the perf_counter() reading *t0* (stage timings)."""
+    return round((time.perf_counter() - t0) * 1000, 2)
 
 
 # ===========================================================================
@@ -45,9 +76,10 @@ class ClassificationResult:
 # ===========================================================================
 
 def _analyze(img: Image.Image) -> dict:
-    """Seven numeric signals extracted at 200x200."""
+    """Seven numeric signals extracted at 200x200 (+ cheap extras for the learned stage)."""
     if img.mode != "RGB":
         img = img.convert("RGB")
+    aspect = img.width / img.height if img.height else 1.0
 
     sm     = img.resize((200, 200), Image.LANCZOS)
     pixels = list(sm.getdata())          # 40 000 x (R,G,B)
@@ -83,6 +115,11 @@ def _analyze(img: Image.Image) -> dict:
     mean_g = sum(glist) / N
     gs     = (sum((p - mean_g)**2 for p in glist) / N) ** 0.5
 
+    # --- colour histogram  (4 bins per channel, fractions) ---
+    h    = sm.histogram()
+    hist = [round(sum(h[c*256 + b*64 : c*256 + b*64 + 64]) / N, 3)
+            for c in range(3) for b in range(4)]
+
     return dict(
         white_pct=round(white_pct, 1),
         light_pct=round(light_pct, 1),
@@ -91,6 +128,8 @@ def _analyze(img: Image.Image) -> dict:
         text_blocks=tb,
         center_light=round(c_lp, 1),
         gray_std=round(gs, 1),
+        aspect_ratio=round(aspect, 3),
+        color_hist=hist,
     )
 
 
@@ -129,6 +168,16 @@ def _classify_signals(s: dict) -> tuple[str, int]:
     return ("detail", 55)
 
 
+def _dhash(img: Image.Image) -> str:
+    """64-bit difference hash (hex) -- near-identical images differ in a few bits."""
+    g = list(img.convert("L").resize((9, 8), Image.BILINEAR).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (g[row * 9 + col] > g[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
 def classify_pil(img: Image.Image) -> ClassificationResult:
     """Heuristic-only.  Fast.  Call this first."""
     try:
@@ -141,6 +190,28 @@ def classify_pil(img: Image.Image) -> ClassificationResult:
                                     stage="error", details={"error": str(exc)})
 
 
+# ===========================================================================
+# STAGE 1b — LEARNED SIGNAL MODEL  (only if signal_model.json has been trained)
+# ===========================================================================
+
+def _classify_learned(result: ClassificationResult) -> ClassificationResult | None:
+    """Calibrated model answer, or None to escalate to Claude."""
+    if result.stage != "heuristic":
+        return None
+    import signal_model
+    model = signal_model.get_model()
+    if model is None:
+        return None
+    pred = model.predict(result.details)
+    # never below the confident bar (signal_model.MIN_THRESHOLD)
+    if pred is None or pred[1] < model.accept_threshold:
+        return None
+    label, p = pred
+    return ClassificationResult(
+        label=label, confidence=int(p * 100), stage="learned",
+        details={**result.details, "heuristic_label": result.label, "learned_p": round(p, 4)})
+
+
 # ===========================================================================
 # STAGE 2 — CLAUDE HAIKU VISION  (sync, called only when heuristic < 65 %)
 # ===========================================================================
@@ -159,10 +230,22 @@ Look at this image and pick EXACTLY ONE label:
 Respond with ONLY the label, nothing else."""
 
 
+CLAUDE_RETRIES = 3          # 429s retried after Retry-After (shared pause, see scheduler.claude)
+
+
+def _retry_after(resp, attempt: int) -> float:
+    try:
+        return float(resp.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return 2.0 ** attempt
+
+
 def _call_claude(jpeg_bytes: bytes) -> str:
-    """POST image to Anthropic, return raw text label."""
-    import requests                         # sync -- fine for Streamlit
+    """POST image to Anthropic, return raw text label.
 
+    Every call takes a token from the process-wide bucket; a 429 pauses the
+    bucket for all sessions before retrying.
+    """
     b64 = base64.b64encode(jpeg_bytes).decode()
     body = {
         "model": "claude-haiku-4-5-20251001",   # fast + cheap
@@ -178,12 +261,17 @@ def _call_claude(jpeg_bytes: bytes) -> str:
             ],
         }],
     }
-    resp = requests.post(
-        "https://api.anthropic.com/v1/messages",
-        json=body,
-        headers={"Content-Type": "application/json"},
-        timeout=30,
-    )
+    for attempt in range(CLAUDE_RETRIES + 1):
+        scheduler.claude.acquire()
+        resp = http_session().post(
+            ANTHROPIC_URL,
+            json=body,
+            headers={"Content-Type": "application/json"},
+            timeout=30,
+        )
+        if resp.status_code != 429 or attempt == CLAUDE_RETRIES:
+            break
+        scheduler.claude.pause(_retry_after(resp, attempt))
     resp.raise_for_status()
     return resp.json()["content"][0]["text"].strip().lower()
 
@@ -221,61 +309,371 @@ def _sanitise(raw: str) -> str:
 # PUBLIC  -- main entry points used by asset_generator
 # ===========================================================================
 
-def classify_from_url(url: str) -> ClassificationResult:
-    """Download image at *url* -> heuristic -> Claude if uncertain."""
-    import requests
+_session      = None
+_session_lock = threading.Lock()
+
+def http_session():
+    """Pooled requests.Session shared by every download and Claude call in the process."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            _session = s
+        return _session
+
+
+def download(url: str, timings: dict, head: bytes = b"", head_headers: dict | None = None):
+    """(seekable buffer, content type) of *url* via the asset mirror (mmap for large files);
+    the caller closes the buffer once it is decoded.
+
+    *head* / *head_headers*: a range prefix already read (image_preview); only the
+    rest is requested.  download_bytes counts what crossed the network and
+    source_bytes the size of the original; cache_hit is set when the mirror
+    answered without a download.
+    """
+    t0         = time.perf_counter()
+    buf, asset = asset_mirror.open_url(url, head, head_headers)
+    timings.update(download_ms=timings.get("download_ms", 0) + elapsed_ms(t0),
+                   download_bytes=timings.get("download_bytes", 0) + asset.transferred,
+                   source_bytes=asset.size, cache_hit=asset.status != "fetched")
+    return buf, asset.content_type
+
+
+def _not_an_image(url: str, ctype: str, timings: dict) -> ClassificationResult | None:
+    """spec_sheet / video result for PDFs and videos (no vision analysis or preview possible)."""
+    path     = urlsplit(url).path.lower()
+    is_pdf   = "pdf" in ctype or path.endswith(_PDF_EXTS)
+    is_video = ctype.startswith("video/") or path.endswith(_VIDEO_EXTS)
+    if KEEP_THUMBNAILS and (is_pdf or is_video):
+        import thumbnail_cache
+        thumbnail_cache.get_cache().put(url, b"")
+
+    if is_pdf:
+        return ClassificationResult(
+            label="spec_sheet", confidence=95, stage="heuristic",
+            details={"note": "PDF detected from Content-Type / extension"},
+            timings=timings)
 
+    if is_video:
+        return ClassificationResult(
+            label="video", confidence=95, stage="heuristic",
+            details={"note": "Video detected from extension"},
+            timings=timings)
+    return None
+
+
+def classify_from_url(url: str, use_claude: bool = True) -> ClassificationResult:
+    """Download image at *url* -> heuristic -> Claude if uncertain.
+
+    With PARTIAL_FETCH the heuristic sees the smallest preview image_preview
+    can get from a byte range (EXIF / JFIF thumbnail, progressive JPEG's first
+    scans).  The rest of the file is fetched only when there is no usable
+    preview or Claude needs the full image.
+
+    With ``use_claude=False`` uncertain images come back as heuristic results
+    (carrying a ``dhash``) so a caller can spend Claude calls on them later
+    via :func:`refine_with_claude`.
+    """
+    timings = {"cache_hit": False}
     try:
-        resp  = requests.get(url, timeout=15)
-        resp.raise_for_status()
-        raw   = resp.content
-        ctype = resp.headers.get("content-type", "")
+        head, head_headers = b"", None
+        path = urlsplit(url).path.lower()
+        if (PARTIAL_FETCH and not path.endswith(_PDF_EXTS + _VIDEO_EXTS)
+                and not asset_mirror.get_mirror().is_fresh(url)):
+            t0 = time.perf_counter()
+            pv = image_preview.fetch_preview(url, timings)
+            timings["download_ms"] = elapsed_ms(t0)
+            if pv.img is not None:
+                timings.update(source_bytes=pv.total or len(pv.head), preview=pv.kind)
+                full = lambda: fetch_image(url, timings, pv.head, pv.headers)
+                return classify_image(pv.img, timings, thumb_url=url if KEEP_THUMBNAILS else None,
+                                      use_claude=use_claude, full=full)
+            result = _not_an_image(url, pv.content_type, timings)
+            if result is not None:
+                timings["source_bytes"] = pv.total or len(pv.head)
+                return result
+            head, head_headers = pv.head, pv.headers
+
+        raw, ctype = download(url, timings, head, head_headers)
+        with raw:                           # the Claude stage re-decodes it, so closed only at the end
+            result = _not_an_image(url, ctype, timings)
+            if result is not None:
+                return result
+            timings["preview"] = "full"
+            return classify_from_bytes(raw, timings, thumb_url=url if KEEP_THUMBNAILS else None,
+                                       use_claude=use_claude)
+
+    except Exception as exc:
+        return ClassificationResult(
+            label="detail", confidence=0, stage="error",
+            details={"error": str(exc), "url": url}, timings=timings)
+
+
+def _decode(img_bytes, timings: dict, reduced: bool = False) -> Image.Image:
+    """RGB image from bytes or a seekable buffer; *reduced*: JPEGs at a smaller DCT scale."""
+    t0 = time.perf_counter()
+    if hasattr(img_bytes, "seek"):
+        img_bytes.seek(0)
+    fp = img_bytes if hasattr(img_bytes, "seek") else io.BytesIO(img_bytes)
+    if reduced:
+        img = image_preview.decode_reduced(fp)
+    else:
+        img = Image.open(fp)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+    timings["decode_ms"] = elapsed_ms(t0)
+    return img
 
-        # PDF -> no vision analysis possible
-        if "pdf" in ctype or url.lower().endswith(".pdf"):
-            return ClassificationResult(
-                label="spec_sheet", confidence=95, stage="heuristic",
-                details={"note": "PDF detected from Content-Type / extension"})
 
-        # Video -> flag directly
-        if any(url.lower().endswith(ext) for ext in (".mp4", ".mov", ".avi", ".wmv", ".webm")):
-            return ClassificationResult(
-                label="video", confidence=95, stage="heuristic",
-                details={"note": "Video detected from extension"})
+def fetch_image(url: str, timings: dict, head: bytes = b"", head_headers: dict | None = None) -> Image.Image:
+    """download() + full decode of *url*, the mirror buffer closed before returning.
 
-        return classify_from_bytes(raw)
+    Download counters go to *timings*; the decode is not a stage sample (a
+    preview's or the reduced decode's decode_ms is kept).
+    """
+    raw, _ = download(url, timings, head, head_headers)
+    with raw:
+        img = _decode(raw, {})
+        img.load()
+    return img
 
+
+def classify_from_bytes(img_bytes, timings: dict | None = None,
+                        thumb_url: str | None = None, use_claude: bool = True) -> ClassificationResult:
+    """Classify raw image bytes (or a seekable buffer).  Heuristic first; Claude if uncertain.
+
+    The heuristic works on a reduced (draft) decode; the Claude stage decodes
+    the full image.  Per-stage latencies are added to *timings* (and returned
+    on the result).  With *thumb_url*, a gallery thumbnail of the decoded image
+    is cached under it.
+    """
+    timings = timings if timings is not None else {}
+    try:
+        img = _decode(img_bytes, timings, reduced=True)
     except Exception as exc:
         return ClassificationResult(
             label="detail", confidence=0, stage="error",
-            details={"error": str(exc), "url": url})
+            details={"error": str(exc), "traceback": traceback.format_exc()},
+            timings=timings)
+    return classify_image(img, timings, thumb_url, use_claude, full=lambda: _decode(img_bytes, {}))
+
 
+def classify_image(img: Image.Image, timings: dict | None = None,
+                   thumb_url: str | None = None, use_claude: bool = True, full=None) -> ClassificationResult:
+    """classify_from_bytes() for an already decoded RGB image (no second decode).
 
-def classify_from_bytes(img_bytes: bytes) -> ClassificationResult:
-    """Classify raw image bytes.  Heuristic first; Claude if uncertain."""
+    When *img* is a preview, *full()* returns the full image for the Claude stage.
+    """
+    timings = timings if timings is not None else {}
     try:
-        img = Image.open(io.BytesIO(img_bytes))
-        if img.mode != "RGB":
-            img = img.convert("RGB")
+        if thumb_url:
+            import thumbnail_cache
+            try:
+                thumbnail_cache.get_cache().put_image(thumb_url, img)
+            except Exception:
+                pass                        # a missing preview never fails a result
 
         # --- Stage 1 ---
+        t0     = time.perf_counter()
         result = classify_pil(img)
+        timings["analyze_ms"] = elapsed_ms(t0)
+        result.timings = timings
         if result.confidence >= CONFIDENCE_THRESHOLD:
             return result                   # confident enough -- done
 
-        # --- Stage 2: re-encode as small JPEG, send to Claude ---
-        buf = io.BytesIO()
-        img.save(buf, format="JPEG", quality=75)
-        jpeg_bytes = buf.getvalue()
+        # --- Stage 1b: learned model on the same signals ---
+        t0      = time.perf_counter()
+        learned = _classify_learned(result)
+        timings["learned_ms"] = elapsed_ms(t0)
+        if learned is not None:
+            learned.timings = timings
+            return learned
 
-        raw_label = _call_claude(jpeg_bytes)
-        label     = _sanitise(raw_label)
+        if not use_claude:                  # deferred: caller decides who gets Claude
+            result.details["dhash"] = _dhash(img)
+            return result
 
-        return ClassificationResult(
-            label=label, confidence=92, stage="claude_api",
-            details={**result.details, "claude_raw": raw_label})
+        # --- Stage 2: re-encode as small JPEG, send to Claude ---
+        return _claude_stage(full() if full else img, result, timings)
 
     except Exception as exc:
         return ClassificationResult(
             label="detail", confidence=0, stage="error",
-            details={"error": str(exc), "traceback": traceback.format_exc()})
+            details={"error": str(exc), "traceback": traceback.format_exc()},
+            timings=timings)
+
+
+def _claude_stage(img: Image.Image, result: ClassificationResult, timings: dict) -> ClassificationResult:
+    t0  = time.perf_counter()
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=75)
+    jpeg_bytes = buf.getvalue()
+    timings["encode_ms"] = elapsed_ms(t0)
+
+    t0        = time.perf_counter()
+    raw_label = _call_claude(jpeg_bytes)
+    timings["claude_ms"] = elapsed_ms(t0)
+    label     = _sanitise(raw_label)
+
+    return ClassificationResult(
+        label=label, confidence=92, stage="claude_api",
+        details={**result.details, "claude_raw": raw_label}, timings=timings)
+
+
+def refine_with_claude(url: str, result: ClassificationResult) -> ClassificationResult:
+    """Claude pass for a result deferred with ``use_claude=False`` (re-reads *url* from the mirror).
+
+    On failure the heuristic *result* is kept, with the error noted in its details.
+    """
+    timings = dict(result.timings)
+    try:
+        fetch = {}                          # second download is not a pipeline stage sample
+        img   = fetch_image(url, fetch)
+        timings["download_bytes"] = timings.get("download_bytes", 0) + fetch["download_bytes"]
+        return _claude_stage(img, result, timings)
+    except Exception as exc:
+        return ClassificationResult(
+            label=result.label, confidence=result.confidence, stage=result.stage,
+            details={**result.details, "claude_error": str(exc)}, timings=result.timings)
+
+
+# ===========================================================================
+# CLI  --  python -m image_classifier
+# ===========================================================================
+
+def _iter_text_urls(fp):
+    """URLs from a text stream, one per line (read lazily so pipes stream)."""
+    for line in fp:
+        url = line.strip()
+        if url.startswith("http"):
+            yield url, {}
+
+
+def _iter_text_file(path: str):
+    """_iter_text_urls over the file at *path*, closed when the generator is."""
+    with open(path) as fh:
+        yield from _iter_text_urls(fh)
+
+
+def _iter_workbook_urls(path: str, sheet, header_row: int, columns: list[str]):
+    """Unique URLs from a vendor workbook, with the rows that reference each."""
+    import pandas as pd
+    import asset_generator as ag
+
+    df       = pd.read_excel(path, sheet_name=sheet if sheet is not None else 0,
+                             header=header_row - 1)
+    url_cols = ag.find_url_columns(df)
+    chosen   = columns or [u["col"] for u in url_cols]
+    missing  = [c for c in chosen if c not in df.columns]
+    if missing:
+        raise SystemExit(f"columns not found: {missing}")
+    plan = ag.plan_classification(df, chosen, url_cols)
+    print(f"{len(plan['unique'])} unique URLs ({plan['total']} references) "
+          f"in {len(chosen)} column(s)", file=sys.stderr)
+    for norm, url in plan["unique"].items():
+        refs = [dict(row_idx=r, source_col=c, paired_filename=f) for r, c, f in plan["refs"][norm]]
+        yield url, {"refs": refs}
+
+
+def _done_urls(path: str) -> set:
+    """URLs already present in an existing NDJSON output."""
+    done = set()
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["url"])
+                except (ValueError, KeyError):
+                    continue                # torn last line from a killed run
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m image_classifier",
+                                 description="Classify image URLs; stream NDJSON results.")
+    ap.add_argument("input", help="text file of URLs, '-' for stdin, or a .xlsx/.xls vendor workbook")
+    ap.add_argument("-o", "--output", help="NDJSON output file (default: stdout)")
+    ap.add_argument("-j", "--concurrency", type=int, default=8)
+    ap.add_argument("--resume", action="store_true",
+                    help="skip URLs already present in --output and append to it")
+    ap.add_argument("--sheet", help="workbook sheet name (default: first sheet)")
+    ap.add_argument("--header-row", type=int, default=1, help="1-based header row (workbooks)")
+    ap.add_argument("--columns", nargs="*", default=[],
+                    help="URL columns to classify (workbooks; default: every detected URL column)")
+    ap.add_argument("--metrics", help="write run-level latency metrics here (.json or .prom)")
+    args = ap.parse_args(argv)
+
+    if args.resume and not args.output:
+        ap.error("--resume needs --output")
+
+    global KEEP_THUMBNAILS
+    KEEP_THUMBNAILS = False                 # no gallery to feed headless
+
+    if args.input.lower().endswith((".xlsx", ".xls")):
+        source = _iter_workbook_urls(args.input, args.sheet, args.header_row, args.columns)
+    elif args.input == "-":
+        source = _iter_text_urls(sys.stdin)
+    else:
+        source = _iter_text_file(args.input)
+
+    skip = _done_urls(args.output) if args.resume else set()
+    out  = open(args.output, "a" if args.resume else "w") if args.output else sys.stdout
+    if args.resume and out.tell() > 0:
+        with open(args.output, "rb") as f:
+            f.seek(-1, 2)
+            if f.read(1) != b"\n":
+                out.write("\n")            # finish a torn line before appending
+
+    from classify_metrics import RunMetrics
+    metrics = RunMetrics()
+
+    def _emit(fut):
+        url, extra = pending.pop(fut)
+        res = fut.result()
+        metrics.add(res)
+        out.write(json.dumps({"url": url, **asdict(res), **extra}) + "\n")
+        out.flush()
+
+    n, pending = 0, {}
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for url, extra in source:
+                if url in skip:
+                    continue
+                skip.add(url)
+                pending[pool.submit(classify_from_url, url)] = (url, extra)
+                n += 1
+                # keep a bounded window in flight so huge inputs stream
+                if len(pending) >= args.concurrency * 4:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        _emit(fut)
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    _emit(fut)
+    finally:
+        source.close()                      # releases the input file on an early exit too
+        if out is not sys.stdout:
+            out.close()
+    metrics.finish()
+    summary = metrics.summary()
+    print(f"classified {n} URL(s), {summary['throughput']:.2f}/s, stages {summary['by_stage']}, "
+          f"{summary['download_bytes'] / 2**20:.1f} of {summary['source_bytes'] / 2**20:.1f} MB downloaded",
+          file=sys.stderr)
+    if args.metrics:
+        with open(args.metrics, "w") as f:
+            f.write(metrics.to_prometheus() if args.metrics.endswith(".prom") else metrics.to_json())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""
+image_preview.py  —  a classifiable preview from the first bytes of an image URL
+
+The heuristic only looks at a 200x200 reduction, so the full multi-megabyte
+original is rarely needed.  fetch_preview() asks for a byte range of the
+start of the file and, in order, tries:
+
+    exif          the thumbnail embedded in the EXIF APP1 segment (IFD1) *
+    jfif          a JFIF / JFXX APP0 thumbnail *
+    progressive   a progressive JPEG's first scans: the prefix plus an EOI
+                  marker, decoded at 1/8 scale (DCT scaling only needs the DC
+                  coefficients, which the first scan carries)
+    complete      the whole file fit in the prefix
+
+The prefix grows (up to PREFIX_MAX_BYTES) when an APP1 segment or the DC
+scans run past it.  A preview is accepted only if its longer side is at
+least MIN_SIDE and an embedded thumbnail's aspect matches the main image
+(cameras letterbox theirs).  Otherwise Preview.img is None, and the caller
+resumes the full download from the prefix (asset_mirror.fetch(head=...)),
+so no byte is transferred twice.
+
+* Embedded thumbnails are off (EMBEDDED_THUMBNAILS) because they are
+re-encoded at low quality.  Their JPEG noise shifts unique_colors and
+text_blocks far enough to flip labels, some of them above
+CONFIDENCE_THRESHOLD.  Progressive 1/8 decodes match the full image.
+`python -m benchmarks.load_classifier --full-fetch` measures both.
+"""
+
+from __future__ import annotations
+
+import io, struct
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from PIL import Image
+
+import asset_mirror
+import scheduler
+
+PREFIX_BYTES        = 64 << 10     # first range request
+PREFIX_MAX_BYTES    = 512 << 10    # never read more than this before giving up on a preview
+EMBEDDED_THUMBNAILS = False        # EXIF / JFIF thumbnails as previews: see the docstring
+MIN_SIDE            = 200          # longer side of an acceptable preview: the heuristic's analysis size
+ASPECT_TOLERANCE    = 0.05         # embedded thumbnail vs main image, relative
+DRAFT_SIZE          = (256, 256)   # complete files: reduced decode, still >= the gallery thumbnail
+FETCH_TIMEOUT       = 15
+
+_no_range: set[str] = set()     # hosts that answered a Range request with the whole file
+
+_SOF_PROGRESSIVE = {0xC2, 0xC6, 0xCA, 0xCE}
+_SOF             = {0xC0, 0xC1, 0xC3, 0xC5, 0xC7, 0xC9, 0xCB, 0xCD} | _SOF_PROGRESSIVE
+_NO_LENGTH       = {0x01, 0xD8, 0xD9} | set(range(0xD0, 0xD8))
+
+
+@dataclass
+class Preview:
+    """What fetch_preview() found.  *head* + *headers* let asset_mirror resume the download."""
+    img:     Image.Image | None
+    kind:    str                    # "exif" | "jfif" | "progressive" | "complete" | "none"
+    head:    bytes = b""
+    headers: dict = field(default_factory=dict)
+    total:   int | None = None      # size of the original, when the server said
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("content-type", "")
+
+
+# ---------------------------------------------------------------------------
+# Range requests
+# ---------------------------------------------------------------------------
+def _get_range(url: str, start: int, end: int, timings: dict):
+    """Bytes start..end-1 of *url* -> (data, headers, ranged).  A server that ignores
+    Range answers 200; only the requested length is read before hanging up."""
+    from image_classifier import http_session
+
+    with scheduler.downloads.slot(url):
+        resp = http_session().get(url, headers={"Range": f"bytes={start}-{end - 1}"},
+                                  timeout=FETCH_TIMEOUT, stream=True)
+        try:
+            resp.raise_for_status()
+            ranged = resp.status_code == 206
+            data   = bytearray()
+            for chunk in resp.iter_content(64 << 10) if ranged or not start else ():
+                data += chunk
+                if len(data) >= end - start:
+                    break
+        finally:
+            resp.close()
+    timings["download_bytes"] = timings.get("download_bytes", 0) + len(data)
+    return bytes(data[:end - start]), {k.lower(): v for k, v in resp.headers.items()}, ranged
+
+
+# ---------------------------------------------------------------------------
+# JPEG structure
+# ---------------------------------------------------------------------------
+def _segments(data: bytes):
+    """Yield (marker, payload_start, end) for each marker segment in *data*.  SOS
+    segments end where their entropy-coded data does.  Stops at the first
+    segment that runs past the end of *data*, yielding it with end=None
+    (marker 0 when *data* ends between segments)."""
+    pos = 2
+    n   = len(data)
+    while True:
+        if pos + 4 > n:
+            yield 0, pos, None                  # prefix ends between segments
+            return
+        if data[pos] != 0xFF:
+            return
+        marker = data[pos + 1]
+        if marker == 0xFF:                      # fill byte
+            pos += 1
+            continue
+        if marker in _NO_LENGTH:
+            if marker == 0xD9:
+                return
+            pos += 2
+            continue
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        start, end = pos + 4, pos + 2 + length
+        if end > n:
+            yield marker, start, None
+            return
+        if marker == 0xDA:                      # entropy data: up to the next real marker
+            i = end
+            while True:
+                i = data.find(b"\xff", i)
+                if i < 0 or i + 1 >= n:
+                    yield marker, start, None
+                    return
+                if data[i + 1] != 0x00 and not 0xD0 <= data[i + 1] <= 0xD7:
+                    break
+                i += 2
+            yield marker, start, i
+            pos = i
+            continue
+        yield marker, start, end
+        pos = end
+
+
+def _exif_thumbnail(app1: bytes) -> bytes | None:
+    """JPEG thumbnail from an EXIF APP1 payload (IFD1 JPEGInterchangeFormat[Length])."""
+    if not app1.startswith(b"Exif\x00\x00"):
+        return None
+    tiff = app1[6:]
+    if tiff[:2] not in (b"II", b"MM") or len(tiff) < 8:
+        return None
+    e = "<" if tiff[:2] == b"II" else ">"
+
+    def ifd(offset):
+        count   = struct.unpack(e + "H", tiff[offset:offset + 2])[0]
+        entries = {}
+        for k in range(count):
+            tag, _, _, value = struct.unpack(e + "HHII", tiff[offset + 2 + 12 * k:offset + 14 + 12 * k])
+            entries[tag] = value
+        return entries, struct.unpack(e + "I", tiff[offset + 2 + 12 * count:offset + 6 + 12 * count])[0]
+
+    try:
+        _, ifd1 = ifd(struct.unpack(e + "I", tiff[4:8])[0])
+        if not ifd1:
+            return None
+        tags, _ = ifd(ifd1)
+        off, length = tags.get(0x0201), tags.get(0x0202)
+    except struct.error:
+        return None
+    if not off or not length or off + length > len(tiff):
+        return None
+    thumb = tiff[off:off + length]
+    return thumb if thumb[:2] == b"\xff\xd8" else None
+
+
+def _jfif_thumbnail(app0: bytes) -> Image.Image | None:
+    """RGB thumbnail from a JFIF APP0 or a JFXX extension (JPEG or 3-byte RGB)."""
+    if app0.startswith(b"JFIF\x00") and len(app0) >= 14:
+        w, h = app0[12], app0[13]
+        if w and h and len(app0) >= 14 + 3 * w * h:
+            return Image.frombytes("RGB", (w, h), app0[14:14 + 3 * w * h])
+    elif app0.startswith(b"JFXX\x00") and len(app0) > 6:
+        code, body = app0[5], app0[6:]
+        if code == 0x10:
+            return Image.open(io.BytesIO(body))
+        if code == 0x13 and len(body) >= 2:
+            w, h = body[0], body[1]
+            if len(body) >= 2 + 3 * w * h:
+                return Image.frombytes("RGB", (w, h), body[2:2 + 3 * w * h])
+    return None
+
+
+def _scan_jpeg(data: bytes) -> dict:
+    """Size, progressive flag, embedded thumbnails and DC-scan progress of a JPEG prefix.
+
+    *need* is how long the prefix must be to answer what is still open (an
+    APP segment or the DC scans cut off), or None once nothing more can help.
+    """
+    info = dict(size=None, progressive=False, exif=None, jfif=[], components=set(),
+                dc_done=set(), dc_end=None, need=None)
+    for marker, start, end in _segments(data):
+        if end is None:
+            if marker not in (0, 0xDA):         # known length: read to the end of the segment
+                info["need"] = start - 2 + struct.unpack(">H", data[start - 2:start])[0]
+            elif marker == 0 or info["progressive"]:
+                info["need"] = len(data) * 2    # (more of a baseline scan is just more pixel rows)
+            return info
+        seg = data[start:end]
+        if marker == 0xE1 and info["exif"] is None:
+            info["exif"] = _exif_thumbnail(seg)
+        elif marker == 0xE0:
+            info["jfif"].append(seg)
+        elif marker in _SOF:
+            h, w = struct.unpack(">HH", seg[1:5])
+            info["size"] = (w, h)
+            info["progressive"] = marker in _SOF_PROGRESSIVE
+            info["components"] = {seg[6 + 3 * k] for k in range(seg[5])}
+        elif marker == 0xDA:
+            ns   = seg[0]
+            comp = {seg[1 + 2 * k] for k in range(ns)}
+            if seg[1 + 2 * ns] == 0:            # Ss == 0: a DC scan
+                info["dc_done"] |= comp
+                if info["components"] and info["dc_done"] >= info["components"]:
+                    info["dc_end"] = end
+                    return info
+            if not info["progressive"]:
+                return info                     # baseline: the rest is pixel rows, top-down
+    return info
+
+
+def _fits(thumb: Image.Image, size) -> bool:
+    if max(thumb.size) < MIN_SIDE or not size:
+        return False                            # too small, or the main image's shape is unknown yet
+    a, b = thumb.width / thumb.height, size[0] / size[1]
+    return abs(a - b) <= ASPECT_TOLERANCE * b
+
+
+def _rgb(img: Image.Image) -> Image.Image:
+    img.load()
+    return img if img.mode == "RGB" else img.convert("RGB")
+
+
+def _from_jpeg(data: bytes, info: dict) -> tuple[Image.Image | None, str]:
+    if info["exif"] and EMBEDDED_THUMBNAILS:
+        try:
+            thumb = _rgb(Image.open(io.BytesIO(info["exif"])))
+            if _fits(thumb, info["size"]):
+                return thumb, "exif"
+        except Exception:
+            pass
+    for app0 in info["jfif"] if EMBEDDED_THUMBNAILS else ():
+        try:
+            thumb = _jfif_thumbnail(app0)
+            if thumb is not None and _fits(thumb, info["size"]):
+                return _rgb(thumb), "jfif"
+        except Exception:
+            pass
+    if info["progressive"] and info["dc_end"] and info["size"]:
+        w, h = info["size"]
+        if max(w, h) // 8 >= MIN_SIDE:
+            try:
+                img = Image.open(io.BytesIO(data[:info["dc_end"]] + b"\xff\xd9"))
+                img.draft("RGB", (w // 8, h // 8))
+                return _rgb(img), "progressive"
+            except Exception:
+                pass
+    return None, "none"
+
+
+# ---------------------------------------------------------------------------
+# PUBLIC
+# ---------------------------------------------------------------------------
+def decode_reduced(fp) -> Image.Image:
+    """RGB decode of a complete file; JPEGs at a reduced DCT scale (>= DRAFT_SIZE)."""
+    img = Image.open(fp)
+    img.draft("RGB", DRAFT_SIZE)
+    return _rgb(img)
+
+
+def fetch_preview(url: str, timings: dict) -> Preview:
+    """Smallest classifiable preview of *url*; bytes read are added to timings["download_bytes"].
+
+    HTTP errors propagate.  Preview.img is None when the full file is needed.
+    """
+    host = urlsplit(url).netloc
+    if host in _no_range:
+        return Preview(img=None, kind="none")
+    head, headers, ranged = _get_range(url, 0, PREFIX_BYTES, timings)
+    total = asset_mirror.body_total(headers)
+    if len(head) < PREFIX_BYTES:
+        total = len(head)                       # the body ended inside the prefix:
+        headers.pop("content-range", None)      # tell asset_mirror it has the whole file
+        headers["content-length"] = str(total)
+    pv    = Preview(img=None, kind="none", head=head, headers=headers, total=total)
+    ctype = pv.content_type
+    if ctype and not ctype.startswith("image/"):
+        return pv                               # PDF, video, HTML error page ...
+    if total is not None and len(head) >= total:
+        try:
+            pv.img, pv.kind = decode_reduced(io.BytesIO(head)), "complete"
+        except Exception:
+            pass
+        return pv
+    if not ranged:
+        _no_range.add(host)                     # later URLs on this host go straight to a full fetch
+        return pv
+    if head[:2] != b"\xff\xd8":
+        return pv                               # PNG / WebP / TIFF: no usable prefix
+
+    while True:
+        info = _scan_jpeg(pv.head)
+        img, kind = _from_jpeg(pv.head, info)
+        need = info["need"]
+        if img is not None or need is None or len(pv.head) >= PREFIX_MAX_BYTES:
+            pv.img, pv.kind = img, kind
+            return pv
+        upto = min(max(need, len(pv.head) * 2), PREFIX_MAX_BYTES, total or PREFIX_MAX_BYTES)
+        if upto <= len(pv.head):
+            return pv
+        more, _, _ = _get_range(url, len(pv.head), upto, timings)
+        if not more:
+            return pv
+        pv.head += more
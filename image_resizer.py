@@ -1,10 +1,75 @@
 import streamlit as st
-from PIL import Image
+from PIL import Image, ImageChops, ImageFile, ImageStat
+from PIL import JpegImagePlugin, PpmImagePlugin, TiffImagePlugin
 import zipfile
+import tarfile
 import io
+import math
 import os
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
 from datetime import datetime
 from collections import Counter
+from itertools import groupby
+
+from disk_cache import DiskCache, content_key
+import resources
+import scheduler
+
+# Resized renditions are cached on disk keyed by SHA-256 of the source bytes
+# plus the rendition parameters, so re-uploaded vendor images skip the work.
+CACHE_DIR       = ".cache/resized"
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+RENDER_VERSION  = 1          # bump when the resize/encode output changes
+
+# Archive / batch processing
+ARCHIVE_EXTS    = ('.zip', '.tar', '.tgz', '.gz', '.bz2', '.xz')
+RESIZE_WORKERS  = 4          # Pillow releases the GIL while resizing/encoding
+GALLERY_LIMIT   = 24         # previews kept in memory for the gallery
+ZIP_MAX_MB      = 200        # larger output ZIPs are not loaded into the page: use /v1/resize
+
+# Large (print-resolution) sources are reduced before the full decode.
+# Above LARGE_IMAGE_PIXELS the header size alone selects a bounded path.
+# Pillow's process-wide bomb limit stays as it is (the classifier and the API
+# open untrusted URLs); open_source() alone lets JPEG / TIFF / PPM sources up to
+# LARGE_IMAGE_MAX_PIXELS through, and only the bounded paths may decode them.
+# Bounded paths exist for JPEG (draft) and uncompressed TIFF / PPM (bands,
+# Pillow >= 11).  LZW / Deflate TIFF and PNG over 2x the bomb limit (about
+# 179 MP) are rejected with DecompressionBombError, not reduced.
+LARGE_IMAGE_PIXELS     = 50_000_000
+LARGE_IMAGE_MAX_PIXELS = 1_000_000_000
+
+# Sources with no bounded path decode fully, one at a time across the pool
+_full_decode_slot = threading.BoundedSemaphore(1)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class EncodeSettings:
+    """How the 1000x1000 rendition is written to JPEG"""
+    mode: str = "fixed"          # "fixed" | "budget" (max file size) | "quality" (PSNR floor)
+    quality: int = 95            # fixed mode
+    max_kb: int = 200            # budget mode: largest acceptable file
+    min_psnr: float = 40.0       # quality mode: perceptual floor in dB
+    min_quality: int = 40
+    max_quality: int = 95
+    progressive: bool = False
+    optimize: bool = True
+
+DEFAULT_ENCODE = EncodeSettings()
+
+def get_cache():
+    """Process-wide rendition cache (created on first use)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskCache(CACHE_DIR, CACHE_MAX_BYTES)
+        return _cache
 
 def show():
     st.markdown('<div class="title">Image Resizer</div>', unsafe_allow_html=True)
@@ -23,17 +88,44 @@ def show():
     </div>
     """, unsafe_allow_html=True)
     
-    # Upload section
+    # Upload section.  st.file_uploader holds each upload in memory (up to
+    # server.maxUploadSize, 200 MB); only the resizing below runs in bounded
+    # memory.  Bigger archives belong on the API's /v1/resize, which spools to disk.
     st.markdown("### Select Images")
     uploaded_files = st.file_uploader(
         "Upload Images",
-        type=['png', 'jpg', 'jpeg', 'bmp', 'tiff'],
+        type=['png', 'jpg', 'jpeg', 'bmp', 'tiff'] + [e.lstrip('.') for e in ARCHIVE_EXTS],
         accept_multiple_files=True,
-        help="Select one or more images to resize"
+        help="Select one or more images, or a ZIP/TAR archive of images"
     )
     
+    # Encoding options
+    with st.expander("Output Encoding"):
+        mode_label = st.radio(
+            "JPEG encoding",
+            ["Fixed quality 95", "Maximum file size", "Quality floor (PSNR)"],
+            horizontal=True,
+            help="Size and quality-floor modes binary-search the JPEG quality per image"
+        )
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            max_kb = st.number_input("Max file size (KB)", min_value=20, max_value=2000, value=200, step=10)
+        with c2:
+            min_psnr = st.number_input("Min PSNR (dB)", min_value=30.0, max_value=50.0, value=40.0, step=0.5)
+        with c3:
+            progressive = st.checkbox("Progressive JPEG", value=False)
+            optimize = st.checkbox("Optimize Huffman tables", value=mode_label == "Fixed quality 95")
+    mode = {"Fixed quality 95": "fixed", "Maximum file size": "budget",
+            "Quality floor (PSNR)": "quality"}[mode_label]
+    settings = EncodeSettings(mode=mode, max_kb=int(max_kb), min_psnr=float(min_psnr),
+                              progressive=progressive, optimize=optimize)
+    
     if uploaded_files:
-        st.info(f"Uploaded {len(uploaded_files)} image(s)")
+        n_archives = sum(1 for f in uploaded_files if is_archive(f.name))
+        if n_archives:
+            st.info(f"Uploaded {len(uploaded_files) - n_archives} image(s) and {n_archives} archive(s)")
+        else:
+            st.info(f"Uploaded {len(uploaded_files)} image(s)")
         
         if st.button("Resize Images", use_container_width=True, type="primary"):
             with st.spinner("Processing images..."):
@@ -44,54 +136,65 @@ def show():
                     
                     processed_files = []
                     gallery_images = []
+                    encode_rows = []
+                    cache = get_cache()
+                    cache_hits = 0
+                    time_saved = 0.0
                     
-                    progress_bar = st.progress(0)
                     status_text = st.empty()
+                    resize_pool = scheduler.pool("resize").client(resources.session_id())
                     
-                    for idx, uploaded_file in enumerate(uploaded_files):
-                        progress_bar.progress((idx + 1) / len(uploaded_files))
-                        status_text.text(f"Processing {idx + 1} of {len(uploaded_files)}...")
-                        
-                        # Open image
-                        img = Image.open(uploaded_file)
-                        
-                        # Convert to RGB if needed
-                        if img.mode == 'RGBA':
-                            bg = Image.new('RGB', img.size, (255, 255, 255))
-                            bg.paste(img, mask=img.split()[3])
-                            img = bg
-                        elif img.mode != 'RGB':
-                            img = img.convert('RGB')
-                        
-                        # Resize image
-                        resized_img = resize_image_with_padding(img, (1000, 1000))
+                    used_names = set()
+                    failed = []
+                    
+                    def _render(source):
+                        name, data = source
+                        try:
+                            return (name,) + render_jpeg_cached(data, (1000, 1000), cache, settings) + (None,)
+                        except Exception as exc:        # one bad member must not sink the batch
+                            return name, None, False, {}, exc
+                    
+                    # Members are read, resized and written one at a time (a few in flight)
+                    results = bounded_map(_render, iter_sources(uploaded_files), RESIZE_WORKERS,
+                                          pool=resize_pool)
+                    for idx, (original_filename, jpeg_bytes, hit, meta, error) in enumerate(results):
+                        status_text.text(f"Processed {idx + 1} image(s)...  "
+                                         f"({resources.queue_summary('resize')})")
+                        if error is not None:
+                            failed.append(f"{original_filename}: {error}")
+                            continue
+                        if hit:
+                            cache_hits += 1
+                            time_saved += meta.get("elapsed", 0.0)
                         
                         # Save resized image
-                        original_filename = uploaded_file.name
-                        base_name = os.path.splitext(original_filename)[0]
-                        file_extension = os.path.splitext(original_filename)[1]
-                        
-                        if file_extension.lower() in ['.jpg', '.jpeg']:
-                            output_filename = original_filename
-                        else:
-                            output_filename = f"{base_name}.jpg"
+                        output_filename = output_name(original_filename, used_names)
                         
                         output_path = os.path.join(temp_dir, output_filename)
-                        resized_img.save(output_path, 'JPEG', quality=95, optimize=True)
+                        with open(output_path, 'wb') as f:
+                            f.write(jpeg_bytes)
                         
                         processed_files.append(output_path)
-                        gallery_images.append(resized_img)
+                        if len(gallery_images) < GALLERY_LIMIT:
+                            gallery_images.append(jpeg_bytes)
+                        encode_rows.append({"File": output_filename,
+                                            "Quality": meta.get("quality"),
+                                            "KB": round(len(jpeg_bytes) / 1024, 1),
+                                            "Decode": meta.get("strategy", ""),
+                                            "Peak MB": meta.get("peak_mb")})
                     
-                    progress_bar.empty()
                     status_text.empty()
                     
                     st.success(f"Successfully resized {len(processed_files)} images")
+                    if failed:
+                        st.warning(f"{len(failed)} file(s) could not be resized (listed in errors.txt "
+                                   f"in the ZIP):\n\n" + "\n".join(f"- {f}" for f in failed[:20]))
                     
                     # Create metrics with professional styling
                     st.markdown("---")
                     st.markdown("### Summary")
                     
-                    col1, col2, col3 = st.columns(3)
+                    col1, col2, col3, col4 = st.columns(4)
                     
                     metric_style = """
                     <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
@@ -114,6 +217,17 @@ def show():
                         size_mb = total_size / (1024 * 1024)
                         st.markdown(metric_style.format(f"{size_mb:.1f}MB", "Total Size"), unsafe_allow_html=True)
                     
+                    with col4:
+                        hit_ratio = cache_hits / len(processed_files) * 100 if processed_files else 0
+                        st.markdown(metric_style.format(f"{hit_ratio:.0f}%", f"Cache Hits ({time_saved:.1f}s saved)"), unsafe_allow_html=True)
+                    
+                    large_n = sum(1 for r in encode_rows if r["Decode"] not in ("", "direct"))
+                    if large_n:
+                        st.info(f"{large_n} oversized source(s) were reduced before decoding")
+                    if settings.mode != "fixed" or large_n:
+                        with st.expander("Per-image encoding and decode memory"):
+                            st.dataframe(encode_rows, use_container_width=True)
+                    
                     st.markdown("---")
                     
                     # Download options
@@ -122,22 +236,30 @@ def show():
                     col1, col2 = st.columns(2)
                     
                     with col1:
-                        # Create ZIP file
-                        zip_buffer = io.BytesIO()
-                        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                            for file_path in processed_files:
-                                zip_file.write(file_path, os.path.basename(file_path))
-                        
-                        zip_buffer.seek(0)
+                        # Create ZIP file on disk; only one under ZIP_MAX_MB is read back
+                        import tempfile
+                        with tempfile.TemporaryFile() as zip_fp:
+                            with zipfile.ZipFile(zip_fp, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+                                for file_path in processed_files:
+                                    zip_file.write(file_path, os.path.basename(file_path))
+                                if failed:
+                                    zip_file.writestr("errors.txt", "\n".join(failed) + "\n")
+                            zip_mb = zip_fp.tell() / 2**20
+                            zip_fp.seek(0)
+                            zip_bytes = zip_fp.read() if zip_mb <= ZIP_MAX_MB else None
                         
-                        st.download_button(
-                            "Download All (ZIP)",
-                            data=zip_buffer,
-                            file_name=f"resized_images_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
-                            mime="application/zip",
-                            use_container_width=True,
-                            type="primary"
-                        )
+                        if zip_bytes is None:
+                            st.warning(f"The ZIP is {zip_mb:.0f} MB, too large to serve from the page. "
+                                       f"Send the archive to the API's /v1/resize instead.")
+                        else:
+                            st.download_button(
+                                "Download All (ZIP)",
+                                data=zip_bytes,
+                                file_name=f"resized_images_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                                mime="application/zip",
+                                use_container_width=True,
+                                type="primary"
+                            )
                     
                     with col2:
                         if len(processed_files) == 1:
@@ -155,6 +277,8 @@ def show():
                     # Gallery preview
                     st.markdown("---")
                     st.markdown("### Preview Gallery")
+                    if len(processed_files) > len(gallery_images):
+                        st.caption(f"Showing the first {len(gallery_images)} of {len(processed_files)} images")
                     
                     # Responsive gallery grid
                     cols = st.columns(4)
@@ -175,6 +299,260 @@ def show():
                     import traceback
                     st.code(traceback.format_exc())
 
+# Leading bytes of the formats Pillow can open here
+_IMAGE_MAGIC = (
+    b'\xff\xd8\xff',            # JPEG
+    b'\x89PNG\r\n\x1a\n',       # PNG
+    b'GIF87a', b'GIF89a',
+    b'BM',                      # BMP
+    b'II*\x00', b'MM\x00*',      # TIFF
+)
+
+def is_archive(filename):
+    """True for ZIP/TAR uploads (by extension)"""
+    return filename.lower().endswith(ARCHIVE_EXTS)
+
+def sniff_image(head):
+    """Check the first bytes of a file against known image signatures"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return True
+    return head.startswith(_IMAGE_MAGIC)
+
+def iter_archive_images(fileobj):
+    """Yield (member_name, bytes) for every image inside a ZIP or TAR archive.
+    
+    Members are read lazily, one at a time, and never extracted to disk.
+    Non-image entries are skipped by their magic bytes, not their names.
+    """
+    fileobj.seek(0)
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or info.filename.startswith('__MACOSX/'):
+                    continue
+                with zf.open(info) as member:
+                    head = member.read(16)
+                    if not sniff_image(head):
+                        continue
+                    yield info.filename, head + member.read()
+        return
+    
+    fileobj.seek(0)
+    # Stream mode ("r|*") reads members sequentially without seeking back
+    with tarfile.open(fileobj=fileobj, mode='r|*') as tf:
+        for member in tf:
+            if not member.isfile():
+                continue
+            f = tf.extractfile(member)
+            if f is None:
+                continue
+            head = f.read(16)
+            if not sniff_image(head):
+                continue
+            yield member.name, head + f.read()
+
+def iter_sources(uploaded_files):
+    """Flatten uploads into (name, bytes) pairs, expanding archives lazily"""
+    for uploaded_file in uploaded_files:
+        if is_archive(uploaded_file.name):
+            yield from iter_archive_images(uploaded_file)
+        else:
+            yield uploaded_file.name, uploaded_file.getvalue()
+
+def bounded_map(fn, items, workers=RESIZE_WORKERS, window=None, pool=None):
+    """Ordered parallel map that keeps at most *window* items in flight,
+    so memory stays bounded no matter how long *items* is.  Pass a shared
+    *pool* to reuse its threads instead of starting a private one"""
+    window = window or workers * 2
+    if pool is None:
+        with ThreadPoolExecutor(max_workers=workers) as own:
+            yield from bounded_map(fn, items, workers, window, own)
+        return
+    pending = []
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    for fut in pending:
+        yield fut.result()
+
+def _unique_name(name, used):
+    """Avoid overwriting outputs when archive folders repeat a filename"""
+    base, ext = os.path.splitext(name)
+    candidate, n = name, 1
+    while candidate.lower() in used:
+        candidate = f"{base}_{n}{ext}"
+        n += 1
+    used.add(candidate.lower())
+    return candidate
+
+def output_name(original, used):
+    """File name for the JPEG rendition of *original* (folders dropped, .jpg kept or added)"""
+    original_filename = os.path.basename(original)
+    base_name, file_extension = os.path.splitext(original_filename)
+    if file_extension.lower() in ['.jpg', '.jpeg']:
+        output_filename = original_filename
+    else:
+        output_filename = f"{base_name}.jpg"
+    return _unique_name(output_filename, used)
+
+# Formats reduce_large_source() can bring down without the full bitmap
+_BOUNDED_OPENERS = (JpegImagePlugin.JpegImageFile, TiffImagePlugin.TiffImageFile,
+                    PpmImagePlugin.PpmImageFile)
+
+def open_source(fp):
+    """Image.open() without the decompression-bomb warning (header only).
+
+    Sources over Pillow's bomb limit are opened only if reduce_large_source()
+    has a bounded path for their format, and up to LARGE_IMAGE_MAX_PIXELS.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+        try:
+            return Image.open(fp)
+        except Image.DecompressionBombError:
+            pass
+    for opener in _BOUNDED_OPENERS:       # the plugin classes skip Pillow's size check
+        fp.seek(0)
+        try:
+            img = opener(fp)
+        except (SyntaxError, OSError, ValueError):
+            continue
+        if img.width * img.height > LARGE_IMAGE_MAX_PIXELS:
+            img.close()
+            break
+        return img
+    raise Image.DecompressionBombError(f"image exceeds {LARGE_IMAGE_MAX_PIXELS} pixels "
+                                       f"or has no bounded decode path")
+
+def _over_bomb_limit(img):
+    return Image.MAX_IMAGE_PIXELS is not None and img.width * img.height > 2 * Image.MAX_IMAGE_PIXELS
+
+def _bytes_per_pixel(mode):
+    return 1 if mode in ('1', 'L', 'P') else 4
+
+def _reduce_factor(src_size, size):
+    """Integer reduction that still leaves >= 2x the target for the final LANCZOS pass"""
+    fit = min(src_size[0] / size[0], src_size[1] / size[1])
+    return max(1, int(fit // 2))
+
+# Bytes per pixel of the uncompressed layouts that can be split into row bands
+_RAW_BYTES = {'L': 1, 'LA': 2, 'RGB': 3, 'RGBA': 4, 'RGBX': 4, 'CMYK': 4}
+
+def _band_tiles(img, factor):
+    """Tiles for band-wise decoding, or None if the source can't be split.
+    
+    Multi-strip/tile TIFFs already come in pieces; a single top-down raw
+    tile (uncompressed TIFF, PPM) is cut into row bands here.
+    """
+    # Pillow >= 11 (ImageFile._Tile); _decode_in_bands also relies on the
+    # private _size / _exclusive_fp attributes of a lazily loaded image
+    if not hasattr(ImageFile, '_Tile'):
+        return None
+    if img.mode not in ('L', 'RGB', 'RGBA', 'CMYK') or any(t[0] != 'raw' for t in img.tile):
+        return None
+    if len(img.tile) > 1:
+        return img.tile
+    
+    codec, (x0, y0, x1, y1), offset, args = img.tile[0]
+    if isinstance(args, str):
+        args = (args, 0, 1)
+    rawmode, stride, ystep = (tuple(args) + (0, 1))[:3]
+    if ystep != 1 or rawmode not in _RAW_BYTES:
+        return None
+    stride = stride or (x1 - x0) * _RAW_BYTES[rawmode]
+    rows = factor * max(1, 512 // factor)
+    return [ImageFile._Tile(codec, (x0, y, x1, min(y + rows, y1)),
+                            offset + (y - y0) * stride, (rawmode, stride, 1))
+            for y in range(y0, y1, rows)]
+
+def _decode_in_bands(img, tiles, factor):
+    """Decode a strip/tiled source one band of rows at a time, reducing each
+    band by *factor* before decoding the next one.
+    
+    Works by pointing the (still lazy) image at a subset of its tiles.
+    Returns (reduced_image, peak_working_set_bytes).
+    """
+    width, height = img.size
+    mode = img.mode
+    tiles = sorted(tiles, key=lambda t: (t[1][1], t[1][0]))
+    rows = [list(g) for _, g in groupby(tiles, key=lambda t: t[1][1])]
+    
+    canvas = Image.new(mode, (math.ceil(width / factor), math.ceil(height / factor)))
+    bpp = _bytes_per_pixel(mode)
+    peak = 0
+    
+    # load() drops/closes the file after each call; keep it for the next band
+    fp, exclusive = img.fp, img._exclusive_fp
+    img._exclusive_fp = False
+    
+    # Grow each band until its height divides evenly by the factor
+    band, band_top = [], 0
+    for i, row in enumerate(rows):
+        band.extend(row)
+        band_bottom = max(t[1][3] for t in band)
+        if (band_bottom - band_top) % factor and i < len(rows) - 1:
+            continue
+        band_h = band_bottom - band_top
+        img._size = (width, band_h)
+        img.tile = [t._replace(extents=(t[1][0], t[1][1] - band_top, t[1][2], t[1][3] - band_top))
+                    for t in band]
+        img.im, img.fp = None, fp
+        ImageFile.ImageFile.load(img)
+        canvas.paste(img.reduce(factor), (0, band_top // factor))
+        peak = max(peak, width * band_h * bpp)
+        band, band_top = [], band_bottom
+    
+    if exclusive:
+        fp.close()
+    img.close()
+    return canvas, peak + canvas.width * canvas.height * bpp
+
+def reduce_large_source(img, size=(1000, 1000), stats=None):
+    """Bring an oversized, not-yet-decoded source down to a workable size.
+    
+    Strategy by format (chosen from the header, before any pixel decode):
+      JPEG               -> DCT-domain draft decode (1/2 … 1/8 scale)
+      raw strip/tile     -> band-by-band decode + reduce (uncompressed TIFF, PPM)
+      anything else      -> full decode, serialised, then reduce(); refused
+                            (DecompressionBombError) over 2x Pillow's bomb limit
+    """
+    stats = stats if stats is not None else {}
+    width, height = img.size
+    bpp = _bytes_per_pixel(img.mode)
+    lazy = bool(getattr(img, 'tile', None))
+    
+    if not lazy or width * height <= LARGE_IMAGE_PIXELS:
+        stats.update(strategy="direct", peak_mb=round(width * height * bpp / 2**20, 1))
+        return img
+    
+    factor = _reduce_factor(img.size, size)
+    
+    if img.format == 'JPEG':
+        img.draft('RGB', (size[0] * 2, size[1] * 2))
+        img.load()
+        stats.update(strategy="jpeg_draft",
+                     peak_mb=round(img.width * img.height * 4 / 2**20, 1))
+        return img
+    
+    tiles = _band_tiles(img, factor) if factor > 1 else None
+    if tiles:
+        reduced, peak = _decode_in_bands(img, tiles, factor)
+        stats.update(strategy="bands", peak_mb=round(peak / 2**20, 1))
+        return reduced
+    
+    if _over_bomb_limit(img):             # only open_source() lets these through
+        img.close()
+        raise Image.DecompressionBombError(f"{width}x{height} {img.format} has no bounded decode path")
+    with _full_decode_slot:
+        img.load()
+        reduced = img.reduce(factor) if factor > 1 and img.mode not in ('P', '1') else img.copy()
+        img.close()
+    stats.update(strategy="full_reduce",
+                 peak_mb=round((width * height + reduced.width * reduced.height) * bpp / 2**20, 1))
+    return reduced
+
 def get_dominant_edge_color(img):
     """Detect the most common background color from corners and edges"""
     width, height = img.size
@@ -209,10 +587,17 @@ def get_dominant_edge_color(img):
     
     return (255, 255, 255)  # Default to white
 
-def resize_image_with_padding(img, size=(1000, 1000)):
-    """Resize image to exact 1000x1000 with smart padding"""
+def resize_image_with_padding(img, size=(1000, 1000), stats=None):
+    """Resize image to exact 1000x1000 with smart padding
+    
+    If *img* is still lazy (opened, not loaded) and its header reports a
+    gigapixel source, it is reduced without a full-resolution decode.
+    *stats*, when given, receives the decode strategy and peak memory.
+    """
     target_width, target_height = size
     
+    img = reduce_large_source(img, size, stats)
+    
     # Convert to RGB if needed
     if img.mode == 'RGBA':
         bg = Image.new('RGB', img.size, (255, 255, 255))
@@ -239,3 +624,88 @@ def resize_image_with_padding(img, size=(1000, 1000)):
     new_img.paste(img_copy, (x, y))
     
     return new_img
+
+def _encode(img, quality, settings):
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=quality, optimize=settings.optimize,
+             progressive=settings.progressive)
+    return buf.getvalue()
+
+def _psnr(a, b):
+    """Peak signal-to-noise ratio (dB) between two same-size RGB images"""
+    rms = ImageStat.Stat(ImageChops.difference(a, b)).rms
+    mse = sum(x * x for x in rms) / len(rms)
+    return 99.0 if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+def _search_quality(probe, settings, fits):
+    """Binary-search the quality range on *probe*; fits(q, data) says whether q is acceptable.
+    Budget mode wants the highest acceptable quality, quality mode the lowest."""
+    lo, hi = settings.min_quality, settings.max_quality
+    best = None
+    while lo <= hi:
+        q = (lo + hi) // 2
+        ok = fits(q, _encode(probe, q, settings))
+        if settings.mode == "budget":
+            if ok: best, lo = q, q + 1
+            else:  hi = q - 1
+        else:
+            if ok: best, hi = q, q - 1
+            else:  lo = q + 1
+    if best is None:
+        best = settings.min_quality if settings.mode == "budget" else settings.max_quality
+    return best
+
+def encode_jpeg(img, settings=DEFAULT_ENCODE):
+    """Encode an RGB image per *settings*; returns (jpeg_bytes, chosen_quality)"""
+    if settings.mode == "fixed":
+        return _encode(img, settings.quality, settings), settings.quality
+    
+    # Search on a quarter-pixel probe, then confirm on the full image
+    probe = img.reduce(2) if min(img.size) >= 200 else img
+    if settings.mode == "budget":
+        budget = settings.max_kb * 1024
+        probe_budget = budget * (probe.width * probe.height) / (img.width * img.height)
+        quality = _search_quality(probe, settings, lambda q, data: len(data) <= probe_budget)
+        data = _encode(img, quality, settings)
+        # The probe only estimates full-size bytes; step down until it really fits
+        while len(data) > budget and quality > settings.min_quality:
+            quality = max(settings.min_quality, quality - 5)
+            data = _encode(img, quality, settings)
+        return data, quality
+    
+    quality = _search_quality(
+        probe, settings,
+        lambda q, data: _psnr(probe, Image.open(io.BytesIO(data)).convert('RGB')) >= settings.min_psnr)
+    return _encode(img, quality, settings), quality
+
+def render_jpeg(data, size=(1000, 1000), settings=DEFAULT_ENCODE, stats=None):
+    """Decode source bytes, resize with padding and encode the JPEG rendition;
+    returns (jpeg_bytes, chosen_quality)"""
+    img = open_source(data if hasattr(data, 'seek') else io.BytesIO(data))
+    resized_img = resize_image_with_padding(img, size, stats)
+    return encode_jpeg(resized_img, settings)
+
+def render_url(url, size=(1000, 1000), settings=DEFAULT_ENCODE):
+    """render_jpeg_cached() for a vendor URL, read through the asset mirror (mmap for large files)"""
+    import asset_mirror
+    buf, _ = asset_mirror.open_url(url)
+    with buf:
+        data = buf.getvalue() if isinstance(buf, io.BytesIO) else buf
+        return render_jpeg_cached(data, size, settings=settings)
+
+def render_jpeg_cached(data, size=(1000, 1000), cache=None, settings=DEFAULT_ENCODE):
+    """render_jpeg() through the disk cache; returns (jpeg_bytes, cache_hit, meta)"""
+    cache = cache if cache is not None else get_cache()
+    key = content_key(data, size=list(size), encode=asdict(settings), version=RENDER_VERSION)
+    
+    cached = cache.get(key)
+    if cached is not None:
+        jpeg_bytes, meta = cached
+        return jpeg_bytes, True, meta
+    
+    start = time.perf_counter()
+    stats = {}
+    jpeg_bytes, quality = render_jpeg(data, size, settings, stats)
+    meta = {"elapsed": round(time.perf_counter() - start, 4), "quality": quality, **stats}
+    cache.put(key, jpeg_bytes, meta)
+    return jpeg_bytes, False, meta
@@ -0,0 +1,324 @@
+"""
+ingest_service.py  —  watch a vendor drop folder and build asset templates unattended
+
+    python -m ingest_service /mnt/vendor_drops --out /mnt/asset_templates
+    python -m ingest_service drops/ --out out/ --settings vendors.json --workers 4 --once
+
+Polls the drop folder for .xlsx / .xls workbooks.  A file is picked up once
+its size and mtime have been unchanged for --settle seconds (so half-copied
+files are left alone), then read straight from disk by a worker process and
+run through the same detect_columns / _process path as the page.  Output
+lands in <out>/<vendor>/<subfolders>/<stem>_Asset_Template.xlsx plus
+<stem>_log.txt, where <subfolders> are the file's folders below the drop
+folder (or below the vendor's own folder).
+
+<out>/manifest.json records, per file, the size / mtime / SHA-256 it was
+processed at and the settings digest used: unchanged files are never
+reprocessed, a touched-but-identical file is only re-hashed, and editing a
+vendor's settings reprocesses that vendor's files.
+
+Per-vendor settings (default <watch>/vendors.json; re-read every poll, and a
+file that does not parse keeps the last good settings):
+
+    {"AFX": {"match": ["afx*.xlsx"],            # filename globs; or drop into a folder named AFX
+             "mfg_prefix": "2605",              # default: Manufacturer_ID_s.xlsx lookup
+             "brand_folder": "afx",             # default: vendor name, lower-case, no spaces
+             "sheet": "Products", "header_row": 2, "sku_col": "Model Number",
+                                                # default: workbook_profiler's best suggestion
+             "image_cols": [], "pdf_cols": [], "video_cols": [],
+                                                # default: every column detect_columns confirms
+             "exclude_cols": [], "mediatypes": {"Lifestyle Image": "lifestyle"}}}
+"""
+
+from __future__ import annotations
+
+import argparse, fnmatch, hashlib, json, mmap, os, sys, time, traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+WORKBOOK_EXTS = (".xlsx", ".xls")
+TEMP_PREFIXES = ("~$", ".~", ".")          # Office lock files, hidden / partial copies
+POLL_SECONDS  = 5.0
+SETTLE_SECONDS = 10.0
+
+
+# ---------------------------------------------------------------------------
+# Disk helpers
+# ---------------------------------------------------------------------------
+def _sha256(path: str) -> str:
+    """Content hash via mmap (no copy of the workbook into Python memory)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                h.update(m)
+    return h.hexdigest()
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+
+def _digest(cfg: dict) -> str:
+    return hashlib.sha1(json.dumps(cfg, sort_keys=True).encode()).hexdigest()[:12]
+
+
+class Manifest:
+    """{relative path: last processing record}, persisted after every change."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        try:
+            self.entries = json.loads(path.read_text())
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, key: str) -> dict:
+        return self.entries.get(key, {})
+
+    def put(self, key: str, entry: dict) -> None:
+        self.entries[key] = entry
+        _write_atomic(self.path, json.dumps(self.entries, indent=1, sort_keys=True).encode())
+
+
+# ---------------------------------------------------------------------------
+# Vendor settings
+# ---------------------------------------------------------------------------
+def load_settings(path: Path) -> dict:
+    """{vendor: settings}; {} when the file is missing.  ValueError if it is not valid JSON
+    (e.g. half-saved) or not an object of objects."""
+    try:
+        settings = json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+    if not isinstance(settings, dict) or not all(isinstance(v, dict) for v in settings.values()):
+        raise ValueError("expected {\"<vendor>\": {<settings>}, ...}")
+    return settings
+
+def match_vendor(rel: Path, settings: dict) -> str | None:
+    """Vendor whose globs match the file name, else the one named like a parent folder."""
+    name = rel.name.lower()
+    for vendor, cfg in settings.items():
+        if any(fnmatch.fnmatch(name, pat.lower()) for pat in cfg.get("match", ())):
+            return vendor
+    folders = {p.lower() for p in rel.parts[:-1]}
+    return next((v for v in settings if v.lower() in folders), None)
+
+def output_subdir(rel: Path, vendor: str) -> str:
+    """Folders between the drop folder (or the vendor's own folder) and the file, so
+    AFX/2024/list.xlsx and AFX/2025/list.xlsx get separate outputs."""
+    parts = list(rel.parts[:-1])
+    lower = [p.lower() for p in parts]
+    if vendor.lower() in lower:
+        parts = parts[lower.index(vendor.lower()) + 1:]
+    return str(Path(*parts)) if parts else ""
+
+def resolve(vendor: str, cfg: dict, mfg_mapping: dict) -> dict:
+    """Fill the defaults that do not need the workbook."""
+    return {**cfg, "vendor": vendor,
+            "mfg_prefix":   str(cfg.get("mfg_prefix") or mfg_mapping.get(vendor, "")),
+            "brand_folder": cfg.get("brand_folder") or vendor.lower().replace(" ", "")}
+
+
+# ---------------------------------------------------------------------------
+# Worker (runs in a child process)
+# ---------------------------------------------------------------------------
+def prepare(path: str, cfg: dict):
+    """(sheet DataFrame, *cfg* with sheet / header_row / sku_col / *_cols / mediatypes filled).
+
+    Missing values come from workbook_profiler's best suggestion and detect_columns,
+    as on the page.  header_row is 1-based.
+    """
+    import pandas as pd
+    import asset_generator as ag
+    import workbook_profiler as wp
+
+    sheet, header, sku = cfg.get("sheet"), cfg.get("header_row"), cfg.get("sku_col")
+    if sheet is None or header is None or not sku:
+        best = wp.best_for(wp.profile_workbook(path), sheet, header - 1 if header else None)
+        if best is None:
+            raise ValueError("no plausible header row found")
+        sheet, header, sku = best["sheet"], best["header_row"] + 1, sku or best["sku_col"]
+        if not sku:
+            raise ValueError(f"no SKU column found on sheet {sheet!r}")
+
+    df   = pd.read_excel(path, sheet_name=sheet, header=header - 1)
+    det  = ag.detect_columns(df)
+    skip = set(cfg.get("exclude_cols", ()))
+    def cols(key, found):
+        return cfg.get(key) or [e["col"] for e in found if e["col"] not in skip]
+    mediatypes = {e["col"]: e["mediatype"] if e["mediatype"] in ag.MTYPE_OPTIONS else "detail"
+                  for e in det["images"]}
+    mediatypes.update(cfg.get("mediatypes", {}))
+    return df, {**cfg, "sheet": sheet, "header_row": header, "sku_col": sku,
+                "image_cols": cols("image_cols", det["images"]), "pdf_cols": cols("pdf_cols", det["pdfs"]),
+                "video_cols": cols("video_cols", det["videos"]), "mediatypes": mediatypes}
+
+def process_file(path: str, cfg: dict, out_dir: str, known_sha: str = "", subdir: str = "") -> dict:
+    """Build the asset template for one workbook into <out_dir>/<vendor>/<subdir>;
+    returns its manifest fields."""
+    t0  = time.time()
+    sha = _sha256(path)
+    if sha == known_sha:
+        return dict(status="unchanged", sha256=sha)
+    if not cfg["mfg_prefix"]:
+        raise ValueError(f"no Manufacturer ID for vendor {cfg['vendor']!r}")
+
+    import pandas as pd
+    import asset_generator as ag
+
+    df, cfg = prepare(path, cfg)
+    output_df, log_text = ag._process(df, cfg["mfg_prefix"], cfg["brand_folder"], cfg["sku_col"],
+                                      cfg["image_cols"], cfg["pdf_cols"], cfg["video_cols"], cfg["mediatypes"])
+    dest = Path(out_dir) / cfg["vendor"] / subdir
+    dest.mkdir(parents=True, exist_ok=True)
+    stem = Path(path).stem
+    log  = dest / f"{stem}_log.txt"
+    _write_atomic(log, log_text.encode())
+    outputs = [str(log)]
+    if output_df is not None and len(output_df):
+        import io
+        buf = io.BytesIO()
+        with pd.ExcelWriter(buf, engine="openpyxl") as w:
+            output_df.to_excel(w, sheet_name="Sheet1", index=False)
+        xlsx = dest / f"{stem}_Asset_Template.xlsx"
+        _write_atomic(xlsx, buf.getvalue())
+        outputs.insert(0, str(xlsx))
+    return dict(status="done" if len(outputs) > 1 else "empty", sha256=sha, sheet=cfg["sheet"],
+                header_row=cfg["header_row"], sku_col=cfg["sku_col"],
+                rows=0 if output_df is None else len(output_df),
+                outputs=outputs, seconds=round(time.time() - t0, 2))
+
+
+# ---------------------------------------------------------------------------
+# Watcher
+# ---------------------------------------------------------------------------
+class Watcher:
+    def __init__(self, watch: Path, out: Path, settings: Path, workers: int, settle: float):
+        self.watch, self.out, self.settings_path, self.settle = watch, out, settings, settle
+        self.out.mkdir(parents=True, exist_ok=True)
+        self.manifest = Manifest(out / "manifest.json")
+        self.pool     = ProcessPoolExecutor(max_workers=workers)
+        self.stable   = {}                  # rel -> ((size, mtime_ns), first seen at)
+        self.inflight = {}                  # future -> (rel, stat sig, settings digest)
+        self.settings = {}                  # last vendors.json that parsed
+        self.settings_error = None
+        self._mfg     = None
+
+    def _mfg_mapping(self) -> dict:
+        if self._mfg is None:
+            import resources
+            self._mfg = resources.manufacturer_mapping()[0]
+        return self._mfg
+
+    def _candidates(self):
+        out = self.out.resolve()
+        for p in self.watch.rglob("*"):
+            if (p.suffix.lower() in WORKBOOK_EXTS and not p.name.startswith(TEMP_PREFIXES)
+                    and out not in p.resolve().parents and p.is_file()):
+                yield p
+
+    def poll(self) -> int:
+        """One scan: collect finished work, queue settled changes; returns files still pending."""
+        self._collect()
+        try:
+            self.settings, self.settings_error = load_settings(self.settings_path), None
+        except ValueError as exc:           # half-saved / malformed: keep the last good settings
+            if str(exc) != self.settings_error:
+                print(f"bad    {self.settings_path}: {exc}; keeping the previous settings", file=sys.stderr)
+            self.settings_error = str(exc)
+        settings = self.settings
+        busy     = {rel for rel, _, _ in self.inflight.values()}
+        now      = time.monotonic()
+        waiting  = 0
+        for path in self._candidates():
+            rel = str(path.relative_to(self.watch))
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            sig  = [st.st_size, st.st_mtime_ns]
+            prev = self.stable.get(rel)
+            if prev is None or prev[0] != sig:
+                self.stable[rel] = (sig, now)
+                waiting += 1
+                continue
+            if rel in busy:
+                continue
+            vendor = match_vendor(Path(rel), settings)
+            if vendor is None:
+                if self.manifest.get(rel).get("status") != "no_vendor":
+                    self.manifest.put(rel, dict(status="no_vendor", stat=sig))
+                    print(f"skip   {rel}: no vendor settings match", file=sys.stderr)
+                continue
+            cfg    = resolve(vendor, settings[vendor], self._mfg_mapping())
+            digest = _digest(cfg)
+            entry  = self.manifest.get(rel)
+            if entry.get("stat") == sig and entry.get("settings") == digest:
+                continue                                    # unchanged since last run
+            if now - prev[1] < self.settle:
+                waiting += 1                                # still settling
+                continue
+            known = entry.get("sha256", "") if entry.get("settings") == digest else ""
+            fut   = self.pool.submit(process_file, str(path), cfg, str(self.out), known,
+                                     output_subdir(Path(rel), vendor))
+            self.inflight[fut] = (rel, sig, digest)
+        return waiting + len(self.inflight)
+
+    def _collect(self) -> None:
+        for fut in [f for f in self.inflight if f.done()]:
+            rel, sig, digest = self.inflight.pop(fut)
+            base = dict(stat=sig, settings=digest, processed=time.strftime("%Y-%m-%d %H:%M:%S"))
+            try:
+                res = fut.result()
+            except Exception as exc:
+                tb = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+                self.manifest.put(rel, dict(base, status="failed", error=str(exc), traceback=tb[-2000:]))
+                print(f"FAIL   {rel}: {exc}", file=sys.stderr)
+                continue
+            if res["status"] == "unchanged":
+                self.manifest.put(rel, {**self.manifest.get(rel), "stat": sig, "settings": digest})
+                print(f"same   {rel}: content unchanged", file=sys.stderr)
+                continue
+            self.manifest.put(rel, dict(base, **res))
+            print(f"{res['status']:6s} {rel}: {res['rows']} asset rows in {res['seconds']}s "
+                  f"(sheet {res['sheet']!r}, header row {res['header_row']}, SKU {res['sku_col']!r})",
+                  file=sys.stderr)
+
+    def run(self, interval: float, once: bool) -> None:
+        try:
+            while True:
+                pending = self.poll()
+                if once and not pending:
+                    break
+                time.sleep(min(interval, 0.5) if self.inflight else interval)
+        finally:
+            self.pool.shutdown(wait=True)
+            self._collect()
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m ingest_service",
+                                 description="Watch a folder of vendor workbooks and build asset templates.")
+    ap.add_argument("watch", type=Path, help="drop folder to watch (recursively)")
+    ap.add_argument("--out", type=Path, required=True, help="templates, logs and manifest.json go here")
+    ap.add_argument("--settings", type=Path, help="per-vendor settings JSON (default: <watch>/vendors.json)")
+    ap.add_argument("-j", "--workers", type=int, default=2, help="workbooks processed concurrently")
+    ap.add_argument("--interval", type=float, default=POLL_SECONDS, help="seconds between scans")
+    ap.add_argument("--settle", type=float, default=SETTLE_SECONDS,
+                    help="a file must be unchanged this long before it is read")
+    ap.add_argument("--once", action="store_true", help="process what is there, then exit")
+    args = ap.parse_args(argv)
+
+    watcher = Watcher(args.watch, args.out, args.settings or args.watch / "vendors.json",
+                      args.workers, args.settle)
+    print(f"watching {args.watch} -> {args.out}  ({args.workers} worker(s))", file=sys.stderr)
+    try:
+        watcher.run(args.interval, args.once)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
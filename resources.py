@@ -0,0 +1,136 @@
+"""
+resources.py  —  per-server shared resources, built once and prewarmed
+
+Streamlit re-executes the page script for every session and interaction, so
+anything expensive to construct lives here behind st.cache_resource and is
+built once per server process instead of once per session:
+
+    manufacturer_mapping()   Brand -> Manu ID, from a JSON sidecar (no pandas on first render)
+    session_id()             this browser session's key in the shared scheduler
+    prewarm()                background import of pandas + the classifier stack and
+                             the pooled HTTP session, so the first upload does not pay for it
+
+lazy_module() defers a heavy import until a page actually touches it.
+"""
+
+from __future__ import annotations
+
+import importlib, json, sys, threading
+from pathlib import Path
+
+import streamlit as st
+
+MFG_XLSX      = Path("Manufacturer_ID_s.xlsx")
+MFG_CACHE     = Path(".cache/manufacturer_ids.json")
+PREWARM_MODULES = ("pandas", "openpyxl", "image_classifier", "result_store", "classify_metrics")
+
+
+class lazy_module:
+    """Stand-in for ``import name`` that imports on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr):
+        mod = sys.modules.get(self._name) or importlib.import_module(self._name)
+        return getattr(mod, attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}>"
+
+
+# ---------------------------------------------------------------------------
+# Manufacturer mapping
+# ---------------------------------------------------------------------------
+def _parse_mfg_xlsx(path: Path) -> tuple[dict, list]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        head = [str(h).strip() if h is not None else "" for h in next(rows)]
+        bi, mi = head.index("Brand"), head.index("Manu ID")
+        mapping = {}
+        for row in rows:
+            brand, manu = row[bi], row[mi]
+            if brand is None:
+                continue
+            brand = str(brand).strip()
+            mapping[brand] = str(int(manu)) if isinstance(manu, float) and manu.is_integer() else str(manu)
+    finally:
+        wb.close()
+    return mapping, sorted(mapping)
+
+
+@st.cache_resource(show_spinner=False)
+def manufacturer_mapping() -> tuple[dict, list]:
+    """(brand -> Manu ID, sorted brands); ({}, []) if the workbook is missing."""
+    try:
+        stat = MFG_XLSX.stat()
+    except OSError:
+        return {}, []
+    stamp = [stat.st_mtime_ns, stat.st_size]
+    try:
+        cached = json.loads(MFG_CACHE.read_text())
+        if cached["stamp"] == stamp:
+            return cached["mapping"], cached["vendors"]
+    except (OSError, ValueError, KeyError):
+        pass
+    try:
+        mapping, vendors = _parse_mfg_xlsx(MFG_XLSX)
+    except Exception:
+        return {}, []
+    try:
+        MFG_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        MFG_CACHE.write_text(json.dumps({"stamp": stamp, "mapping": mapping, "vendors": vendors}))
+    except OSError:
+        pass
+    return mapping, vendors
+
+
+# ---------------------------------------------------------------------------
+# Sessions + prewarm
+# ---------------------------------------------------------------------------
+def session_id() -> str:
+    """Streamlit session ID, used as the owner key in scheduler pools."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "local"
+
+
+def queue_summary(kind: str) -> str:
+    """One line on the shared *kind* pool: queue depth and this session's share."""
+    import scheduler
+
+    stats = scheduler.pool(kind).stats()
+    mine  = stats["owners"].get(session_id())
+    line  = (f"Server {kind} queue: {stats['queued']} waiting, "
+             f"{stats['running']}/{stats['workers']} workers busy, "
+             f"{len(stats['owners'])} session(s)")
+    if mine:
+        line += f"  |  this session: {mine['share']:.0%} share, {mine['queued']} waiting"
+    return line
+
+
+def _prewarm_imports() -> None:
+    for name in PREWARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+    try:
+        from PIL import Image
+        Image.init()                                    # register every codec plugin now
+        import image_classifier
+        image_classifier.http_session()
+    except Exception:
+        pass
+
+
+@st.cache_resource(show_spinner=False)
+def prewarm() -> threading.Thread:
+    """Start warming heavy imports in the background (once per server)."""
+    t = threading.Thread(target=_prewarm_imports, name="belami-prewarm", daemon=True)
+    t.start()
+    return t
@@ -0,0 +1,175 @@
+"""
+result_store.py  —  compact columnar store for classification results
+
+A run can fan out to 50k+ (row, column) results.  Instead of one dict per
+row (each with its own nested ``details`` and, on failures, a traceback),
+results live in typed columns:
+
+    categorical   url, source_col, label, stage      (codes in array('I'))
+    numeric       row_idx, confidence, the heuristic signals, stage timings,
+                  byte counts (int64, 0 when not recorded)
+    text          paired_filename, error (short message only, sparse)
+
+Tables, metrics and exports read the columns directly; CSV and Parquet are
+written chunk by chunk so an export never materialises the whole run twice.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from collections import Counter
+
+from classify_metrics import STAGE_KEYS
+
+SIGNAL_COLS = ("white_pct", "light_pct", "unique_colors", "edge_pct",
+               "text_blocks", "center_light", "gray_std")
+BYTE_COLS   = ("download_bytes", "source_bytes")
+TIMING_COLS = STAGE_KEYS + BYTE_COLS
+CHUNK_ROWS  = 10_000
+
+# export column -> store column
+EXPORT_COLS = {"filename": "paired_filename", "label": "label", "confidence": "confidence",
+               "stage": "stage", "source_column": "source_col", "url": "url",
+               "row_index": "row_idx"}
+
+
+class Categorical:
+    """Interned values + one uint32 code per row."""
+    __slots__ = ("values", "_index", "codes")
+
+    def __init__(self):
+        self.values = []
+        self._index = {}
+        self.codes  = array("I")
+
+    def append(self, value: str) -> None:
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, i: int) -> str:
+        return self.values[self.codes[i]]
+
+    def counts(self) -> Counter:
+        return Counter({self.values[c]: n for c, n in Counter(self.codes).items()})
+
+
+class ResultStore:
+    __slots__ = ("url", "source_col", "label", "stage", "paired_filename",
+                 "row_idx", "confidence", "signals", "timings", "cache_hit", "errors")
+
+    def __init__(self):
+        self.url             = Categorical()
+        self.source_col      = Categorical()
+        self.label           = Categorical()
+        self.stage           = Categorical()
+        self.paired_filename = []
+        self.row_idx         = array("q")
+        self.confidence      = array("b")
+        self.signals         = {k: array("f") for k in SIGNAL_COLS}
+        self.timings         = {k: array("q" if k in BYTE_COLS else "f") for k in TIMING_COLS}
+        self.cache_hit       = array("b")
+        self.errors          = {}            # row -> short error message
+
+    # -- building ------------------------------------------------------------
+    def append(self, url: str, source_col: str, paired_filename: str, row_idx: int,
+               label: str, confidence: int, stage: str,
+               details: dict | None = None, timings: dict | None = None) -> None:
+        details, timings = details or {}, timings or {}
+        if "error" in details:
+            self.errors[len(self.row_idx)] = str(details["error"])[:300]
+        self.url.append(url)
+        self.source_col.append(source_col)
+        self.label.append(label)
+        self.stage.append(stage)
+        self.paired_filename.append(paired_filename)
+        self.row_idx.append(int(row_idx))
+        self.confidence.append(int(confidence))
+        for k, col in self.signals.items():
+            col.append(float(details.get(k, math.nan)))
+        for k in STAGE_KEYS:
+            self.timings[k].append(float(timings.get(k, math.nan)))
+        for k in BYTE_COLS:
+            self.timings[k].append(int(timings.get(k, 0)))
+        self.cache_hit.append(bool(timings.get("cache_hit")))
+
+    def add_fanout(self, url: str, result, refs) -> None:
+        """One ClassificationResult (or record dict) for every (row_idx, col, filename) in *refs*."""
+        get = result.get if isinstance(result, dict) else lambda k: getattr(result, k)
+        for row_idx, col, fname in refs:
+            self.append(url, col, fname, row_idx, get("label"), get("confidence"),
+                        get("stage"), get("details"), get("timings"))
+
+    # -- reading -------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.row_idx)
+
+    def counts(self, column: str) -> Counter:
+        """Value counts of a categorical column ("label", "stage", "source_col", "url")."""
+        return getattr(self, column).counts()
+
+    def first_row_per_url(self) -> list[int]:
+        """Index of the first row for each unique URL (one sample per download)."""
+        seen, rows = set(), []
+        for i, code in enumerate(self.url.codes):
+            if code not in seen:
+                seen.add(code)
+                rows.append(i)
+        return rows
+
+    def rows_excluding(self, column: str, value: str) -> list[int]:
+        """Row indices whose categorical *column* is not *value* (e.g. stage != "error")."""
+        col  = getattr(self, column)
+        skip = col._index.get(value)
+        return [i for i, c in enumerate(col.codes) if c != skip]
+
+    def to_frame(self, columns: dict | None = None, start: int = 0, stop: int | None = None):
+        """pandas DataFrame of (a slice of) the store; *columns* maps output name -> store column."""
+        import numpy as np
+        import pandas as pd
+
+        columns = columns or EXPORT_COLS
+        stop    = len(self) if stop is None else min(stop, len(self))
+        data    = {}
+        for out_name, name in columns.items():
+            attr = getattr(self, name, None) if name in self.__slots__ else None
+            if isinstance(attr, Categorical):
+                codes = np.frombuffer(attr.codes, dtype=np.uint32)[start:stop].astype(np.int32)
+                data[out_name] = pd.Categorical.from_codes(codes, categories=pd.Index(attr.values))
+            elif isinstance(attr, array):
+                data[out_name] = np.frombuffer(attr, dtype=attr.typecode)[start:stop]
+            elif name == "paired_filename":
+                data[out_name] = self.paired_filename[start:stop]
+            elif name == "error":
+                data[out_name] = [self.errors.get(i, "") for i in range(start, stop)]
+            else:
+                col = self.signals.get(name, self.timings.get(name))
+                data[out_name] = np.frombuffer(col, dtype=col.typecode)[start:stop]
+        return pd.DataFrame(data)
+
+    # -- export --------------------------------------------------------------
+    def write_csv(self, fp, columns: dict | None = None, chunk_rows: int = CHUNK_ROWS) -> None:
+        for start in range(0, max(len(self), 1), chunk_rows):
+            self.to_frame(columns, start, start + chunk_rows).to_csv(fp, index=False, header=start == 0)
+
+    def write_parquet(self, fp, columns: dict | None = None, chunk_rows: int = CHUNK_ROWS) -> None:
+        """One row group per chunk; categoricals become Parquet dictionary columns."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = columns or {**EXPORT_COLS, **{k: k for k in SIGNAL_COLS + TIMING_COLS},
+                              "error": "error"}
+        writer  = None
+        try:
+            for start in range(0, max(len(self), 1), chunk_rows):
+                table = pa.Table.from_pandas(self.to_frame(columns, start, start + chunk_rows),
+                                             preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(fp, table.schema)
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
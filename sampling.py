@@ -0,0 +1,161 @@
+"""
+sampling.py  —  estimate a URL column's label mix from a random sample
+
+Classifying a 30k-URL column just to learn "is Alt 3 mostly lifestyle or
+mostly dimension drawings?" is wasteful.  run_sample() draws a stratified
+random sample (one stratum per chosen column), classifies it in small
+concurrent batches and stops a column as soon as every label proportion's
+95 % Wilson interval is within the requested half-width.
+
+The report also projects what a full run would cost: Claude calls (share
+of sampled URLs that reached Claude × unique URLs) and runtime (mean
+per-URL latency × unique URLs spread over the shared classify pool, or the
+Claude calls at the shared rate limit, whichever is slower -- assuming no
+other session is competing for either).
+"""
+
+from __future__ import annotations
+
+import math, random, time
+from collections import Counter
+
+import image_classifier as ic
+import scheduler
+from classify_metrics import STAGE_KEYS
+
+Z_95        = 1.96
+BATCH       = 8             # URLs classified per column per round
+MIN_SAMPLE  = 20            # never stop a column before this many results
+
+
+def wilson(k: int, n: int, z: float = Z_95) -> tuple[float, float]:
+    """Wilson score interval for k successes out of n."""
+    if n == 0:
+        return 0.0, 1.0
+    p      = k / n
+    denom  = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half   = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def strata(plan: dict, seed: int = 0) -> dict[str, list[str]]:
+    """Shuffled unique (normalised) URLs per column of a classification plan."""
+    cols = {}
+    for norm, refs in plan["refs"].items():
+        for col in dict.fromkeys(col for _, col, _ in refs):
+            cols.setdefault(col, []).append(norm)
+    rng = random.Random(seed)
+    for norms in cols.values():
+        rng.shuffle(norms)
+    return cols
+
+
+def _interval(k: int, n: int, population: int) -> tuple[float, float]:
+    """Wilson interval narrowed by the finite-population correction (exact once n covers it)."""
+    if n and n >= population:
+        return k / n, k / n
+    fpc    = math.sqrt((population - n) / max(population - 1, 1))
+    lo, hi = wilson(k, n)
+    centre, half = (lo + hi) / 2, (hi - lo) / 2 * fpc
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def _max_halfwidth(labels: Counter, n: int, population: int) -> float:
+    """Widest label interval half-width, with a finite-population correction."""
+    worst = 0.0
+    for k in list(labels.values()) + [0]:               # + an unseen label
+        lo, hi = _interval(k, n, population)
+        worst  = max(worst, (hi - lo) / 2)
+    return worst
+
+
+def _latency_ms(res: ic.ClassificationResult) -> float:
+    return sum(res.timings.get(k, 0.0) for k in STAGE_KEYS)
+
+
+def run_sample(plan: dict, halfwidth: float = 0.10, max_per_column: int = 400,
+               owner: str = "sample", seed: int = 0, on_progress=None) -> dict:
+    """Classify a stratified sample of *plan* until every column's intervals are
+    within ±*halfwidth* (or *max_per_column* is reached); returns a report dict.
+
+    *on_progress(sampled, budget)* is called after every round.  URLs are
+    classified on the shared classify pool, queued under *owner*.
+    """
+    cols    = strata(plan, seed)
+    state   = {c: dict(queue=norms, population=len(norms), labels=Counter(), n=0,
+                       claude=0, errors=0, latency=0.0, stopped="")
+               for c, norms in cols.items()}
+    seen    = {}                                        # norm -> result (shared URLs)
+    budget  = sum(min(s["population"], max_per_column) for s in state.values())
+    started = time.time()
+
+    pool = scheduler.pool("classify").client(owner)
+    while True:
+        active = [c for c, s in state.items() if not s["stopped"]]
+        if not active:
+            break
+        batch = []
+        for c in active:
+            s    = state[c]
+            take = min(BATCH, max_per_column - s["n"], len(s["queue"]))
+            batch += [(c, s["queue"].pop()) for _ in range(take)]
+        todo = [norm for _, norm in batch if norm not in seen]
+        for norm, res in zip(todo, pool.map(ic.classify_from_url,
+                                            [plan["unique"][n] for n in todo])):
+            seen[norm] = res
+        for c, norm in batch:
+            res, s = seen[norm], state[c]
+            s["n"] += 1
+            if res.stage == "error":
+                s["errors"] += 1
+                continue
+            s["labels"][res.label] += 1
+            s["claude"]  += res.stage == "claude_api"
+            s["latency"] += _latency_ms(res)
+        for c in active:
+            s  = state[c]
+            ok = s["n"] - s["errors"]
+            if not s["queue"]:
+                s["stopped"] = "exhausted"
+            elif s["n"] >= max_per_column:
+                s["stopped"] = "max sample"
+            elif ok >= MIN_SAMPLE and _max_halfwidth(s["labels"], ok, s["population"]) <= halfwidth:
+                s["stopped"] = "converged"
+        if on_progress:
+            on_progress(sum(s["n"] for s in state.values()), budget)
+
+    return _report(plan, state, time.time() - started)
+
+
+def _report(plan: dict, state: dict, elapsed: float) -> dict:
+    columns = {}
+    tot_claude = tot_latency = tot_weight = 0.0
+    for c, s in state.items():
+        ok    = s["n"] - s["errors"]
+        N     = s["population"]
+        rate  = s["claude"] / ok if ok else 0.0
+        ms    = s["latency"] / ok if ok else 0.0
+        props = {}
+        for label, k in s["labels"].most_common():
+            lo, hi = _interval(k, ok, N)
+            props[label] = dict(share=round(k / ok, 3), low=round(lo, 3), high=round(hi, 3))
+        columns[c] = dict(sampled=s["n"], population=N, errors=s["errors"], stopped=s["stopped"],
+                          halfwidth=round(_max_halfwidth(s["labels"], ok, N), 3) if ok else None,
+                          labels=props, claude_rate=round(rate, 3),
+                          projected_claude_calls=round(rate * N),
+                          projected_seconds=round(_projected_seconds(ms * N, rate * N), 1))
+        tot_claude  += rate * N
+        tot_latency += ms * N
+        tot_weight  += N
+    unique = len(plan["unique"])
+    scale  = unique / tot_weight if tot_weight else 0.0     # shared URLs count once
+    return dict(columns=columns, sample_seconds=round(elapsed, 1), unique_urls=unique,
+                projected_claude_calls=round(tot_claude * scale),
+                projected_seconds=round(_projected_seconds(tot_latency * scale, tot_claude * scale), 1))
+
+
+def _projected_seconds(latency_ms: float, claude_calls: float) -> float:
+    rpm = scheduler.claude.rate * 60
+    return max(latency_ms / 1000 / scheduler.POOL_SIZES["classify"],
+               claude_calls / rpm * 60 if rpm > 0 else 0.0)
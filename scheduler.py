@@ -0,0 +1,264 @@
+"""
+scheduler.py  —  process-wide work scheduling shared by every Streamlit session
+
+One Streamlit server runs every browser session in the same process.  Without
+coordination three big vendor runs each start their own threads and fight for
+CPU, vendor bandwidth and the Claude rate limit.  Everything here is a
+per-process singleton:
+
+    pool("classify")   bounded worker pool for download + classify tasks
+    pool("resize")     bounded worker pool for resize / encode tasks
+    downloads          per-host concurrency limit for every vendor download
+    claude             token bucket for Claude calls (a 429 pauses it for everyone)
+
+Pools queue tasks per owner (a session ID, or a job's session) and hand
+workers to owners round-robin, so a 10 000-URL run cannot starve a 50-URL
+one: each active owner gets an equal share of the workers.
+
+    BELAMI_CLASSIFY_WORKERS   classify pool size        (default 16)
+    BELAMI_WORKERS            resize pool size          (default CPU count)
+    BELAMI_PER_HOST           concurrent downloads/host (default 6)
+    BELAMI_CLAUDE_RPM         Claude calls per minute   (default 50; 0 = unlimited)
+"""
+
+from __future__ import annotations
+
+import os, threading, time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+SHARE_WINDOW = 60.0             # seconds of completions behind the "share" figure
+POOL_SIZES   = {
+    "classify": int(os.environ.get("BELAMI_CLASSIFY_WORKERS", 16)),
+    "resize":   int(os.environ.get("BELAMI_WORKERS", os.cpu_count() or 4)),
+}
+PER_HOST     = int(os.environ.get("BELAMI_PER_HOST", 6))
+CLAUDE_RPM   = float(os.environ.get("BELAMI_CLAUDE_RPM", 50))
+CLAUDE_BURST = 5
+
+
+# ---------------------------------------------------------------------------
+# Fair worker pool
+# ---------------------------------------------------------------------------
+class FairPool:
+    """Fixed worker threads; queued tasks are served round-robin across owners."""
+
+    def __init__(self, name: str, workers: int):
+        self.name     = name
+        self.workers  = workers
+        self._queues  = {}                  # owner -> deque[(future, fn, args, kwargs)]
+        self._ring    = deque()             # owners with queued work, in service order
+        self._running = Counter()
+        self._recent  = deque()             # (finished_at, owner)
+        self._cond    = threading.Condition()
+        self._threads = []
+
+    def submit(self, owner: str, fn, *args, **kwargs) -> Future:
+        fut = Future()
+        with self._cond:
+            if not self._threads:
+                self._start()
+            q = self._queues.get(owner)
+            if q is None:
+                q = self._queues[owner] = deque()
+                self._ring.append(owner)
+            q.append((fut, fn, args, kwargs))
+            self._cond.notify()
+        return fut
+
+    def client(self, owner: str) -> "_Client":
+        """Executor-like view of the pool for one owner (``submit`` / ``map``)."""
+        return _Client(self, owner)
+
+    def map_unordered(self, owner: str, fn, items, window: int | None = None, stop=None):
+        """Yield (item, future) as tasks finish, keeping at most *window* of
+        *owner*'s tasks queued or running; stops feeding once *stop* is set."""
+        window   = window or self.workers
+        items    = iter(items)
+        inflight = {}
+
+        def fill():
+            while len(inflight) < window and not (stop is not None and stop.is_set()):
+                item = next(items, _END)
+                if item is _END:
+                    return
+                inflight[self.submit(owner, fn, item)] = item
+
+        fill()
+        while inflight:
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield inflight.pop(fut), fut
+            fill()
+
+    def stats(self) -> dict:
+        """Queue depth, busy workers and each owner's share of the pool."""
+        with self._cond:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0][0] > SHARE_WINDOW:
+                self._recent.popleft()
+            finished = Counter(owner for _, owner in self._recent)
+            queued   = {o: len(q) for o, q in self._queues.items()}
+            running  = +self._running
+        busy   = sum(running.values())
+        total  = sum(finished.values())
+        owners = {}
+        for o in set(queued) | set(running) | set(finished):
+            owners[o] = dict(queued=queued.get(o, 0), running=running.get(o, 0),
+                             finished=finished.get(o, 0),
+                             share=finished[o] / total if total else
+                                   running.get(o, 0) / busy if busy else 0.0)
+        return dict(name=self.name, workers=self.workers, queued=sum(queued.values()),
+                    running=busy, owners=owners)
+
+    # -- workers -------------------------------------------------------------
+    def _start(self) -> None:
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"{self.name}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _next(self):
+        with self._cond:
+            while not self._ring:
+                self._cond.wait()
+            owner = self._ring.popleft()
+            q     = self._queues[owner]
+            task  = q.popleft()
+            if q:
+                self._ring.append(owner)        # back of the line
+            else:
+                del self._queues[owner]
+            self._running[owner] += 1
+            return owner, task
+
+    def _work(self) -> None:
+        while True:
+            owner, (fut, fn, args, kwargs) = self._next()
+            try:
+                if fut.set_running_or_notify_cancel():
+                    try:
+                        fut.set_result(fn(*args, **kwargs))
+                    except BaseException as exc:
+                        fut.set_exception(exc)
+            finally:
+                with self._cond:
+                    self._running[owner] -= 1
+                    self._recent.append((time.monotonic(), owner))
+
+
+_END = object()
+
+
+class _Client:
+    def __init__(self, pool: FairPool, owner: str):
+        self.pool, self.owner = pool, owner
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        return self.pool.submit(self.owner, fn, *args, **kwargs)
+
+    def map(self, fn, items):
+        futs = [self.submit(fn, item) for item in items]
+        return (f.result() for f in futs)
+
+
+_pools: dict[str, FairPool] = {}
+_pools_lock = threading.Lock()
+
+def pool(kind: str) -> FairPool:
+    """The process-wide pool for *kind* ("classify" or "resize")."""
+    with _pools_lock:
+        p = _pools.get(kind)
+        if p is None:
+            p = _pools[kind] = FairPool(kind, POOL_SIZES[kind])
+        return p
+
+
+# ---------------------------------------------------------------------------
+# Per-host download limit
+# ---------------------------------------------------------------------------
+class HostLimiter:
+    """At most *per_host* concurrent requests to any one host, process-wide."""
+
+    def __init__(self, per_host: int):
+        self.per_host = per_host
+        self._sems    = {}
+        self._active  = Counter()
+        self._lock    = threading.Lock()
+
+    @contextmanager
+    def slot(self, url: str):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            sem = self._sems.get(host)
+            if sem is None:
+                sem = self._sems[host] = threading.BoundedSemaphore(self.per_host)
+        with sem:
+            with self._lock:
+                self._active[host] += 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self._active[host] -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {h: n for h, n in self._active.items() if n}
+
+
+# ---------------------------------------------------------------------------
+# Claude token bucket
+# ---------------------------------------------------------------------------
+class TokenBucket:
+    """*rate* tokens/s up to *burst* (rate 0 = unlimited); ``pause`` empties it
+    for every caller (429s)."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate, self.burst = rate, burst
+        self._tokens  = float(burst)
+        self._updated = time.monotonic()
+        self._until   = 0.0
+        self._waiting = 0
+        self._lock    = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a call may go out; returns seconds waited."""
+        t0 = time.monotonic()
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    self._tokens  = min(self.burst, self._tokens + (now - self._updated) * max(self.rate, 0))
+                    self._updated = now
+                    if now < self._until:
+                        delay = self._until - now
+                    elif self.rate <= 0:
+                        return now - t0
+                    elif self._tokens >= 1:
+                        self._tokens -= 1
+                        return now - t0
+                    else:
+                        delay = (1 - self._tokens) / self.rate
+                time.sleep(delay)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._until  = max(self._until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(rpm=round(self.rate * 60, 1), waiting=self._waiting,
+                        paused=round(max(0.0, self._until - time.monotonic()), 1))
+
+
+downloads = HostLimiter(PER_HOST)
+claude    = TokenBucket(CLAUDE_RPM / 60, CLAUDE_BURST)
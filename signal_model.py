@@ -0,0 +1,290 @@
+"""
+signal_model.py  —  learned stage between the heuristic and Claude
+
+A small multinomial logistic regression over the cheap `_analyze` signals
+(+ aspect ratio and a 12-bin colour histogram).  It is trained offline on
+logged Claude labels, calibrated with temperature scaling, and only answers
+when its calibrated probability clears a threshold picked for a target
+accuracy; everything else still goes to Claude.
+
+Training data is any NDJSON of ClassificationResult records — the output
+of `python -m image_classifier` or a job's results.ndjson.  Rows with
+stage == "claude_api" give (signals, label) pairs.
+
+    python -m signal_model train runs/*.ndjson -o signal_model.json
+    python -m signal_model evaluate holdout.ndjson --model signal_model.json
+
+CPU only (numpy), a few KB on disk, microseconds per prediction.
+"""
+
+from __future__ import annotations
+
+import argparse, glob, json, random, sys
+from pathlib import Path
+
+import numpy as np
+
+from image_classifier import CONFIDENCE_THRESHOLD
+
+MODEL_PATH = Path("signal_model.json")
+
+# The model never answers below the heuristic's confident bar: label_index
+# drops such labels, so the image would get neither a Claude call nor a usable
+# label.  Inference, threshold picking and every coverage report use this floor.
+MIN_THRESHOLD = CONFIDENCE_THRESHOLD / 100
+
+SIGNALS  = ("white_pct", "light_pct", "unique_colors", "edge_pct",
+            "text_blocks", "center_light", "gray_std")
+N_HIST   = 12
+
+
+# ---------------------------------------------------------------------------
+# Features
+# ---------------------------------------------------------------------------
+def features(details: dict) -> list[float] | None:
+    """Feature vector from a result's ``details``; None if signals are missing."""
+    try:
+        x = [float(details[k]) for k in SIGNALS]
+    except (KeyError, TypeError, ValueError):
+        return None
+    x.append(float(details.get("aspect_ratio", 1.0)))
+    hist = details.get("color_hist") or [0.0] * N_HIST
+    x.extend(float(v) for v in hist[:N_HIST])
+    return x
+
+
+def load_labelled(paths: list[str]) -> tuple[np.ndarray, list[str]]:
+    """(X, y) from the Claude-labelled rows of one or more NDJSON files."""
+    from image_classifier import _sanitise
+
+    X, y = [], []
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    det = rec.get("details") or {}
+                    if rec.get("stage") != "claude_api" or "claude_raw" not in det:
+                        continue
+                    x = features(det)
+                    if x is not None:
+                        X.append(x)
+                        y.append(_sanitise(det["claude_raw"]))
+    return np.asarray(X, dtype=float), y
+
+
+# ---------------------------------------------------------------------------
+# Model
+# ---------------------------------------------------------------------------
+def _softmax(z: np.ndarray) -> np.ndarray:
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+class SignalModel:
+    """Standardised features -> softmax(W x + b / T)."""
+
+    def __init__(self, labels, mean, std, W, b, temperature=1.0, threshold=1.01):
+        self.labels      = list(labels)
+        self.mean        = np.asarray(mean, dtype=float)
+        self.std         = np.asarray(std, dtype=float)
+        self.W           = np.asarray(W, dtype=float)
+        self.b           = np.asarray(b, dtype=float)
+        self.temperature = float(temperature)
+        self.threshold   = float(threshold)     # > 1 means "never answer"
+
+    @property
+    def accept_threshold(self) -> float:
+        """Probability a prediction needs to be used (threshold, floored at MIN_THRESHOLD)."""
+        return max(self.threshold, MIN_THRESHOLD)
+
+    # -- inference -----------------------------------------------------------
+    def logits(self, X: np.ndarray) -> np.ndarray:
+        return ((X - self.mean) / self.std) @ self.W + self.b
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return _softmax(self.logits(X) / self.temperature)
+
+    def predict(self, details: dict) -> tuple[str, float] | None:
+        """(label, calibrated probability) for one result, or None without signals."""
+        x = features(details)
+        if x is None:
+            return None
+        p = self.predict_proba(np.asarray([x]))[0]
+        i = int(p.argmax())
+        return self.labels[i], float(p[i])
+
+    # -- training ------------------------------------------------------------
+    @classmethod
+    def fit(cls, X: np.ndarray, y: list[str], l2: float = 1e-3,
+            epochs: int = 2000, lr: float = 0.1) -> "SignalModel":
+        labels = sorted(set(y))
+        idx    = {lab: i for i, lab in enumerate(labels)}
+        Y      = np.zeros((len(y), len(labels)))
+        Y[np.arange(len(y)), [idx[v] for v in y]] = 1.0
+
+        mean = X.mean(axis=0)
+        std  = X.std(axis=0)
+        std[std == 0] = 1.0
+        Xs   = (X - mean) / std
+        W    = np.zeros((X.shape[1], len(labels)))
+        b    = np.zeros(len(labels))
+        n    = len(X)
+        for _ in range(epochs):                       # full-batch gradient descent
+            G  = (_softmax(Xs @ W + b) - Y) / n
+            W -= lr * (Xs.T @ G + l2 * W)
+            b -= lr * G.sum(axis=0)
+        return cls(labels, mean, std, W, b)
+
+    def calibrate(self, X: np.ndarray, y: list[str], target_accuracy: float) -> dict:
+        """Fit the temperature on held-out data, then pick the lowest probability
+        threshold (not below MIN_THRESHOLD) whose accepted predictions still
+        reach *target_accuracy*."""
+        idx  = {lab: i for i, lab in enumerate(self.labels)}
+        keep = [i for i, v in enumerate(y) if v in idx]
+        X, t = X[keep], np.array([idx[y[i]] for i in keep])
+        Z    = self.logits(X)
+
+        def nll(T):
+            P = _softmax(Z / T)
+            return -np.log(P[np.arange(len(t)), t] + 1e-12).mean()
+
+        self.temperature = min(np.linspace(0.25, 5.0, 96), key=nll)
+        report = coverage_at(self.predict_proba(X), t, target_accuracy)
+        self.threshold = report["threshold"]
+        return report
+
+    # -- persistence ---------------------------------------------------------
+    def to_json(self) -> dict:
+        return dict(labels=self.labels, mean=self.mean.tolist(), std=self.std.tolist(),
+                    W=self.W.tolist(), b=self.b.tolist(),
+                    temperature=self.temperature, threshold=self.threshold)
+
+    def save(self, path: str | Path = MODEL_PATH) -> None:
+        Path(path).write_text(json.dumps(self.to_json()))
+
+    @classmethod
+    def load(cls, path: str | Path = MODEL_PATH) -> "SignalModel":
+        return cls(**json.loads(Path(path).read_text()))
+
+
+def coverage_at(P: np.ndarray, t: np.ndarray, target_accuracy: float,
+                min_threshold: float = MIN_THRESHOLD) -> dict:
+    """Lowest confidence threshold (>= *min_threshold*) keeping accuracy >= target
+    on accepted rows.
+
+    coverage = share of rows the model answers = Claude calls saved.
+    """
+    conf    = P.max(axis=1)
+    correct = P.argmax(axis=1) == t
+    order   = np.argsort(-conf)
+    hits    = np.cumsum(correct[order])
+    acc     = hits / np.arange(1, len(order) + 1)
+    ok      = np.nonzero((acc >= target_accuracy) & (conf[order] >= min_threshold))[0]
+    if len(ok) == 0 or len(t) == 0:
+        return dict(threshold=1.01, coverage=0.0, accuracy=None, n=int(len(t)))
+    k = int(ok.max())
+    return dict(threshold=float(conf[order[k]]), coverage=round((k + 1) / len(t), 4),
+                accuracy=round(float(acc[k]), 4), n=int(len(t)),
+                overall_accuracy=round(float(correct.mean()), 4))
+
+
+# ---------------------------------------------------------------------------
+# Lazy singleton used by image_classifier
+# ---------------------------------------------------------------------------
+_loaded: SignalModel | None = None
+_tried  = False
+
+def get_model() -> SignalModel | None:
+    """The trained model at MODEL_PATH, or None when no model has been trained."""
+    global _loaded, _tried
+    if not _tried:
+        _tried = True
+        if MODEL_PATH.exists():
+            try:
+                _loaded = SignalModel.load(MODEL_PATH)
+            except (OSError, ValueError, TypeError) as exc:
+                print(f"signal_model: ignoring {MODEL_PATH}: {exc}", file=sys.stderr)
+    return _loaded
+
+
+# ===========================================================================
+# CLI  --  python -m signal_model train|evaluate
+# ===========================================================================
+
+def _split(X, y, holdout: float, seed: int):
+    order = list(range(len(y)))
+    random.Random(seed).shuffle(order)
+    cut   = int(len(order) * (1 - holdout))
+    tr, va = order[:cut], order[cut:]
+    return X[tr], [y[i] for i in tr], X[va], [y[i] for i in va]
+
+
+def _print_report(title: str, rep: dict) -> None:
+    n, cov = rep["n"], rep["coverage"]
+    print(f"{title}: n={n}  threshold={rep['threshold']:.3f}  "
+          f"accuracy on accepted={rep['accuracy']}  overall={rep.get('overall_accuracy')}")
+    print(f"  Claude calls: {n} -> {n - round(n * cov)}  (-{cov:.1%} at equal accuracy)")
+
+
+def main(argv=None) -> int:
+    ap  = argparse.ArgumentParser(prog="python -m signal_model")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    tr = sub.add_parser("train", help="fit + calibrate on Claude-labelled NDJSON")
+    tr.add_argument("inputs", nargs="+")
+    tr.add_argument("-o", "--output", default=str(MODEL_PATH))
+    tr.add_argument("--target-accuracy", type=float, default=0.95,
+                    help="agreement with Claude required on answered images")
+    tr.add_argument("--holdout", type=float, default=0.25)
+    tr.add_argument("--seed", type=int, default=0)
+
+    ev = sub.add_parser("evaluate", help="Claude-call reduction on labelled NDJSON")
+    ev.add_argument("inputs", nargs="+")
+    ev.add_argument("--model", default=str(MODEL_PATH))
+    ev.add_argument("--target-accuracy", type=float, default=None,
+                    help="re-pick the threshold for this accuracy (default: model's own)")
+
+    args = ap.parse_args(argv)
+    X, y = load_labelled(args.inputs)
+    if len(y) == 0:
+        print("no Claude-labelled rows found", file=sys.stderr)
+        return 1
+
+    if args.cmd == "train":
+        Xtr, ytr, Xva, yva = _split(X, y, args.holdout, args.seed)
+        model = SignalModel.fit(Xtr, ytr)
+        rep   = model.calibrate(Xva, yva, args.target_accuracy)
+        model.save(args.output)
+        print(f"trained on {len(ytr)} rows, labels={model.labels}, T={model.temperature:.2f}")
+        _print_report("holdout", rep)
+        print(f"model -> {args.output}")
+        return 0
+
+    model = SignalModel.load(args.model)
+    idx   = {lab: i for i, lab in enumerate(model.labels)}
+    keep  = [i for i, v in enumerate(y) if v in idx]
+    if not keep:
+        print(f"no rows labelled with the model's labels {model.labels}", file=sys.stderr)
+        return 1
+    P     = model.predict_proba(X[keep])
+    t     = np.array([idx[y[i]] for i in keep])
+    if args.target_accuracy is not None:
+        _print_report("evaluate", coverage_at(P, t, args.target_accuracy))
+    else:
+        acc_mask = P.max(axis=1) >= model.accept_threshold
+        answered = int(acc_mask.sum())
+        acc      = float((P.argmax(axis=1) == t)[acc_mask].mean()) if answered else None
+        n        = len(t)
+        print(f"evaluate: n={n}  threshold={model.accept_threshold:.3f}  "
+              f"answered={answered}  accuracy on accepted={acc if acc is None else round(acc, 4)}")
+        print(f"  Claude calls: {n} -> {n - answered}  (-{answered / n:.1%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
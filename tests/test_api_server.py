@@ -0,0 +1,63 @@
+import io
+from http.client import parse_headers
+
+import pytest
+
+pytest.importorskip("PIL")
+
+import api_server
+from api_server import ApiError, Handler
+
+
+def _handler(headers: str, body: bytes) -> Handler:
+    h = Handler.__new__(Handler)                # no socket: just the body-reading half
+    h.headers = parse_headers(io.BytesIO(headers.encode() + b"\r\n"))
+    h.rfile   = io.BytesIO(body)
+    return h
+
+
+def _read(headers: str, body: bytes) -> bytes:
+    return b"".join(_handler(headers, body)._body_chunks())
+
+
+def test_content_length_body():
+    assert _read("Content-Length: 5\r\n", b"hello, and the next request") == b"hello"
+    assert _read("", b"ignored") == b""
+
+
+def test_chunked_body_with_extensions_and_trailers():
+    body = (b"5;name=value\r\nhello\r\n"
+            b"7\r\n, world\r\n"
+            b"0\r\nX-Checksum: abc\r\n\r\n"
+            b"GET /next")
+    h = _handler("Transfer-Encoding: chunked\r\n", body)
+    assert b"".join(h._body_chunks()) == b"hello, world"
+    assert h.rfile.read() == b"GET /next"      # stops right after the trailers
+
+
+def test_chunks_larger_than_the_copy_size(monkeypatch):
+    monkeypatch.setattr(api_server, "COPY_CHUNK", 4)
+    pieces = list(_handler("Transfer-Encoding: chunked\r\n", b"a\r\n0123456789\r\n0\r\n\r\n")._body_chunks())
+    assert pieces == [b"0123", b"4567", b"89"]
+
+
+@pytest.mark.parametrize("headers, body, message", [
+    ("Transfer-Encoding: chunked\r\n", b"zz\r\nhello\r\n0\r\n\r\n", "bad chunk size"),
+    ("Transfer-Encoding: chunked\r\n", b"-5\r\nhello\r\n0\r\n\r\n", "bad chunk size"),
+    ("Transfer-Encoding: chunked\r\n", b"10\r\nshort", "truncated chunked body"),
+    ("Content-Length: 10\r\n", b"short", "truncated body"),
+    ("Content-Length: ten\r\n", b"", "bad Content-Length"),
+    ("Content-Length: -1\r\n", b"", "bad Content-Length"),
+])
+def test_malformed_bodies_are_400(headers, body, message):
+    with pytest.raises(ApiError) as err:
+        _read(headers, body)
+    assert (err.value.code, str(err.value)) == (400, message)
+
+
+def test_has_body():
+    assert _handler("Transfer-Encoding: chunked\r\n", b"")._has_body()
+    assert _handler("Content-Length: 3\r\n", b"abc")._has_body()
+    assert not _handler("Content-Length: 0\r\n", b"")._has_body()
+    with pytest.raises(ApiError):
+        _handler("Content-Length: x\r\n", b"")._has_body()
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+pytest.importorskip("PIL")                      # classify_jobs imports image_classifier
+
+import classify_jobs
+import image_classifier as ic
+
+JOB_ID = "0123456789ab"
+PLAN   = {"unique": {f"x/{i}.jpg": f"http://x/{i}.jpg" for i in range(4)},
+          "refs":   {f"x/{i}.jpg": [[i, "Image 1", f"SKU{i}_1.jpg"]] for i in range(4)}}
+
+
+@pytest.fixture
+def jobs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(classify_jobs, "JOBS_DIR", tmp_path)
+    calls = []
+
+    def classify_from_url(url, use_claude=True):
+        calls.append(url)
+        return ic.ClassificationResult("product", 90, "heuristic")
+
+    monkeypatch.setattr(ic, "classify_from_url", classify_from_url)
+    yield tmp_path, calls
+    classify_jobs._jobs.pop(JOB_ID, None)
+
+
+def _interrupted_job(root):
+    """A job that died after checkpointing one URL, mid-way through writing a second."""
+    d = root / JOB_ID
+    d.mkdir()
+    (d / "plan.json").write_text(json.dumps({"plan": PLAN, "meta": {"created": "2026-01-01"},
+                                             "budget": None}))
+    done = {"norm": "x/0.jpg", "url": "http://x/0.jpg", "label": "lifestyle", "confidence": 80,
+            "stage": "heuristic", "details": {}, "timings": {}}
+    (d / "results.ndjson").write_text(json.dumps(done) + "\n" + '{"norm": "x/1.jp')
+    (d / "state.json").write_text(json.dumps({"status": "running", "done": 1, "total": 4,
+                                              "errors": 0, "error": ""}))
+
+
+def test_read_results_tolerates_a_torn_line(jobs_dir):
+    _interrupted_job(jobs_dir[0])
+    assert list(classify_jobs._read_results(JOB_ID)) == ["x/0.jpg"]
+    assert classify_jobs.get_status(JOB_ID)["status"] == "interrupted"
+
+
+def test_resume_skips_checkpointed_urls(jobs_dir):
+    root, calls = jobs_dir
+    _interrupted_job(root)
+    assert classify_jobs.resume_job(JOB_ID)
+    classify_jobs._jobs[JOB_ID].thread.join(timeout=10)
+
+    assert sorted(calls) == ["http://x/1.jpg", "http://x/2.jpg", "http://x/3.jpg"]
+    status = classify_jobs.get_status(JOB_ID)
+    assert (status["status"], status["done"], status["total"]) == ("done", 4, 4)
+    store = classify_jobs.job_results(JOB_ID)
+    assert len(store) == 4
+    assert store.counts("label") == {"lifestyle": 1, "product": 3}
+    assert sorted(store.paired_filename) == [f"SKU{i}_1.jpg" for i in range(4)]
+
+
+def test_resume_of_unknown_job(jobs_dir):
+    assert not classify_jobs.resume_job("ffffffffffff")
+
+
+def test_drop_torn_line(jobs_dir):
+    d = jobs_dir[0] / JOB_ID
+    d.mkdir()
+    path = d / "results.ndjson"
+    for text, kept in [('{"a": 1}\n{"b"', '{"a": 1}\n'), ('{"a": 1}\n', '{"a": 1}\n'),
+                       ('{"b"', ''), ('', '')]:
+        path.write_text(text)
+        classify_jobs._drop_torn_line(JOB_ID)
+        assert path.read_text() == kept
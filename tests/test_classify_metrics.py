@@ -0,0 +1,32 @@
+from classify_metrics import RunMetrics, percentile
+
+
+def test_percentile_nearest_rank():
+    vals = [float(v) for v in range(1, 101)]
+    assert percentile(vals, 0.5) == 50
+    assert percentile(vals, 0.95) == 95
+    assert percentile(vals, 0.99) == 99
+    assert percentile(vals, 1.0) == 100
+    assert percentile(vals, 0.0) == 1
+
+
+def test_percentile_float_rounding_does_not_skip_a_rank():
+    vals = [float(v) for v in range(1, 101)]
+    assert percentile(vals, 0.07) == 7         # 0.07 * 100 == 7.000000000000001
+
+
+def test_percentile_small_and_empty():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3.0], 0.99) == 3.0
+    assert percentile([1.0, 2.0], 0.5) == 1.0
+
+
+def test_summary_counts_and_latencies():
+    results = [dict(stage="heuristic", timings=dict(download_ms=float(ms), download_bytes=10))
+               for ms in range(1, 11)]
+    s = RunMetrics.from_results(results, wall_seconds=2.0).summary()
+    assert s["count"] == 10 and s["by_stage"] == {"heuristic": 10}
+    assert s["download_bytes"] == 100
+    assert s["throughput"] == 5.0
+    assert s["latency_ms"]["download_ms"]["p50"] == 5.0
+    assert s["latency_ms"]["download_ms"]["p99"] == 10.0
@@ -0,0 +1,49 @@
+import os
+
+from disk_cache import DiskCache, content_key
+
+
+def test_content_key_covers_data_and_params():
+    assert content_key(b"img", w=1000, h=1000) == content_key(b"img", h=1000, w=1000)
+    assert content_key(b"img", w=1000) != content_key(b"img", w=999)
+    assert content_key(b"img", w=1000) != content_key(b"other", w=1000)
+    assert content_key(b"img") != content_key(b"img", w=1000)
+
+
+def test_round_trip(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=1000)
+    cache.put("ab" * 32, b"payload", {"quality": 90})
+    assert cache.get("ab" * 32) == (b"payload", {"quality": 90})
+    assert cache.get("cd" * 32) is None
+    assert cache.total_bytes == 7
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=100)
+    a, b, c = ("a" * 64, "b" * 64, "c" * 64)
+    cache.put(a, b"x" * 40)
+    cache.put(b, b"x" * 40)
+    os.utime(cache._data_path(a), (1, 1))
+    os.utime(cache._data_path(b), (2, 2))
+    assert cache.get(a) is not None            # a becomes the most recently used
+
+    cache.put(c, b"x" * 40)                    # 120 > 100: evict down to 90
+    assert cache.get(b) is None
+    assert not cache._meta_path(b).exists()
+    assert cache.get(a) is not None and cache.get(c) is not None
+    assert cache.total_bytes == 80
+
+
+def test_oversized_entry_is_not_stored(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=10)
+    cache.put("a" * 64, b"x" * 11)
+    assert cache.get("a" * 64) is None
+    assert cache.total_bytes == 0
+
+
+def test_total_survives_restart_and_overwrite(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=100)
+    cache.put("a" * 64, b"x" * 30)
+    cache.put("a" * 64, b"x" * 20)
+    assert cache.total_bytes == 20
+    assert DiskCache(tmp_path, max_bytes=100).total_bytes == 20
@@ -0,0 +1,50 @@
+import io
+import math
+
+import pytest
+
+from result_store import EXPORT_COLS, ResultStore
+
+
+def _store() -> ResultStore:
+    store = ResultStore()
+    store.add_fanout("http://x/a.jpg", dict(label="product", confidence=90, stage="heuristic",
+                                            details={"white_pct": 80.0}, timings={"download_ms": 12.0,
+                                                                                  "download_bytes": 512}),
+                     [(0, "Image 1", "SKU1_1.jpg"), (3, "Alt 2", "SKU4_2.jpg")])
+    store.append("http://x/b.jpg", "Image 1", "SKU2_1.jpg", 1, "error", 0, "error",
+                 details={"error": "HTTP 404"})
+    return store
+
+
+def test_columns_and_counts():
+    store = _store()
+    assert len(store) == 3
+    assert store.counts("label") == {"product": 2, "error": 1}
+    assert store.first_row_per_url() == [0, 2]
+    assert store.rows_excluding("stage", "error") == [0, 1]
+    assert store.errors == {2: "HTTP 404"}
+    assert store.signals["white_pct"][1] == 80.0
+    assert math.isnan(store.signals["white_pct"][2])
+    assert store.timings["download_bytes"][2] == 0
+
+
+def test_csv_round_trip():
+    pd = pytest.importorskip("pandas")
+    store = _store()
+    buf = io.StringIO()
+    store.write_csv(buf, chunk_rows=2)          # two chunks, one header
+    df = pd.read_csv(io.StringIO(buf.getvalue()))
+    assert list(df.columns) == list(EXPORT_COLS)
+    assert df["filename"].tolist() == ["SKU1_1.jpg", "SKU4_2.jpg", "SKU2_1.jpg"]
+    assert df["label"].tolist() == ["product", "product", "error"]
+    assert df["source_column"].tolist() == ["Image 1", "Alt 2", "Image 1"]
+    assert df["row_index"].tolist() == [0, 3, 1]
+    assert df["confidence"].tolist() == [90, 90, 0]
+
+
+def test_csv_of_empty_store_has_header():
+    pytest.importorskip("pandas")
+    buf = io.StringIO()
+    ResultStore().write_csv(buf)
+    assert buf.getvalue().strip() == ",".join(EXPORT_COLS)
@@ -0,0 +1,30 @@
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("PIL")                      # sampling imports image_classifier
+
+from sampling import _interval, _max_halfwidth, wilson
+
+
+def test_wilson_reference_values():
+    assert wilson(5, 10) == pytest.approx((0.2366, 0.7634), abs=1e-4)
+    assert wilson(0, 20) == pytest.approx((0.0, 3.8416 / 23.8416), abs=1e-4)
+    assert wilson(0, 0) == (0.0, 1.0)
+
+
+def test_finite_population_correction():
+    lo, hi = wilson(5, 10)
+    assert _interval(5, 10, 10) == (0.5, 0.5)           # the sample is the whole column
+    assert _interval(5, 10, 10 ** 9) == pytest.approx((lo, hi))
+    flo, fhi = _interval(5, 10, 20)
+    assert (flo + fhi) / 2 == pytest.approx((lo + hi) / 2)
+    # half-width shrinks by sqrt((N - n) / (N - 1))
+    assert (fhi - flo) == pytest.approx((hi - lo) * (10 / 19) ** 0.5)
+
+
+def test_max_halfwidth_includes_an_unseen_label():
+    n = 40
+    worst = _max_halfwidth(Counter(product=n), n, 10 ** 6)
+    assert worst == pytest.approx((wilson(0, n)[1] - wilson(0, n)[0]) / 2, rel=1e-4)
+    assert _max_halfwidth(Counter(product=n), n, n) == 0.0
@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+from scheduler import FairPool
+
+
+def test_owners_are_served_round_robin():
+    pool, order, gate = FairPool("test", workers=1), [], threading.Event()
+    blocker = pool.submit("x", gate.wait)           # holds the only worker while we queue
+    futs  = [pool.submit("big", order.append, f"big{i}") for i in range(3)]
+    futs += [pool.submit("small", order.append, "small0")]
+    gate.set()
+    for f in [blocker] + futs:
+        f.result(timeout=5)
+    assert order == ["big0", "small0", "big1", "big2"]
+
+
+def test_exceptions_reach_the_future():
+    pool = FairPool("test", workers=2)
+    with pytest.raises(ZeroDivisionError):
+        pool.submit("a", lambda: 1 / 0).result(timeout=5)
+    assert pool.submit("a", sum, [1, 2]).result(timeout=5) == 3
+
+
+def test_map_unordered_respects_window_and_stop():
+    pool, stop, inflight = FairPool("test", workers=4), threading.Event(), []
+
+    def task(i):
+        owner = pool.stats()["owners"]["a"]
+        inflight.append(owner["queued"] + owner["running"])
+        return i * 2
+
+    got = {item: fut.result() for item, fut in pool.map_unordered("a", task, range(20), window=2)}
+    assert got == {i: i * 2 for i in range(20)}
+    assert max(inflight) <= 2
+
+    seen = []
+    for item, _ in pool.map_unordered("a", task, range(100), window=1, stop=stop):
+        seen.append(item)
+        stop.set()
+    assert seen == [0]
@@ -0,0 +1,137 @@
+"""
+thumbnail_cache.py  —  small JPEG previews for the classification gallery
+
+The classifier already decodes every image it looks at, so it drops a
+~256 px JPEG thumbnail in here on the way through.  The gallery then renders
+straight from the cache instead of re-downloading full-size images on every
+Streamlit rerun; anything missing (e.g. results loaded from an older job)
+is read through the asset mirror concurrently, once, and cached too.
+
+    memory   bounded LRU of thumbnail bytes (+ ENTRY_OVERHEAD each), keyed by URL
+    disk     optional DiskCache under .cache/thumbs (survives restarts)
+
+An empty ``b""`` entry means "no preview possible" (PDF, video, 404 …) so
+those URLs are not retried on every rerun.  Timeouts and 5xx are not
+recorded: the next gallery page tries again.
+"""
+
+from __future__ import annotations
+
+import hashlib, io, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from disk_cache import DiskCache
+
+THUMB_SIZE      = (256, 256)
+THUMB_QUALITY   = 70
+MEM_MAX_BYTES   = 64 * 1024 * 1024
+ENTRY_OVERHEAD  = 256               # bytes charged per entry (key, dict slot), so b"" entries count too
+DISK_DIR        = ".cache/thumbs"
+DISK_MAX_BYTES  = 256 * 1024 * 1024
+FETCH_WORKERS   = 8
+
+
+def url_key(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def make_thumbnail(img: Image.Image) -> bytes:
+    """Downscaled RGB JPEG of *img* (the source image is left untouched)."""
+    thumb = ImageOps.contain(img, THUMB_SIZE, Image.Resampling.LANCZOS)
+    if thumb.mode != "RGB":
+        thumb = thumb.convert("RGB")
+    buf = io.BytesIO()
+    thumb.save(buf, format="JPEG", quality=THUMB_QUALITY, optimize=True)
+    return buf.getvalue()
+
+
+class ThumbnailCache:
+    """Bytes-capped in-memory LRU, optionally backed by a DiskCache."""
+
+    def __init__(self, max_bytes: int = MEM_MAX_BYTES, disk: DiskCache | None = None):
+        self.max_bytes = int(max_bytes)
+        self.disk      = disk
+        self._mem      = OrderedDict()          # url -> jpeg bytes
+        self._bytes    = 0
+        self._lock     = threading.Lock()
+
+    def __contains__(self, url: str) -> bool:
+        return self.get(url) is not None
+
+    def get(self, url: str) -> bytes | None:
+        """Thumbnail bytes, ``b""`` for a known no-preview URL, None on a miss."""
+        with self._lock:
+            data = self._mem.get(url)
+            if data is not None:
+                self._mem.move_to_end(url)
+                return data
+        if self.disk is not None:
+            hit = self.disk.get(url_key(url))
+            if hit is not None:
+                self._remember(url, hit[0])
+                return hit[0]
+        return None
+
+    def put(self, url: str, data: bytes) -> None:
+        self._remember(url, data)
+        if self.disk is not None and data:
+            self.disk.put(url_key(url), data, {"url": url})
+
+    def put_image(self, url: str, img: Image.Image) -> None:
+        self.put(url, make_thumbnail(img))
+
+    def _remember(self, url: str, data: bytes) -> None:
+        with self._lock:
+            old = self._mem.pop(url, None)
+            if old is not None:
+                self._bytes -= len(old) + ENTRY_OVERHEAD
+            self._mem[url] = data
+            self._bytes   += len(data) + ENTRY_OVERHEAD
+            while self._bytes > self.max_bytes and len(self._mem) > 1:
+                _, dropped   = self._mem.popitem(last=False)
+                self._bytes -= len(dropped) + ENTRY_OVERHEAD
+
+    # -- filling gaps --------------------------------------------------------
+    def _fetch(self, url: str) -> bytes:
+        import asset_mirror
+
+        try:
+            buf, _ = asset_mirror.open_url(url)
+        except Exception as exc:
+            status = getattr(getattr(exc, "response", None), "status_code", None) or 0
+            if 400 <= status < 500:
+                self.put(url, b"")              # gone / forbidden: no preview
+            return b""                          # timeout, 5xx, mirror error: retried next time
+        try:
+            with buf:                           # an mmap for large files
+                img = Image.open(buf)
+                img.draft("RGB", THUMB_SIZE)    # JPEG: decode at reduced scale
+                data = make_thumbnail(img)
+        except Exception:
+            data = b""                          # arrived but not an image (PDF, video …)
+        self.put(url, data)
+        return data
+
+    def get_many(self, urls: list[str], workers: int = FETCH_WORKERS) -> dict[str, bytes]:
+        """Thumbnails for *urls*; misses are downloaded concurrently and cached."""
+        out     = {u: self.get(u) for u in dict.fromkeys(urls)}
+        missing = [u for u, data in out.items() if data is None]
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(workers, len(missing))) as pool:
+                out.update(zip(missing, pool.map(self._fetch, missing)))
+        return out
+
+
+_cache: ThumbnailCache | None = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> ThumbnailCache:
+    """Process-wide cache shared by the classifier threads and the UI."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ThumbnailCache(disk=DiskCache(DISK_DIR, DISK_MAX_BYTES))
+        return _cache
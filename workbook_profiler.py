@@ -0,0 +1,216 @@
+"""
+workbook_profiler.py  —  suggest sheet, header row, SKU column and asset columns
+
+Reads the first PROFILE_ROWS rows of every sheet in one pass (openpyxl
+read-only streaming; pandas for legacy .xls) and scores every candidate
+header row of every sheet at once:
+
+    density    share of the row's cells that are text, not numbers
+    coverage   how much of the table's width the row spans
+    sku        a cell matches SKU_CANDIDATES exactly
+    keywords   cells matching IMAGE_KEYWORDS / PDF_KEYWORDS / VIDEO_KEYWORDS
+    assets     columns whose values *below* the row are mostly file names / URLs
+    data row   penalty when the row itself is full of file names
+
+Cell features are computed once per sheet; the per-row scores are array
+operations over reverse cumulative sums, so every (sheet, row) pair costs
+the same single read.  profile_workbook() returns the ranked suggestions
+plus a small preview of each sheet, so the page needs no other parse until
+the chosen sheet is loaded in full.
+"""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+import numpy as np
+
+from asset_generator import (IMAGE_EXTS, IMAGE_KEYWORDS, PDF_EXTS, PDF_KEYWORDS,
+                             SKU_CANDIDATES, VIDEO_EXTS, VIDEO_KEYWORDS, _safe_lower)
+from claude_budget import is_main_column
+
+PROFILE_ROWS    = 60        # rows read per sheet
+MAX_HEADER_ROWS = 10        # header candidates: the first N rows
+PREVIEW_ROWS    = MAX_HEADER_ROWS
+ASSET_SHARE     = 0.5       # share of a column's values that must look like files
+SKU_HINTS       = ('sku', 'model', 'item', 'part', 'style', 'upc')
+
+ASSET_EXTS = IMAGE_EXTS | PDF_EXTS | VIDEO_EXTS
+_SKU_SET   = set(SKU_CANDIDATES)
+_KEYWORDS  = IMAGE_KEYWORDS + PDF_KEYWORDS + VIDEO_KEYWORDS
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+def _read_grids(f, name: str) -> dict[str, list[tuple]]:
+    """{sheet: first PROFILE_ROWS rows as tuples}, in workbook order."""
+    if hasattr(f, 'seek'):
+        f.seek(0)
+    try:
+        if name.lower().endswith('.xls'):
+            import pandas as pd
+            frames = pd.read_excel(f, sheet_name=None, header=None, nrows=PROFILE_ROWS)
+            return {s: [tuple(None if pd.isna(v) else v for v in row) for row in df.itertuples(index=False)]
+                    for s, df in frames.items()}
+
+        from openpyxl import load_workbook
+        wb = load_workbook(f, read_only=True, data_only=True)
+        try:
+            return {ws.title: list(ws.iter_rows(max_row=PROFILE_ROWS, values_only=True))
+                    for ws in wb.worksheets}
+        finally:
+            wb.close()
+    finally:
+        if hasattr(f, 'seek'):
+            f.seek(0)
+
+
+def _features(rows: list[tuple]) -> dict[str, np.ndarray]:
+    """Boolean (rows x cols) matrices, one Python pass over the cells."""
+    width = max((len(r) for r in rows), default=0)
+    shape = (len(rows), width)
+    feats = {k: np.zeros(shape, dtype=bool) for k in ('filled', 'text', 'kw', 'sku', 'ext')}
+    for i, row in enumerate(rows):
+        for j, v in enumerate(row):
+            if v is None:
+                continue
+            s = str(v).strip()
+            if not s:
+                continue
+            feats['filled'][i, j] = True
+            low = s.lower()
+            if Path(low.split('?')[0]).suffix in ASSET_EXTS:
+                feats['ext'][i, j] = True
+            if isinstance(v, str) and not _is_number(s):
+                feats['text'][i, j] = True
+                feats['kw'][i, j]   = any(kw in low for kw in _KEYWORDS)
+                feats['sku'][i, j]  = low in _SKU_SET
+    return feats
+
+
+def _is_number(s: str) -> bool:
+    try:
+        float(s.replace(',', ''))
+        return True
+    except ValueError:
+        return False
+
+
+def _below(m: np.ndarray) -> np.ndarray:
+    """out[r] = m[r+1:].sum(axis=0) for every r."""
+    rev = np.cumsum(m[::-1].astype(np.int32), axis=0)[::-1]
+    return np.vstack([rev[1:], np.zeros((1, m.shape[1]), dtype=np.int32)])
+
+
+# ---------------------------------------------------------------------------
+# Scoring
+# ---------------------------------------------------------------------------
+def _score_rows(feats: dict) -> tuple[np.ndarray, np.ndarray]:
+    """(score per candidate header row, asset-column mask per row)."""
+    filled, text, kw, sku, ext = (feats[k] for k in ('filled', 'text', 'kw', 'sku', 'ext'))
+    n        = min(MAX_HEADER_ROWS, max(len(filled) - 1, 0))
+    nonempty = filled.sum(axis=1)
+    widest   = np.maximum.accumulate(nonempty[::-1])[::-1]                   # widest row at or below r
+    b_fill   = _below(filled)[:n]
+    b_ext    = _below(ext)[:n]
+    share    = b_ext / np.maximum(b_fill, 1)
+    assets   = text[:n] & (share >= ASSET_SHARE)
+
+    ne       = np.maximum(nonempty[:n], 1)
+    density  = text[:n].sum(axis=1) / ne
+    coverage = np.minimum(nonempty[:n] / np.maximum(widest[:n], 1), 1.0)
+    score    = (2.0 * density
+                + 1.0 * coverage
+                + 3.0 * sku[:n].any(axis=1)
+                + 0.5 * np.minimum(kw[:n].sum(axis=1), 6)
+                + 1.0 * np.minimum(assets.sum(axis=1), 5)
+                - 2.0 * ext[:n].sum(axis=1) / ne)
+    score[nonempty[:n] == 0] = -np.inf
+    return score, assets
+
+
+def _sku_column(header: list[str], rows: list[tuple], r: int) -> str:
+    """Exact SKU_CANDIDATES match, else the most unique column whose name hints at an ID."""
+    lower = {_safe_lower(h).strip(): h for h in header if h}
+    for cand in SKU_CANDIDATES:
+        if cand in lower:
+            return lower[cand]
+    best, best_ratio = "", 0.0
+    for j, h in enumerate(header):
+        if not h or not any(k in _safe_lower(h) for k in SKU_HINTS):
+            continue
+        vals = [row[j] for row in rows[r + 1:] if j < len(row) and row[j] not in (None, '')]
+        if vals:
+            ratio = len(set(map(str, vals))) / len(vals)
+            if ratio > best_ratio:
+                best, best_ratio = h, ratio
+    return best if best_ratio >= 0.9 else ""
+
+
+def _asset_kind(values: list) -> str:
+    exts = [Path(str(v).lower().split('?')[0]).suffix for v in values if v not in (None, '')]
+    if any(e in IMAGE_EXTS for e in exts):
+        kind = 'image'
+    elif any(e in PDF_EXTS for e in exts):
+        kind = 'pdf'
+    elif any(e in VIDEO_EXTS for e in exts):
+        kind = 'video'
+    else:
+        return ''
+    return f"{kind} url" if any(str(v).startswith('http') for v in values if v) else kind
+
+
+def _profile_sheet(sheet: str, rows: list[tuple]) -> list[dict]:
+    if not rows:
+        return []
+    feats = _features(rows)
+    score, assets = _score_rows(feats)
+    out = []
+    for r in np.argsort(-score, kind='stable'):
+        if not np.isfinite(score[r]):
+            continue
+        r      = int(r)
+        header = [str(v) if v is not None else '' for v in rows[r]]
+        cols   = []
+        for j in np.flatnonzero(assets[r]):
+            values = [row[j] for row in rows[r + 1:] if j < len(row)]
+            kind   = _asset_kind(values)
+            if kind:
+                share = feats['ext'][r + 1:, j].sum() / max(feats['filled'][r + 1:, j].sum(), 1)
+                cols.append(dict(col=header[j], kind=kind, share=round(float(share), 2)))
+        images = sorted((c for c in cols if c['kind'].startswith('image')),
+                        key=lambda c: (not is_main_column(c['col']), c['kind'] != 'image'))
+        main   = images[0]['col'] if images else ''
+        out.append(dict(sheet=sheet, header_row=r, score=round(float(score[r]), 2),
+                        sku_col=_sku_column(header, rows, r), asset_col=main, asset_cols=cols))
+    return out
+
+
+# ---------------------------------------------------------------------------
+# PUBLIC
+# ---------------------------------------------------------------------------
+def profile_workbook(f, name: str = '') -> dict:
+    """Rank every (sheet, header row) of the workbook in *f* (path or file object).
+
+    Returns dict(suggestions=[best first], sheets=[names], preview={sheet: rows as text},
+    seconds=<profiling time>).  header_row is 0-based, as pandas' ``header=``.
+    """
+    t0    = time.perf_counter()
+    name  = name or getattr(f, 'name', '') or str(f)
+    grids = _read_grids(f, name)
+    sugg  = [s for sheet, rows in grids.items() for s in _profile_sheet(sheet, rows)]
+    sugg.sort(key=lambda s: -s['score'])
+    return dict(suggestions=sugg, sheets=list(grids),
+                preview={s: [['' if v is None else str(v) for v in row] for row in rows[:PREVIEW_ROWS]]
+                         for s, rows in grids.items()},
+                seconds=round(time.perf_counter() - t0, 3))
+
+
+def best_for(profile: dict, sheet: str | None = None, header_row: int | None = None) -> dict | None:
+    """Top suggestion, optionally restricted to *sheet* (and *header_row*)."""
+    for s in profile['suggestions']:
+        if (sheet is None or s['sheet'] == sheet) and (header_row is None or s['header_row'] == header_row):
+            return s
+    return None